@@ -3,11 +3,12 @@
 task_name=${1}
 task_config=${2}
 gpu_id=${3}
+workers=${4:-1}
 
 ./script/.update_path.sh > /dev/null 2>&1
 
 export CUDA_VISIBLE_DEVICES=${gpu_id}
 
 PYTHONWARNINGS=ignore::UserWarning \
-python script/collect_data.py $task_name $task_config
+python script/collect_data.py $task_name $task_config --workers $workers
 rm -rf data/${task_name}/${task_config}/.cache
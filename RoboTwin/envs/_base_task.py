@@ -34,6 +34,8 @@ parent_directory = os.path.dirname(current_file_path)
 
 
 class Base_Task(gym.Env):
+    # check_success can only hold with both grippers open, see check_success_precondition
+    success_requires_open_grippers = False
 
     def __init__(self):
         pass
@@ -87,7 +89,19 @@ class Base_Task(gym.Env):
         self.plan_success = True
         self.step_lim = None
         self.fix_gripper = False
-        self.setup_scene()
+        # keep engine, renderer, robot, planners and cameras of the previous episode when the static setup matches,
+        # never with a viewer: the collect / eval scripts close it after every episode. Off unless the task config
+        # opts in: the physics state of a reused scene is not the one of a fresh build, see
+        # script/check_scene_reuse.py
+        self.reuse_scene = kwags.get("reuse_scene", False)
+        scene_key = self._get_scene_key(**kwags)
+        self.scene_reused = (self.reuse_scene and not self.render_freq and getattr(self, "scene_key", None) is not None
+                             and self.scene_key == scene_key)
+        self.scene_key = None
+        if self.scene_reused:
+            self.reset_scene()
+        else:
+            self.setup_scene()
 
         self.left_js = None
         self.right_js = None
@@ -96,10 +110,27 @@ class Base_Task(gym.Env):
         self.real_head_pcl_color = None
 
         self.now_obs = {}
+        # take_action checks success every `success_check_period` physics steps (or `success_check_time` seconds
+        # of sim time) and after the last step of every action, see _scheduled_check_success
+        self.success_check_period = kwags.get("success_check_period", 1)
+        if kwags.get("success_check_time", None) is not None:
+            self.success_check_period = max(1, int(round(kwags["success_check_time"] / self.scene.get_timestep())))
+        self.success_check_step_cnt = 0
+        # check_stable stops settling once every actor has been at rest for this many physics steps (opt in via the
+        # task config, e.g. 100), 0: always settle for the full 2000 steps
+        self.stable_check_window = kwags.get("stable_check_window", 0)
+        # qpos actions moving every joint less than this (rad) skip TOPP, 0: always TOPP (opt in via the task config,
+        # e.g. 0.01)
+        self.qpos_fast_path_threshold = kwags.get("qpos_fast_path_threshold", 0)
+        # observation spec declared by the policy (OBS_SPEC in deploy_policy.py), None: full observation
+        self.obs_spec = kwags.get("obs_spec", None)
         self.take_action_cnt = 0
+        self.now_obs_action_cnt = -1  # take_action_cnt at the last get_obs, now_obs is stale once they differ
         self.eval_video_path = kwags.get("eval_video_save_dir", None)
 
         self.save_freq = kwags.get("save_freq")
+        self.capture_workers = kwags.get("capture_workers", 2)  # 0: encode and write on the simulation thread
+        self.capture_queue_size = kwags.get("capture_queue_size", 8)
         self.world_pcd = None
 
         self.size_dict = list()
@@ -120,6 +151,8 @@ class Base_Task(gym.Env):
         self.create_table_and_wall(table_xy_bias=table_xy_bias, table_height=0.74)
         self.load_robot(**kwags)
         self.load_camera(**kwags)
+        self.static_entity_ids = set(entity.global_id for entity in self.scene.entities)
+        self.scene_key = scene_key
         self.robot.move_to_homestate()
 
         render_freq = self.render_freq
@@ -184,24 +217,109 @@ class Base_Task(gym.Env):
                         break
 
         is_stable = True
-        for _ in range(2000):
-            self.scene.step()
+        if self._settle_scene(actors_list, 2000):
+            return is_stable, unstable_list
         for idx, actor in enumerate(actors_list):
             actors_pose_list.append([actor.get_pose()])
         check(500)
         return is_stable, unstable_list
 
+    def _settle_scene(self, actors_list, max_steps, lin_vel_th=1e-3, ang_vel_th=1e-2, pos_th=1e-3, rot_th=0.1):
+        """
+        Step the scene up to `max_steps` times. Returns True as soon as every actor and every articulation
+        (task objects such as microwaves or cabinets, and the robot) has been at rest for `stable_check_window`
+        consecutive steps: dynamic bodies and articulation links slower than `lin_vel_th` (m/s) and `ang_vel_th`
+        (rad/s), no actor or articulation root moved more than `pos_th` (m) or turned more than `rot_th` (degree)
+        and no joint moved more than `pos_th` (m or rad) since the window started. A scene at rest stays at
+        rest, so the remaining settle steps and the 500 step pose check of check_stable could not flag it.
+        Returns False after all `max_steps` steps otherwise.
+        """
+        if self.stable_check_window <= 0:
+            for _ in range(max_steps):
+                self.scene.step()
+            return False
+
+        bodies = []
+        for actor in actors_list:
+            body = actor.find_component_by_type(sapien.physx.PhysxRigidDynamicComponent)
+            if body is not None and not body.get_kinematic():
+                bodies.append(body)
+        articulations = self.scene.get_all_articulations()
+        for articulation in articulations:
+            bodies.extend(articulation.get_links())
+
+        window_poses, window_qpos, window_steps = None, None, 0
+        for _ in range(max_steps):
+            self.scene.step()
+            if any(
+                    np.linalg.norm(body.get_linear_velocity()) > lin_vel_th
+                    or np.linalg.norm(body.get_angular_velocity()) > ang_vel_th for body in bodies):
+                window_poses = None
+                continue
+            poses = ([actor.get_pose() for actor in actors_list] +
+                     [articulation.get_root_pose() for articulation in articulations])
+            qpos = [articulation.get_qpos() for articulation in articulations]
+            if window_poses is None or any(
+                    np.linalg.norm(pose.p - start.p) > pos_th or np.abs(cal_quat_dis(start.q, pose.q) * 180) > rot_th
+                    for pose, start in zip(poses, window_poses)) or any(
+                        len(q) > 0 and np.max(np.abs(q - start)) > pos_th for q, start in zip(qpos, window_qpos)):
+                window_poses, window_qpos, window_steps = poses, qpos, 0
+                continue
+            window_steps += 1
+            if window_steps >= self.stable_check_window:
+                return True
+        return False
+
     def play_once(self):
         pass
 
     def check_success(self):
         pass
 
+    def check_success_precondition(self):
+        """
+        Cheap necessary condition of check_success, take_action skips the full check while it is False.
+        Both grippers open for tasks setting `success_requires_open_grippers`, the default never skips.
+        """
+        if self.success_requires_open_grippers:
+            return self.is_left_gripper_open() and self.is_right_gripper_open()
+        return True
+
+    def _scheduled_check_success(self, force=False):
+        """
+        check_success for the physics step just taken, evaluated only every `success_check_period` steps
+        (always when `force`) and only once check_success_precondition holds.
+        """
+        self.success_check_step_cnt += 1
+        if not force and self.success_check_step_cnt < self.success_check_period:
+            return False
+        self.success_check_step_cnt = 0
+        return self.check_success_precondition() and self.check_success()
+
+    def _get_scene_key(self, **kwags):
+        """
+        Everything the static part of the scene (robot, planners, cameras) is built from.
+        """
+        return repr((
+            kwags.get("left_robot_file"),
+            kwags.get("right_robot_file"),
+            kwags.get("dual_arm_embodied"),
+            kwags.get("embodiment_dis"),
+            kwags.get("camera"),
+            kwags.get("pcd_crop", False),
+            kwags.get("pcd_down_sample_num", 0),
+            kwags.get("pcd_downsample_method", "fps"),
+            kwags.get("pcd_voxel_size", 0.005),
+            kwags.get("bbox"),
+        ))
+
     def setup_scene(self, **kwargs):
         """
         Set the scene
             - Set up the basic scene: light source, viewer.
         """
+        self.background = None
+        self.static_entity_ids = set()
         self.engine = sapien.Engine()
         # declare sapien renderer
         from sapien.render import set_global_config
@@ -268,6 +386,32 @@ class Base_Task(gym.Env):
                 y=kwargs.get("camera_rpy_y", 2.45),
             )
 
+    def reset_scene(self, **kwargs):
+        """
+        Reset the scene of the previous episode instead of building a new one
+            - Remove the task actors and clutter, everything created after the cameras.
+            - Re-randomize the lights in place, drawing the same random numbers as setup_scene.
+        """
+        for entity in self.scene.entities:
+            if entity.global_id not in self.static_entity_ids:
+                self.scene.remove_entity(entity)
+
+        self.scene.set_ambient_light(kwargs.get("ambient_light", [0.5, 0.5, 0.5]))
+        direction_lights = kwargs.get("direction_lights", [[[0, 0.5, -1], [0.5, 0.5, 0.5]]])
+        for light, direction_light in zip(self.direction_light_lst, direction_lights):
+            if self.random_light:
+                direction_light[1] = [
+                    np.random.rand(),
+                    np.random.rand(),
+                    np.random.rand(),
+                ]
+            light.set_color(direction_light[1])
+        point_lights = kwargs.get("point_lights", [[[1, 0, 1.8], [1, 1, 1]], [[-1, 0, 1.8], [1, 1, 1]]])
+        for light, point_light in zip(self.point_light_lst, point_lights):
+            if self.random_light:
+                point_light[1] = [np.random.rand(), np.random.rand(), np.random.rand()]
+            light.set_color(point_light[1])
+
     def create_table_and_wall(self, table_xy_bias=[0, 0], table_height=0.74):
         self.table_xy_bias = table_xy_bias
         wall_texture, table_texture = None, None
@@ -293,6 +437,14 @@ class Base_Task(gym.Env):
         else:
             self.wall_texture, self.table_texture = None, None
 
+        background = (self.wall_texture, self.table_texture, list(table_xy_bias), table_height)
+        if self.background == background:
+            return  # reused scene, table and wall are unchanged
+        if self.background is not None:
+            self.scene.remove_entity(self.wall)
+            self.scene.remove_entity(self.table)
+        self.background = background
+
         self.wall = create_box(
             self.scene,
             sapien.Pose(p=[0, 1, 1.5]),
@@ -316,6 +468,7 @@ class Base_Task(gym.Env):
 
     def get_cluttered_table(self, cluttered_numbers=10, xlim=[-0.59, 0.59], ylim=[-0.34, 0.34], zlim=[0.741]):
         self.record_cluttered_objects = []  # record cluttered objects
+        self.cluttered_attempts = []  # pose candidates sampled per cluttered object
 
         xlim[0] += self.table_xy_bias[0]
         xlim[1] += self.table_xy_bias[0]
@@ -363,6 +516,7 @@ class Base_Task(gym.Env):
                 z_offset=obj_offset,
                 z_max=obj_maxz,
                 prohibited_area=self.prohibited_area,
+                attempts=self.cluttered_attempts,
             )
             if not success or self.cluttered_obj is None:
                 trys += 1
@@ -376,7 +530,8 @@ class Base_Task(gym.Env):
             self.record_cluttered_objects.append({"object_type": obj_name, "object_index": obj_idx})
 
         if success_count < cluttered_numbers:
-            print(f"Warning: Only {success_count} cluttered objects are placed on the table.")
+            print(f"Warning: Only {success_count} cluttered objects are placed on the table "
+                  f"({sum(self.cluttered_attempts)} pose samples over {len(self.cluttered_attempts)} objects).")
 
         self.size_dict = None
         self.cluttered_objs = []
@@ -389,6 +544,9 @@ class Base_Task(gym.Env):
             self.robot = Robot(self.scene, self.need_topp, **kwags)
             self.robot.set_planner(self.scene)
             self.robot.init_joints()
+        elif self.scene_reused:
+            self.robot.reset_state()
+            return
         else:
             self.robot.reset(self.scene, self.need_topp, **kwags)
 
@@ -405,12 +563,16 @@ class Base_Task(gym.Env):
             - Including four cameras: left, right, front, head.
         """
 
-        self.cameras = Camera(
-            bias=self.table_z_bias,
-            random_head_camera_dis=self.random_head_camera_dis,
-            **kwags,
-        )
-        self.cameras.load_camera(self.scene)
+        if self.scene_reused:
+            self.cameras.reset_pose(bias=self.table_z_bias, random_head_camera_dis=self.random_head_camera_dis)
+        else:
+            self.cameras = Camera(
+                bias=self.table_z_bias,
+                random_head_camera_dis=self.random_head_camera_dis,
+                **kwags,
+            )
+            self.cameras.load_camera(self.scene)
+        self.cameras.set_pcd_seed(kwags.get("seed", 0))
         self.scene.step()  # run a physical step
         self.scene.update_render()  # sync pose from SAPIEN to renderer
 
@@ -435,8 +597,19 @@ class Base_Task(gym.Env):
     # =========================================================== Basic APIs ===========================================================
 
     def get_obs(self):
+        """
+        Without an observation spec every collected camera and every modality enabled in `data_type` is fetched,
+        and `now_obs` is a deep copy. With `obs_spec` only the listed cameras are rendered, only the modalities
+        in `obs_spec["data_type"]` are fetched, rgb is returned at `obs_spec["resolution"]` (W, H) and
+        `obs_spec["dtype"]`, and the returned dict is shared with `now_obs` instead of copied.
+        """
+        obs_spec = self.obs_spec or {}
+        data_type = obs_spec.get("data_type", self.data_type)
+        camera_names = obs_spec.get("cameras", None)
+
         self._update_render()
-        self.cameras.update_picture()
+        # the pointcloud is built from all collected cameras
+        self.cameras.update_picture(None if data_type.get("pointcloud", False) else camera_names)
         pkl_dic = {
             "observation": {},
             "pointcloud": [],
@@ -444,33 +617,37 @@ class Base_Task(gym.Env):
             "endpose": {},
         }
 
-        pkl_dic["observation"] = self.cameras.get_config()
+        pkl_dic["observation"] = self.cameras.get_config(camera_names)
         # rgb
-        if self.data_type.get("rgb", False):
-            rgb = self.cameras.get_rgb()
+        if data_type.get("rgb", False):
+            rgb = self.cameras.get_rgb(
+                camera_names,
+                resolution=obs_spec.get("resolution", None),
+                dtype=obs_spec.get("dtype", "uint8"),
+            )
             for camera_name in rgb.keys():
                 pkl_dic["observation"][camera_name].update(rgb[camera_name])
 
-        if self.data_type.get("third_view", False):
+        if data_type.get("third_view", False):
             third_view_rgb = self.cameras.get_observer_rgb()
             pkl_dic["third_view_rgb"] = third_view_rgb
         # mesh_segmentation
-        if self.data_type.get("mesh_segmentation", False):
-            mesh_segmentation = self.cameras.get_segmentation(level="mesh")
+        if data_type.get("mesh_segmentation", False):
+            mesh_segmentation = self.cameras.get_segmentation(level="mesh", camera_names=camera_names)
             for camera_name in mesh_segmentation.keys():
                 pkl_dic["observation"][camera_name].update(mesh_segmentation[camera_name])
         # actor_segmentation
-        if self.data_type.get("actor_segmentation", False):
-            actor_segmentation = self.cameras.get_segmentation(level="actor")
+        if data_type.get("actor_segmentation", False):
+            actor_segmentation = self.cameras.get_segmentation(level="actor", camera_names=camera_names)
             for camera_name in actor_segmentation.keys():
                 pkl_dic["observation"][camera_name].update(actor_segmentation[camera_name])
         # depth
-        if self.data_type.get("depth", False):
-            depth = self.cameras.get_depth()
+        if data_type.get("depth", False):
+            depth = self.cameras.get_depth(camera_names)
             for camera_name in depth.keys():
                 pkl_dic["observation"][camera_name].update(depth[camera_name])
         # endpose
-        if self.data_type.get("endpose", False):
+        if data_type.get("endpose", False):
             norm_gripper_val = [
                 self.robot.get_left_gripper_val(),
                 self.robot.get_right_gripper_val(),
@@ -482,7 +659,7 @@ class Base_Task(gym.Env):
             pkl_dic["endpose"]["right_endpose"] = right_endpose
             pkl_dic["endpose"]["right_gripper"] = norm_gripper_val[1]
         # qpos
-        if self.data_type.get("qpos", False):
+        if data_type.get("qpos", False):
 
             left_jointstate = self.robot.get_left_arm_jointState()
             right_jointstate = self.robot.get_right_arm_jointState()
@@ -493,12 +670,28 @@ class Base_Task(gym.Env):
             pkl_dic["joint_action"]["right_gripper"] = right_jointstate[-1]
             pkl_dic["joint_action"]["vector"] = np.array(left_jointstate + right_jointstate)
         # pointcloud
-        if self.data_type.get("pointcloud", False):
-            pkl_dic["pointcloud"] = self.cameras.get_pcd(self.data_type.get("conbine", False))
+        if data_type.get("pointcloud", False):
+            pkl_dic["pointcloud"] = self.cameras.get_pcd(data_type.get("conbine", False))
 
-        self.now_obs = deepcopy(pkl_dic)
+        if self.obs_spec is None:
+            self.now_obs = deepcopy(pkl_dic)
+        else:
+            self.now_obs = pkl_dic
+        self.now_obs_action_cnt = self.take_action_cnt
         return pkl_dic
 
+    def _get_eval_video_frame(self):
+        rgb = self.now_obs.get("observation", {}).get("head_camera", {}).get("rgb", None)
+        obs_spec = self.obs_spec or {}
+        if (rgb is None or self.now_obs_action_cnt != self.take_action_cnt
+                or obs_spec.get("resolution", None) is not None
+                or np.dtype(obs_spec.get("dtype", "uint8")) != np.uint8):
+            # now_obs is from an earlier action (take_action_chunk skipped get_obs) or the policy does not
+            # consume the head camera as recorded, render it for the video
+            self.cameras.update_picture(["head_camera"])
+            rgb = self.cameras.get_rgb(["head_camera"])["head_camera"]["rgb"]
+        return rgb
+
     def save_camera_rgb(self, save_path, camera_name='head_camera'):
         self._update_render()
         self.cameras.update_picture()
@@ -514,14 +707,29 @@ class Base_Task(gym.Env):
         if self.FRAME_IDX == 0:
             self.folder_path = {"cache": f"{self.save_dir}/.cache/episode{self.ep_num}/"}
 
+            if getattr(self, "episode_writer", None) is not None:
+                self.episode_writer.abort()
+
             for directory in self.folder_path.values():  # remove previous data
                 if os.path.exists(directory):
                     file_list = os.listdir(directory)
                     for file in file_list:
                         os.remove(directory + file)
 
+            # frames are appended straight into the episode hdf5 (kept in the cache folder until merged)
+            self.episode_writer = EpisodeWriter(
+                self.folder_path["cache"] + f"episode{self.ep_num}.hdf5",
+                video_path=self.folder_path["cache"] + f"episode{self.ep_num}.mp4",
+            )
+            if self.capture_workers > 0:
+                self.episode_writer = AsyncEpisodeWriter(
+                    self.episode_writer,
+                    num_workers=self.capture_workers,
+                    max_queue=self.capture_queue_size,
+                )
+
         pkl_dic = self.get_obs()
-        save_pkl(self.folder_path["cache"] + f"{self.FRAME_IDX}.pkl", pkl_dic)  # use cache
+        self.episode_writer.append(pkl_dic)
         self.FRAME_IDX += 1
 
     def save_traj_data(self, idx):
@@ -542,13 +750,23 @@ class Base_Task(gym.Env):
     def merge_pkl_to_hdf5_video(self):
         if not self.save_data:
             return
-        cache_path = self.folder_path["cache"]
         target_file_path = f"{self.save_dir}/data/episode{self.ep_num}.hdf5"
         target_video_path = f"{self.save_dir}/video/episode{self.ep_num}.mp4"
-        # print('Merging pkl to hdf5: ', cache_path, ' -> ', target_file_path)
 
         os.makedirs(f"{self.save_dir}/data", exist_ok=True)
-        process_folder_to_hdf5_video(cache_path, target_file_path, target_video_path)
+        os.makedirs(f"{self.save_dir}/video", exist_ok=True)
+        self.episode_writer.flush()  # wait for the encoder / writer threads
+        if isinstance(self.episode_writer, AsyncEpisodeWriter):
+            stats = self.episode_writer.get_stats()
+            print(f"capture queue: peak depth {stats['peak_queue_depth']}/{stats['max_queue']}, "
+                  f"mean depth {stats['mean_queue_depth']:.2f}, blocked {stats['blocked_num']} times "
+                  f"({stats['blocked_time']:.2f}s) over {stats['frame_num']} frames")
+        self.episode_writer.close()
+        # move into place only once complete, a partially written episode never shows up in data/
+        os.replace(self.episode_writer.hdf5_path, target_file_path)
+        if os.path.exists(self.episode_writer.video_path):
+            os.replace(self.episode_writer.video_path, target_video_path)
+        self.episode_writer = None
 
     def remove_data_cache(self):
         folder_path = self.folder_path["cache"]
@@ -1012,11 +1230,18 @@ class Base_Task(gym.Env):
         elif arm_tag == "right":
             plan_multi_pose = self.robot.right_plan_multi_path
         target_lst = self.robot.create_target_pose_list(res_pose, center_pose, arm_tag)
-        pose_num = len(target_lst)
         traj_lst = plan_multi_pose(target_lst)
+        return self._pick_planned_pose(target_lst, traj_lst)
+
+    def _pick_planned_pose(self, target_lst, traj_lst):
+        """
+        Candidate of `target_lst` to use given its planner results `traj_lst`: meant as the successful candidate
+        with the shortest trajectory, but now_step is never updated (as in the original choose_best_pose), so the
+        length test never holds and the first successful candidate is returned. None if no candidate succeeded.
+        """
         now_pose = None
         now_step = -1
-        for i in range(pose_num):
+        for i in range(len(target_lst)):
             if traj_lst["status"][i] != "Success":
                 continue
             if now_pose is None or len(traj_lst["position"][i]) < now_step:
@@ -1045,6 +1270,19 @@ class Base_Task(gym.Env):
         if not self.plan_success:
             return [-1, -1, -1, -1, -1, -1, -1]
 
+        target_lst = self._get_grasp_target_list(actor, arm_tag, contact_point_id, pre_dis)
+        if target_lst is None:
+            return None
+        if arm_tag == "left":
+            traj_lst = self.robot.left_plan_multi_path(target_lst)
+        elif arm_tag == "right":
+            traj_lst = self.robot.right_plan_multi_path(target_lst)
+        return self._pick_planned_pose(target_lst, traj_lst)
+
+    def _get_grasp_target_list(self, actor: Actor, arm_tag: ArmTag, contact_point_id: int, pre_dis: float):
+        """
+        Candidate grasp poses of a contact point (rotations around it) that get_grasp_pose chooses from.
+        """
         contact_matrix = actor.get_contact_point(contact_point_id, "matrix")
         if contact_matrix is None:
             return None
@@ -1055,8 +1293,7 @@ class Base_Task(gym.Env):
                                global_contact_pose_matrix_q @ np.array([-0.12 - pre_dis, 0, 0]).T)
         global_grasp_pose_q = t3d.quaternions.mat2quat(global_contact_pose_matrix_q)
         res_pose = list(global_grasp_pose_p) + list(global_grasp_pose_q)
-        res_pose = self.choose_best_pose(res_pose, actor.get_contact_point(contact_point_id, "list"), arm_tag)
-        return res_pose
+        return self.robot.create_target_pose_list(res_pose, actor.get_contact_point(contact_point_id, "list"), arm_tag)
 
     def _default_choose_grasp_pose(self, actor: Actor, arm_tag: ArmTag, pre_dis: float) -> list:
         """
@@ -1113,17 +1350,6 @@ class Base_Task(gym.Env):
             grasp_pose = grasp_pose.tolist()
             return grasp_pose
 
-        def check_pose(pre_pose, pose, arm_tag):
-            if arm_tag == "left":
-                plan_func = self.robot.left_plan_path
-            else:
-                plan_func = self.robot.right_plan_path
-            pre_path = plan_func(pre_pose)
-            if pre_path["status"] != "Success":
-                return False
-            pre_qpos = pre_path["position"][-1]
-            return plan_func(pose)["status"] == "Success"
-
         if contact_point_id is not None:
             if type(contact_point_id) != list:
                 contact_point_id = [contact_point_id]
@@ -1131,16 +1357,45 @@ class Base_Task(gym.Env):
         else:
             contact_point_id = actor.iter_contact_points()
 
+        top_down_direction = GRASP_DIRECTION_DIC[("top_down_little_left"
+                                                  if arm_tag == "right" else "top_down_little_right")]
+        side_direction = GRASP_DIRECTION_DIC[pref_direction]
+
+        # candidates of every contact point, the grasp only changes position so the direction scores are known
+        # before planning
+        groups = []
         for i, _ in contact_point_id:
-            pre_pose = self.get_grasp_pose(actor, arm_tag, contact_point_id=i, pre_dis=pre_dis)
+            target_lst = self._get_grasp_target_list(actor, arm_tag, i, pre_dis)
+            if target_lst is None:
+                continue
+            dis_top_down_lst = [cal_quat_dis(target_pose[-4:], top_down_direction) for target_pose in target_lst]
+            groups.append((target_lst, dis_top_down_lst))
+
+        # pre-grasp pose of a contact point: the candidate _pick_planned_pose selects from its plans (as in
+        # get_grasp_pose)
+        chosen = [None] * len(groups)
+
+        def plan_groups(group_ids):
+            if len(group_ids) == 0:
+                return
+            traj_lsts = self.robot.plan_multi_path_groups([groups[idx][0] for idx in group_ids], arm_tag)
+            for idx, traj_lst in zip(group_ids, traj_lsts):
+                chosen[idx] = self._pick_planned_pose(groups[idx][0], traj_lst)
+
+        # a top-down grasp (< 0.15) wins over everything else, plan the contact points that can give one first and
+        # skip the rest if one of them does
+        top_down_ids = [idx for idx in range(len(groups)) if min(groups[idx][1]) < 0.15]
+        plan_groups(top_down_ids)
+        if not any(chosen[idx] is not None and cal_quat_dis(chosen[idx][-4:], top_down_direction) < 0.15
+                   for idx in top_down_ids):
+            plan_groups([idx for idx in range(len(groups)) if idx not in top_down_ids])
+
+        for pre_pose in chosen:
             if pre_pose is None:
                 continue
             pose = get_grasp_pose(pre_pose, pre_dis - target_dis)
-            now_dis_top_down = cal_quat_dis(
-                pose[-4:],
-                GRASP_DIRECTION_DIC[("top_down_little_left" if arm_tag == "right" else "top_down_little_right")],
-            )
-            now_dis_side = cal_quat_dis(pose[-4:], GRASP_DIRECTION_DIC[pref_direction])
+            now_dis_top_down = cal_quat_dis(pose[-4:], top_down_direction)
+            now_dis_side = cal_quat_dis(pose[-4:], side_direction)
 
             if res_pre_top_down_pose is None or now_dis_top_down < dis_top_down:
                 res_pre_top_down_pose = pre_pose
@@ -1482,7 +1737,7 @@ class Base_Task(gym.Env):
 
         eval_video_freq = 1  # fixed
         if (self.eval_video_path is not None and self.take_action_cnt % eval_video_freq == 0):
-            self.eval_video_ffmpeg.stdin.write(self.now_obs["observation"]["head_camera"]["rgb"].tobytes())
+            self.eval_video_ffmpeg.stdin.write(self._get_eval_video_frame().tobytes())
 
         self.take_action_cnt += 1
         print(f"step: \033[92m{self.take_action_cnt} / {self.step_lim}\033[0m", end="\r")
@@ -1540,9 +1795,8 @@ class Base_Task(gym.Env):
             topp_left_flag, topp_right_flag = True, True
 
             try:
-                times, left_pos, left_vel, acc, duration = (self.robot.left_mplib_planner.TOPP(left_path,
-                                                                                            1 / 250,
-                                                                                            verbose=True))
+                times, left_pos, left_vel, acc, duration = (self._time_qpos_path(
+                    self.robot.left_mplib_planner, left_path))
                 left_result = dict()
                 left_result["position"], left_result["velocity"] = left_pos, left_vel
                 left_n_step = left_result["position"].shape[0]
@@ -1556,9 +1810,8 @@ class Base_Task(gym.Env):
                 left_n_step = 50  # fixed
 
             try:
-                times, right_pos, right_vel, acc, duration = (self.robot.right_mplib_planner.TOPP(right_path,
-                                                                                                1 / 250,
-                                                                                                verbose=True))
+                times, right_pos, right_vel, acc, duration = (self._time_qpos_path(
+                    self.robot.right_mplib_planner, right_path))
                 right_result = dict()
                 right_result["position"], right_result["velocity"] = right_pos, right_vel
                 right_n_step = right_result["position"].shape[0]
@@ -1593,78 +1846,81 @@ class Base_Task(gym.Env):
 
         # ========== Gripper ==========
 
-        left_mod_num = left_n_step % len(left_gripper_actions)
-        right_mod_num = right_n_step % len(right_gripper_actions)
-        left_gripper_step = [0] + [
-            left_n_step // len(left_gripper_actions) + (1 if i < left_mod_num else 0)
-            for i in range(len(left_gripper_actions))
-        ]
-        right_gripper_step = [0] + [
-            right_n_step // len(right_gripper_actions) + (1 if i < right_mod_num else 0)
-            for i in range(len(right_gripper_actions))
-        ]
-
-        left_gripper = []
-        for gripper_step in range(1, left_gripper_path.shape[0]):
-            region_left_gripper = np.linspace(
-                left_gripper_path[gripper_step - 1],
-                left_gripper_path[gripper_step],
-                left_gripper_step[gripper_step] + 1,
-            )[1:]
-            left_gripper = left_gripper + region_left_gripper.tolist()
-        left_gripper = np.array(left_gripper)
-
-        right_gripper = []
-        for gripper_step in range(1, right_gripper_path.shape[0]):
-            region_right_gripper = np.linspace(
-                right_gripper_path[gripper_step - 1],
-                right_gripper_path[gripper_step],
-                right_gripper_step[gripper_step] + 1,
-            )[1:]
-            right_gripper = right_gripper + region_right_gripper.tolist()
-        right_gripper = np.array(right_gripper)
+        left_gripper = interpolate_gripper_path(left_gripper_path, left_n_step)
+        right_gripper = interpolate_gripper_path(right_gripper_path, right_n_step)
 
         now_left_id, now_right_id = 0, 0
 
         # ========== Control Loop ==========
         while now_left_id < left_n_step or now_right_id < right_n_step:
+            targets = {}
 
             if (now_left_id < left_n_step and now_left_id / left_n_step <= now_right_id / right_n_step):
                 if topp_left_flag:
-                    self.robot.set_arm_joints(
-                        left_result["position"][now_left_id],
-                        left_result["velocity"][now_left_id],
-                        "left",
-                    )
-                self.robot.set_gripper(left_gripper[now_left_id], "left")
+                    targets["left_position"] = left_result["position"][now_left_id]
+                    targets["left_velocity"] = left_result["velocity"][now_left_id]
+                targets["left_gripper_val"] = left_gripper[now_left_id]
 
                 now_left_id += 1
 
             if (now_right_id < right_n_step and now_right_id / right_n_step <= now_left_id / left_n_step):
                 if topp_right_flag:
-                    self.robot.set_arm_joints(
-                        right_result["position"][now_right_id],
-                        right_result["velocity"][now_right_id],
-                        "right",
-                    )
-                self.robot.set_gripper(right_gripper[now_right_id], "right")
+                    targets["right_position"] = right_result["position"][now_right_id]
+                    targets["right_velocity"] = right_result["velocity"][now_right_id]
+                targets["right_gripper_val"] = right_gripper[now_right_id]
 
                 now_right_id += 1
 
+            self.robot.set_arm_joints_together(**targets)
             self.scene.step()
             self._update_render()
-                
-            if self.check_success():
+
+            if self._scheduled_check_success(force=(now_left_id >= left_n_step and now_right_id >= right_n_step)):
                 self.eval_success = True
                 self.get_obs() # update obs
                 if (self.eval_video_path is not None):
-                    self.eval_video_ffmpeg.stdin.write(self.now_obs["observation"]["head_camera"]["rgb"].tobytes())
+                    self.eval_video_ffmpeg.stdin.write(self._get_eval_video_frame().tobytes())
                 return
 
         self._update_render()
         if self.render_freq:  # UI
             self.viewer.render()
 
+    def _time_qpos_path(self, planner, path):
+        """
+        TOPP for a joint-space action, or the cheap linear timing when no joint moves more than
+        `qpos_fast_path_threshold` (rad).
+        """
+        max_delta = np.max(np.abs(path[-1] - path[0]))
+        # a move of exactly zero keeps going through TOPP, whose failure holds the arm for the fixed 50 steps
+        if 0 < max_delta < self.qpos_fast_path_threshold:
+            return planner.interpolate_small_move(path, 1 / 250)
+        return planner.TOPP(path, 1 / 250, verbose=True)
+
+    def take_action_chunk(self, actions, action_type: Literal['qpos', 'ee'] = 'qpos', obs_every=1, obs_indices=None):
+        """
+        Execute an action chunk, equivalent to calling take_action then get_obs for every action, except that
+        observations are only rendered after the requested actions:
+            - `obs_every`: after every k-th action (k = len(actions): only after the last one).
+            - `obs_indices`: after these actions instead, negative indices count from the end of the chunk.
+        Stops once the episode ends (success or step limit), the observation after the last executed action is
+        then always returned. Returns {action index: observation}.
+        """
+        chunk_len = len(actions)
+        if obs_indices is not None:
+            obs_indices = set(idx % chunk_len for idx in obs_indices if -chunk_len <= idx < chunk_len)
+        else:
+            obs_indices = set(range(obs_every - 1, chunk_len, obs_every))
+
+        observations = {}
+        for idx, action in enumerate(actions):
+            self.take_action(action, action_type=action_type)
+            done = self.eval_success or self.take_action_cnt >= self.step_lim
+            if idx in obs_indices or done:
+                observations[idx] = self.get_obs()
+            if done:
+                break
+        return observations
 
     def save_camera_images(self, task_name, step_name, generate_num_id, save_dir="./camera_images"):
         """
@@ -6,6 +6,7 @@ import numpy as np
 
 
 class blocks_ranking_rgb(Base_Task):
+    success_requires_open_grippers = True
 
     def setup_demo(self, **kwags):
         super()._init_task_env_(**kwags)
@@ -13,31 +13,12 @@ import math
 from .._GLOBAL_CONFIGS import CONFIGS_PATH
 import os
 from sapien.sensor import StereoDepthSensor, StereoDepthSensorConfig
+from .pcd_downsample import fps_indices, downsample_pcd_indices, PCD_DOWNSAMPLE_METHODS
 
-try:
-    import pytorch3d.ops as torch3d_ops
 
-    def fps(points, num_points=1024, use_cuda=True):
-        K = [num_points]
-        if use_cuda:
-            points = torch.from_numpy(points).cuda()
-            sampled_points, indices = torch3d_ops.sample_farthest_points(points=points.unsqueeze(0), K=K)
-            sampled_points = sampled_points.squeeze(0)
-            sampled_points = sampled_points.cpu().numpy()
-        else:
-            points = torch.from_numpy(points)
-            sampled_points, indices = torch3d_ops.sample_farthest_points(points=points.unsqueeze(0), K=K)
-            sampled_points = sampled_points.squeeze(0)
-            sampled_points = sampled_points.numpy()
-
-        return sampled_points, indices
-
-except:
-    print("missing pytorch3d")
-
-    def fps(points, num_points=1024, use_cuda=True):
-        print("fps error: missing pytorch3d")
-        exit()
+def fps(points, num_points=1024, use_cuda=True):
+    indices = fps_indices(points, num_points, use_cuda=use_cuda)
+    return points[indices], indices
 
 
 class Camera:
@@ -46,6 +27,11 @@ class Camera:
         """ """
         self.pcd_crop = kwags.get("pcd_crop", False)
         self.pcd_down_sample_num = kwags.get("pcd_down_sample_num", 0)
+        self.pcd_downsample_method = kwags.get("pcd_downsample_method", "fps")
+        self.pcd_voxel_size = kwags.get("pcd_voxel_size", 0.005)
+        if self.pcd_downsample_method not in PCD_DOWNSAMPLE_METHODS:
+            raise ValueError(f"pcd_downsample_method should be one of {PCD_DOWNSAMPLE_METHODS}")
+        self.pcd_rng = np.random.default_rng(0)
         self.pcd_crop_bbox = kwags.get("bbox", [[-0.6, -0.35, 0.7401], [0.6, 0.35, 2]])
         self.pcd_crop_bbox[0][2] += bias
         self.table_z_bias = bias
@@ -94,16 +80,7 @@ class Camera:
                 raise ValueError(f"Camera type {camera_info['type']} not supported")
 
             camera_config = camera_args[camera_info["type"]]
-            cam_pos = np.array(camera_info["position"])
-            vector = np.random.randn(3)
-            random_dir = vector / np.linalg.norm(vector)
-            cam_pos = cam_pos + random_dir * np.random.uniform(low=0, high=random_head_camera_dis)
-            cam_forward = np.array(camera_info["forward"]) / np.linalg.norm(np.array(camera_info["forward"]))
-            cam_left = np.array(camera_info["left"]) / np.linalg.norm(np.array(camera_info["left"]))
-            up = np.cross(cam_forward, cam_left)
-            mat44 = np.eye(4)
-            mat44[:3, :3] = np.stack([cam_forward, cam_left, up], axis=1)
-            mat44[:3, 3] = cam_pos
+            mat44 = self._sample_camera_pose(camera_info, random_head_camera_dis)
 
             # ========================= sensor camera =========================
             # sensor_config = StereoDepthSensorConfig()
@@ -168,6 +145,7 @@ class Camera:
         # ================================= static camera =================================
         self.head_camera_id = None
         self.static_camera_list = []
+        self.static_camera_info = []
         # self.static_sensor_camera_list = []
         self.static_camera_name = []
         # static camera list
@@ -188,6 +166,7 @@ class Camera:
                     camera, camera_config = create_camera(camera_info,
                                                           random_head_camera_dis=self.random_head_camera_dis)
                     self.static_camera_list.append(camera)
+                    self.static_camera_info.append(camera_info)
                     self.static_camera_name.append(camera_info["name"])
                     # self.static_sensor_camera_list.append(sensor_camera)
                     self.static_camera_config.append(camera_config)
@@ -212,6 +191,7 @@ class Camera:
                 # camera, sensor_camera, camera_config = create_camera(camera_info)
                 camera, camera_config = create_camera(camera_info)
                 self.static_camera_list.append(camera)
+                self.static_camera_info.append(camera_info)
                 self.static_camera_name.append(camera_info["name"])
                 # self.static_sensor_camera_list.append(sensor_camera)
                 self.static_camera_config.append(camera_config)
@@ -270,13 +250,63 @@ class Camera:
         world_cam_mat44[:3, 3] = world_cam_pos
         self.world_camera2.entity.set_pose(sapien.Pose(world_cam_mat44))
 
-    def update_picture(self):
-        # camera
+    def _sample_camera_pose(self, camera_info, random_head_camera_dis=0):
+        cam_pos = np.array(camera_info["position"])
+        vector = np.random.randn(3)
+        random_dir = vector / np.linalg.norm(vector)
+        cam_pos = cam_pos + random_dir * np.random.uniform(low=0, high=random_head_camera_dis)
+        cam_forward = np.array(camera_info["forward"]) / np.linalg.norm(np.array(camera_info["forward"]))
+        cam_left = np.array(camera_info["left"]) / np.linalg.norm(np.array(camera_info["left"]))
+        up = np.cross(cam_forward, cam_left)
+        mat44 = np.eye(4)
+        mat44[:3, :3] = np.stack([cam_forward, cam_left, up], axis=1)
+        mat44[:3, 3] = cam_pos
+        return mat44
+
+    def set_pcd_seed(self, seed):
+        """
+        Seed the voxel / random point cloud downsampling. A separate generator, so taking point clouds
+        does not shift the task's np.random draws.
+        """
+        self.pcd_rng = np.random.default_rng(seed)
+
+    def reset_pose(self, bias=0, random_head_camera_dis=0):
+        """
+        Re-randomize the static camera poses of an already loaded scene, drawing the same random numbers in the
+        same order as load_camera, and move the point cloud crop box to the new table height.
+        """
+        self.pcd_crop_bbox[0][2] += bias - self.table_z_bias
+        self.table_z_bias = bias
+        self.random_head_camera_dis = random_head_camera_dis
+        for camera, camera_info in zip(self.static_camera_list, self.static_camera_info):
+            camera_dis = random_head_camera_dis if camera_info["name"] == "head_camera" else 0
+            camera.entity.set_pose(sapien.Pose(self._sample_camera_pose(camera_info, camera_dis)))
+
+    def _get_cameras(self, camera_names=None) -> list:
+        """
+        (camera_name, camera) pairs of the collected cameras, optionally restricted to `camera_names`.
+        """
+        cameras = []
         if self.collect_wrist_camera:
-            self.left_camera.take_picture()
-            self.right_camera.take_picture()
+            cameras.append(("left_camera", self.left_camera))
+            cameras.append(("right_camera", self.right_camera))
 
-        for camera in self.static_camera_list:
+        for camera, camera_name in zip(self.static_camera_list, self.static_camera_name):
+            if camera_name == "head_camera" and not self.collect_head_camera:
+                continue
+            cameras.append((camera_name, camera))
+
+        if camera_names is not None:
+            available = [camera_name for camera_name, _ in cameras]
+            for camera_name in camera_names:
+                if camera_name not in available:
+                    raise ValueError(f"Camera {camera_name} is not collected, available cameras: {available}")
+            cameras = [(camera_name, camera) for camera_name, camera in cameras if camera_name in camera_names]
+        return cameras
+
+    def update_picture(self, camera_names=None):
+        # camera
+        for _, camera in self._get_cameras(camera_names):
             camera.take_picture()
 
         # ================================= sensor camera =================================
@@ -292,7 +322,7 @@ class Camera:
             self.left_camera.entity.set_pose(left_pose)
             self.right_camera.entity.set_pose(right_pose)
 
-    def get_config(self) -> dict:
+    def get_config(self, camera_names=None) -> dict:
         res = {}
 
         def _get_config(camera):
@@ -305,31 +335,33 @@ class Camera:
                 "cam2world_gl": camera_model_matrix,
             }
 
-        if self.collect_wrist_camera:
-            res["left_camera"] = _get_config(self.left_camera)
-            res["right_camera"] = _get_config(self.right_camera)
-
-        for camera, camera_name in zip(self.static_camera_list, self.static_camera_name):
-            if camera_name == "head_camera":
-                if self.collect_head_camera:
-                    res[camera_name] = _get_config(camera)
-            else:
-                res[camera_name] = _get_config(camera)
+        for camera_name, camera in self._get_cameras(camera_names):
+            res[camera_name] = _get_config(camera)
         # ================================= sensor camera =================================
         # res['head_sensor'] = res['head_camera']
         # print(res)
         return res
 
-    def get_rgb(self) -> dict:
-        rgba = self.get_rgba()
+    def get_rgb(self, camera_names=None, resolution=None, dtype="uint8") -> dict:
+        """
+        resolution: (W, H) to resize to, None keeps the camera resolution
+        dtype: "uint8" in [0, 255] or a float type in [0, 1]
+        """
         rgb = {}
-        for camera_name, camera_data in rgba.items():
+        for camera_name, camera in self._get_cameras(camera_names):
+            camera_rgb = camera.get_picture("Color")[:, :, :3]  # Exclude alpha channel
+            if np.dtype(dtype) == np.uint8:
+                camera_rgb = (camera_rgb * 255).clip(0, 255).astype("uint8")
+            else:
+                camera_rgb = camera_rgb.clip(0, 1).astype(dtype)
+            if resolution is not None and tuple(resolution) != (camera_rgb.shape[1], camera_rgb.shape[0]):
+                camera_rgb = cv2.resize(camera_rgb, tuple(resolution), interpolation=cv2.INTER_LINEAR)
             rgb[camera_name] = {}
-            rgb[camera_name]["rgb"] = camera_data["rgba"][:, :, :3]  # Exclude alpha channel
+            rgb[camera_name]["rgb"] = camera_rgb
         return rgb
     
     # Get Camera RGBA
-    def get_rgba(self) -> dict:
+    def get_rgba(self, camera_names=None) -> dict:
 
         def _get_rgba(camera):
             camera_rgba = camera.get_picture("Color")
@@ -344,20 +376,9 @@ class Camera:
 
         res = {}
 
-        if self.collect_wrist_camera:
-            res["left_camera"] = {}
-            res["right_camera"] = {}
-            res["left_camera"]["rgba"] = _get_rgba(self.left_camera)
-            res["right_camera"]["rgba"] = _get_rgba(self.right_camera)
-
-        for camera, camera_name in zip(self.static_camera_list, self.static_camera_name):
-            if camera_name == "head_camera":
-                if self.collect_head_camera:
-                    res[camera_name] = {}
-                    res[camera_name]["rgba"] = _get_rgba(camera)
-            else:
-                res[camera_name] = {}
-                res[camera_name]["rgba"] = _get_rgba(camera)
+        for camera_name, camera in self._get_cameras(camera_names):
+            res[camera_name] = {}
+            res[camera_name]["rgba"] = _get_rgba(camera)
         # ================================= sensor camera =================================
         # res['head_sensor']['rgb'] = _get_sensor_rgba(self.head_sensor)
 
@@ -374,7 +395,7 @@ class Camera:
         return _get_rgb(self.observer_camera)
 
     # Get Camera Segmentation
-    def get_segmentation(self, level="mesh") -> dict:
+    def get_segmentation(self, level="mesh", camera_names=None) -> dict:
 
         def _get_segmentation(camera, level="mesh"):
             # visual_id is the unique id of each visual shape
@@ -392,24 +413,13 @@ class Camera:
             # 'right_camera':{}
         }
 
-        if self.collect_wrist_camera:
-            res["left_camera"] = {}
-            res["right_camera"] = {}
-            res["left_camera"][f"{level}_segmentation"] = _get_segmentation(self.left_camera, level=level)
-            res["right_camera"][f"{level}_segmentation"] = _get_segmentation(self.right_camera, level=level)
-
-        for camera, camera_name in zip(self.static_camera_list, self.static_camera_name):
-            if camera_name == "head_camera":
-                if self.collect_head_camera:
-                    res[camera_name] = {}
-                    res[camera_name][f"{level}_segmentation"] = _get_segmentation(camera, level=level)
-            else:
-                res[camera_name] = {}
-                res[camera_name][f"{level}_segmentation"] = _get_segmentation(camera, level=level)
+        for camera_name, camera in self._get_cameras(camera_names):
+            res[camera_name] = {}
+            res[camera_name][f"{level}_segmentation"] = _get_segmentation(camera, level=level)
         return res
 
     # Get Camera Depth
-    def get_depth(self) -> dict:
+    def get_depth(self, camera_names=None) -> dict:
 
         def _get_depth(camera):
             position = camera.get_picture("Position")
@@ -423,26 +433,12 @@ class Camera:
             return depth
 
         res = {}
-        rgba = self.get_rgba()
+        rgba = self.get_rgba(camera_names)
 
-        if self.collect_wrist_camera:
-            res["left_camera"] = {}
-            res["right_camera"] = {}
-            res["left_camera"]["depth"] = _get_depth(self.left_camera)
-            res["right_camera"]["depth"] = _get_depth(self.right_camera)
-            res["left_camera"]["depth"] *= rgba["left_camera"]["rgba"][:, :, 3] / 255
-            res["right_camera"]["depth"] *= rgba["right_camera"]["rgba"][:, :, 3] / 255
-        
-        for camera, camera_name in zip(self.static_camera_list, self.static_camera_name):
-            if camera_name == "head_camera":
-                if self.collect_head_camera:
-                    res[camera_name] = {}
-                    res[camera_name]["depth"] = _get_depth(camera)
-                    res[camera_name]["depth"] *= rgba[camera_name]["rgba"][:, :, 3] / 255
-            else:
-                res[camera_name] = {}
-                res[camera_name]["depth"] = _get_depth(camera)
-                res[camera_name]["depth"] *= rgba[camera_name]["rgba"][:, :, 3] / 255
+        for camera_name, camera in self._get_cameras(camera_names):
+            res[camera_name] = {}
+            res[camera_name]["depth"] = _get_depth(camera)
+            res[camera_name]["depth"] *= rgba[camera_name]["rgba"][:, :, 3] / 255
         # res['head_sensor']['depth'] = _get_sensor_depth(self.head_sensor)
 
         return res
@@ -488,7 +484,6 @@ class Camera:
 
         return res_pcd
         pcd_array, index = fps(res_pcd[:, :3], 2000)
-        index = index.detach().cpu().numpy()[0]
 
         return pcd_array
 
@@ -532,8 +527,7 @@ class Camera:
             points_color_np = points_color.cpu().numpy()
 
             if point_num > 0:
-                # points_world_np,index = fps(points_world_np,point_num)
-                index = index.detach().cpu().numpy()[0]
+                points_world_np, index = fps(points_world_np, point_num)
                 points_color_np = points_color_np[index, :]
 
             return np.hstack((points_world_np, points_color_np))
@@ -577,7 +571,12 @@ class Camera:
         pcd_array, index = combined_pcd[:, :3], np.array(range(len(combined_pcd)))
 
         if self.pcd_down_sample_num > 0:
-            pcd_array, index = fps(combined_pcd[:, :3], self.pcd_down_sample_num)
-            index = index.detach().cpu().numpy()[0]
+            index = downsample_pcd_indices(
+                combined_pcd[:, :3],
+                self.pcd_down_sample_num,
+                method=self.pcd_downsample_method,
+                voxel_size=self.pcd_voxel_size,
+                rng=self.pcd_rng,
+            )
 
         return combined_pcd[index]
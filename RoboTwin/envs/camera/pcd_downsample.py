@@ -0,0 +1,126 @@
+import numpy as np
+import torch
+
+try:
+    import pytorch3d.ops as torch3d_ops
+except ImportError:
+    torch3d_ops = None
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+PCD_DOWNSAMPLE_METHODS = ["fps", "voxel", "random"]
+
+
+def _fps_numpy(points, num_points, start_idx=0):
+    # squared distances from the per-axis differences, as the numba path and pytorch3d compute them: the expanded
+    # |x|^2 - 2 x.p + |p|^2 cancels in float32 and can flip the argmax between near-equal candidates
+    xyz = np.ascontiguousarray(points.T)
+    indices = np.empty(num_points, dtype=np.int64)
+    min_dis = np.full(len(points), np.inf, dtype=np.float32)
+    dis = np.empty(len(points), dtype=np.float32)
+    axis_dis = np.empty(len(points), dtype=np.float32)
+    farthest = start_idx
+    for i in range(num_points):
+        indices[i] = farthest
+        np.subtract(xyz[0], xyz[0, farthest], out=dis)
+        np.multiply(dis, dis, out=dis)
+        for axis in (1, 2):
+            np.subtract(xyz[axis], xyz[axis, farthest], out=axis_dis)
+            np.multiply(axis_dis, axis_dis, out=axis_dis)
+            dis += axis_dis
+        np.minimum(min_dis, dis, out=min_dis)
+        farthest = int(np.argmax(min_dis))
+    return indices
+
+
+if njit is not None:
+
+    @njit(cache=True)
+    def _fps_numba(points, num_points, start_idx=0):
+        n = points.shape[0]
+        indices = np.empty(num_points, dtype=np.int64)
+        min_dis = np.full(n, np.inf, dtype=np.float32)
+        farthest = start_idx
+        for i in range(num_points):
+            indices[i] = farthest
+            px, py, pz = points[farthest, 0], points[farthest, 1], points[farthest, 2]
+            best, best_dis = 0, np.float32(-1.0)
+            for j in range(n):
+                dx, dy, dz = points[j, 0] - px, points[j, 1] - py, points[j, 2] - pz
+                dis = dx * dx + dy * dy + dz * dz
+                if dis < min_dis[j]:
+                    min_dis[j] = dis
+                if min_dis[j] > best_dis:
+                    best, best_dis = j, min_dis[j]
+            farthest = best
+        return indices
+
+else:
+    _fps_numba = None
+
+
+def fps_indices(points, num_points, use_cuda=True):
+    """
+    Farthest point sampling starting from the first point, the same selection as
+    pytorch3d.ops.sample_farthest_points. Uses pytorch3d on CUDA when available, numba or numpy on CPU.
+    """
+    if torch3d_ops is not None and use_cuda and torch.cuda.is_available():
+        points = torch.from_numpy(np.ascontiguousarray(points)).cuda()
+        _, indices = torch3d_ops.sample_farthest_points(points=points.unsqueeze(0), K=[num_points])
+        return indices.detach().cpu().numpy()[0]
+    points = np.ascontiguousarray(points, dtype=np.float32)
+    if _fps_numba is not None:
+        return _fps_numba(points, num_points)
+    return _fps_numpy(points, num_points)
+
+
+def _fill_indices(indices, point_num, num_points, rng):
+    """
+    Randomly subsample `indices` to `num_points`, or top them up with other points (repeated if there are
+    not enough points).
+    """
+    if len(indices) > num_points:
+        return np.sort(rng.choice(indices, num_points, replace=False))
+    if len(indices) < num_points:
+        rest = np.setdiff1d(np.arange(point_num), indices)
+        if len(rest) == 0:
+            rest = np.arange(point_num)
+        extra = rng.choice(rest, num_points - len(indices), replace=len(rest) < num_points - len(indices))
+        return np.sort(np.concatenate([indices, extra]))
+    return indices
+
+
+def voxel_indices(points, num_points, voxel_size=0.005, rng=None):
+    """
+    One random point per occupied voxel of edge `voxel_size`, subsampled or topped up to `num_points`.
+    """
+    rng = np.random.default_rng(0) if rng is None else rng
+    order = rng.permutation(len(points))
+    voxels = np.floor(points[order] / voxel_size).astype(np.int64)
+    voxels -= voxels.min(axis=0)
+    dims = voxels.max(axis=0) + 1
+    keys = (voxels[:, 0] * dims[1] + voxels[:, 1]) * dims[2] + voxels[:, 2]
+    _, first = np.unique(keys, return_index=True)
+    return _fill_indices(np.sort(order[first]), len(points), num_points, rng)
+
+
+def random_indices(points, num_points, rng=None):
+    rng = np.random.default_rng(0) if rng is None else rng
+    return np.sort(rng.choice(len(points), num_points, replace=len(points) < num_points))
+
+
+def downsample_pcd_indices(points, num_points, method="fps", voxel_size=0.005, rng=None, use_cuda=True):
+    """
+    Indices of `num_points` points of `points` ([N, 3]) chosen by `method` ("fps", "voxel" or "random").
+    fps is deterministic, voxel and random are deterministic for a seeded `rng`.
+    """
+    if method == "fps":
+        return fps_indices(points, num_points, use_cuda=use_cuda)
+    if method == "voxel":
+        return voxel_indices(points, num_points, voxel_size=voxel_size, rng=rng)
+    if method == "random":
+        return random_indices(points, num_points, rng=rng)
+    raise ValueError(f"pcd_downsample_method should be one of {PCD_DOWNSAMPLE_METHODS}, got {method}")
@@ -7,6 +7,7 @@ from copy import deepcopy
 
 
 class place_burger_fries(Base_Task):
+    success_requires_open_grippers = True
 
     def setup_demo(self, **kwags):
         super()._init_task_env_(**kwags)
@@ -6,6 +6,7 @@ from ._GLOBAL_CONFIGS import *
 
 
 class place_dual_shoes(Base_Task):
+    success_requires_open_grippers = True
 
     def setup_demo(self, is_test=False, **kwags):
         super()._init_task_env_(table_height_bias=-0.1, **kwags)
@@ -4,6 +4,7 @@ import sapien
 
 
 class place_empty_cup(Base_Task):
+    success_requires_open_grippers = True
 
     def setup_demo(self, **kwags):
         super()._init_task_env_(**kwags)
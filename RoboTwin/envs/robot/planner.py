@@ -432,3 +432,23 @@ class MplibPlanner:
         res["per_step"] = per_step  # dis per step
         res["result"] = vals
         return res
+
+    def interpolate_small_move(self, path, step=1 / 250):
+        """
+        Timing for a joint move too small to be worth TOPP: straight line in joint space over the duration of
+        a triangular velocity profile at the joint acceleration limits. Returns (times, pos, vel, acc, duration)
+        like TOPP.
+        """
+        path = np.asarray(path, dtype=np.float64)
+        delta = path[-1] - path[0]
+        acc_limits = np.asarray(getattr(self.planner, "joint_acc_limits", []), dtype=np.float64).reshape(-1)
+        if len(acc_limits) < len(delta):
+            acc_limits = np.ones_like(delta)
+        acc_limits = acc_limits[:len(delta)]
+        duration = np.max(2 * np.sqrt(np.abs(delta) / np.maximum(acc_limits, 1e-6)))
+        n_step = max(1, int(np.ceil(duration / step)))
+        times = np.arange(1, n_step + 1) * step
+        pos = path[0] + np.outer(np.arange(1, n_step + 1) / n_step, delta)
+        vel = np.tile(delta / (n_step * step), (n_step, 1))
+        acc = np.zeros_like(pos)
+        return times, pos, vel, acc, n_step * step
@@ -9,6 +9,7 @@ import yaml
 import os
 import transforms3d as t3d
 from copy import deepcopy
+from collections import OrderedDict
 import sapien.core as sapien
 import envs._GLOBAL_CONFIGS as CONFIGS
 from envs.utils import transforms
@@ -16,11 +17,66 @@ from .planner import CuroboPlanner
 import torch.multiprocessing as mp
 
 
+class PlanCache:
+    """
+    LRU cache of planner results.
+
+    Keys hold the start qpos and target poses rounded to `decimals` (the curobo planner rounds the start joints
+    to 5 decimals itself), the constraint pose, the planner config and the scene revision, so a result is only
+    reused for the same planning problem in an unchanged scene. Results are copied in and out.
+    """
+
+    def __init__(self, max_size=256, decimals=5):
+        self.max_size = max_size
+        self.decimals = decimals
+        self.entries = OrderedDict()
+        self.hit_num = 0
+        self.miss_num = 0
+
+    def _quantize(self, value):
+        if isinstance(value, sapien.Pose):
+            value = list(value.p) + list(value.q)
+        if isinstance(value, (list, tuple, np.ndarray)):
+            return tuple(self._quantize(item) for item in value)
+        if isinstance(value, (float, np.floating)):
+            return round(float(value), self.decimals)
+        if isinstance(value, np.integer):
+            return int(value)
+        return value
+
+    def make_key(self, *parts):
+        return self._quantize(parts)
+
+    def get(self, key):
+        if key not in self.entries:
+            self.miss_num += 1
+            return None
+        self.hit_num += 1
+        self.entries.move_to_end(key)
+        return deepcopy(self.entries[key])
+
+    def put(self, key, result):
+        if self.max_size <= 0:
+            return
+        self.entries[key] = deepcopy(result)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def summary(self):
+        lookup_num = self.hit_num + self.miss_num
+        hit_rate = self.hit_num / lookup_num if lookup_num > 0 else 0.0
+        return f"plan cache: {self.hit_num} / {lookup_num} hits ({hit_rate:.1%}), {len(self.entries)} entries"
+
+
 class Robot:
 
     def __init__(self, scene, need_topp=False, **kwargs):
         super().__init__()
         ta.setup_logging("CRITICAL")  # hide logging
+        self.plan_cache = PlanCache(max_size=kwargs.get("plan_cache_size", 256))
+        self.scene_revision = 0
+        self._scene_signature = None
         self._init_robot_(scene, need_topp, **kwargs)
 
     def _init_robot_(self, scene, need_topp=False, **kwargs):
@@ -29,6 +85,7 @@ class Robot:
 
         self.left_js = None
         self.right_js = None
+        self.scene = scene
 
         left_embodiment_args = kwargs["left_embodiment_config"]
         right_embodiment_args = kwargs["right_embodiment_config"]
@@ -120,10 +177,11 @@ class Robot:
 
         self.left_entity.set_root_pose(self.left_entity_origion_pose)
         self.right_entity.set_root_pose(self.right_entity_origion_pose)
+        # joint state right after loading, restored by reset_state when the scene is reused
+        self.left_init_qpos = self.left_entity.get_qpos()
+        self.right_init_qpos = self.right_entity.get_qpos()
 
-    def reset(self, scene, need_topp=False, **kwargs):
-        self._init_robot_(scene, need_topp, **kwargs)
-
+    def _reset_planner_process(self):
         if self.communication_flag:
             if hasattr(self, "left_conn") and self.left_conn:
                 self.left_conn.send({"cmd": "reset"})
@@ -131,12 +189,39 @@ class Robot:
             if hasattr(self, "right_conn") and self.right_conn:
                 self.right_conn.send({"cmd": "reset"})
                 _ = self.right_conn.recv()
+
+    def reset(self, scene, need_topp=False, **kwargs):
+        self._init_robot_(scene, need_topp, **kwargs)
+
+        if self.communication_flag:
+            self._reset_planner_process()
         else:
             if not isinstance(self.left_planner, CuroboPlanner) or not isinstance(self.right_planner, CuroboPlanner):
                 self.set_planner(scene=scene)
 
         self.init_joints()
 
+    def reset_state(self):
+        """
+        Put the already loaded robot back into its state right after loading (root pose, joint positions,
+        velocities and drive targets) without reloading the URDF or the planners.
+        """
+        self.left_js = None
+        self.right_js = None
+        entities = [(self.left_entity, self.left_entity_origion_pose, self.left_init_qpos)]
+        if self.right_entity is not self.left_entity:
+            entities.append((self.right_entity, self.right_entity_origion_pose, self.right_init_qpos))
+        for entity, origin_pose, init_qpos in entities:
+            entity.set_root_pose(origin_pose)
+            entity.set_qpos(init_qpos)
+            entity.set_qvel(np.zeros_like(init_qpos))
+            for joint in entity.get_active_joints():
+                joint.set_drive_target(0)
+                joint.set_drive_velocity_target(0)
+        self.left_gripper_val = 0.0
+        self.right_gripper_val = 0.0
+        self._reset_planner_process()
+
     def get_grasp_perfect_direction(self, arm_tag):
         if arm_tag == "left":
             return self.left_perfect_direction
@@ -320,7 +405,25 @@ class Robot:
                 scene,
             )
 
+    def get_scene_revision(self):
+        """
+        Counter that increments whenever actors are added to or removed from the scene, or the planners' point
+        cloud changes. Part of every plan cache key.
+        """
+        entities = self.scene.entities
+        signature = (len(entities), max((entity.global_id for entity in entities), default=-1))
+        if signature != self._scene_signature:
+            self._scene_signature = signature
+            self.scene_revision += 1
+        return self.scene_revision
+
+    def _plan_cache_key(self, cmd, arm_tag, now_qpos, target, constraint_pose):
+        yml_path = self.left_curobo_yml_path if arm_tag == "left" else self.right_curobo_yml_path
+        return self.plan_cache.make_key(cmd, arm_tag, yml_path, self.get_scene_revision(), now_qpos, target,
+                                        constraint_pose)
+
     def update_world_pcd(self, world_pcd):
+        self.scene_revision += 1
         try:
             self.left_planner.update_point_cloud(world_pcd, resolution=0.02)
             self.right_planner.update_point_cloud(world_pcd, resolution=0.02)
@@ -370,6 +473,11 @@ class Robot:
         for i in range(len(target_lst_copy)):
             target_lst_copy[i] = self._trans_from_gripper_to_endlink(target_lst_copy[i], arm_tag="left")
 
+        cache_key = self._plan_cache_key("plan_batch", "left", now_qpos, target_lst_copy, constraint_pose)
+        result = self.plan_cache.get(cache_key)
+        if result is not None:
+            return result
+
         if self.communication_flag:
             self.left_conn.send({
                 "cmd": "plan_batch",
@@ -378,14 +486,16 @@ class Robot:
                 "constraint_pose": constraint_pose,
                 "arms_tag": "left",
             })
-            return self.left_conn.recv()
+            result = self.left_conn.recv()
         else:
-            return self.left_planner.plan_batch(
+            result = self.left_planner.plan_batch(
                 now_qpos,
                 target_lst_copy,
                 constraint_pose=constraint_pose,
                 arms_tag="left",
             )
+        self.plan_cache.put(cache_key, result)
+        return result
 
     def right_plan_multi_path(
         self,
@@ -405,6 +515,11 @@ class Robot:
         for i in range(len(target_lst_copy)):
             target_lst_copy[i] = self._trans_from_gripper_to_endlink(target_lst_copy[i], arm_tag="right")
 
+        cache_key = self._plan_cache_key("plan_batch", "right", now_qpos, target_lst_copy, constraint_pose)
+        result = self.plan_cache.get(cache_key)
+        if result is not None:
+            return result
+
         if self.communication_flag:
             self.right_conn.send({
                 "cmd": "plan_batch",
@@ -413,14 +528,63 @@ class Robot:
                 "constraint_pose": constraint_pose,
                 "arms_tag": "right",
             })
-            return self.right_conn.recv()
+            result = self.right_conn.recv()
         else:
-            return self.right_planner.plan_batch(
+            result = self.right_planner.plan_batch(
                 now_qpos,
                 target_lst_copy,
                 constraint_pose=constraint_pose,
                 arms_tag="right",
             )
+        self.plan_cache.put(cache_key, result)
+        return result
+
+    def plan_multi_path_groups(self, target_lsts, arm_tag, constraint_pose=None, last_qpos=None):
+        """
+        left/right_plan_multi_path for several target lists at once: one message to the planner process and one
+        pose conversion pass. Every list is still planned as its own batch (the batch planner is warmed up for
+        ROTATE_NUM poses), so each result equals what left/right_plan_multi_path returns for that list.
+        """
+        arm_tag = "left" if arm_tag == "left" else "right"
+        if constraint_pose is not None:
+            constraint_pose = self.get_constraint_pose(constraint_pose, arm_tag=arm_tag)
+        if last_qpos is None:
+            now_qpos = (self.left_entity if arm_tag == "left" else self.right_entity).get_qpos()
+        else:
+            now_qpos = deepcopy(last_qpos)
+        target_pose_lists = [[self._trans_from_gripper_to_endlink(target_pose, arm_tag=arm_tag)
+                              for target_pose in target_lst] for target_lst in target_lsts]
+
+        # same cache entries as left/right_plan_multi_path, only the missing lists are planned
+        cache_keys = [
+            self._plan_cache_key("plan_batch", arm_tag, now_qpos, target_pose_list, constraint_pose)
+            for target_pose_list in target_pose_lists
+        ]
+        results = [self.plan_cache.get(cache_key) for cache_key in cache_keys]
+        missing = [i for i in range(len(results)) if results[i] is None]
+        if len(missing) == 0:
+            return results
+
+        if self.communication_flag:
+            conn = self.left_conn if arm_tag == "left" else self.right_conn
+            conn.send({
+                "cmd": "plan_batch_groups",
+                "qpos": now_qpos,
+                "target_pose_lists": [target_pose_lists[i] for i in missing],
+                "constraint_pose": constraint_pose,
+                "arms_tag": arm_tag,
+            })
+            planned = conn.recv()
+        else:
+            planner = self.left_planner if arm_tag == "left" else self.right_planner
+            planned = [
+                planner.plan_batch(now_qpos, target_pose_lists[i], constraint_pose=constraint_pose, arms_tag=arm_tag)
+                for i in missing
+            ]
+        for i, result in zip(missing, planned):
+            self.plan_cache.put(cache_keys[i], result)
+            results[i] = result
+        return results
 
     def left_plan_path(
         self,
@@ -439,6 +603,11 @@ class Robot:
 
         trans_target_pose = self._trans_from_gripper_to_endlink(target_pose, arm_tag="left")
 
+        cache_key = self._plan_cache_key("plan_path", "left", now_qpos, trans_target_pose, constraint_pose)
+        result = self.plan_cache.get(cache_key)
+        if result is not None:
+            return result
+
         if self.communication_flag:
             self.left_conn.send({
                 "cmd": "plan_path",
@@ -447,14 +616,16 @@ class Robot:
                 "constraint_pose": constraint_pose,
                 "arms_tag": "left",
             })
-            return self.left_conn.recv()
+            result = self.left_conn.recv()
         else:
-            return self.left_planner.plan_path(
+            result = self.left_planner.plan_path(
                 now_qpos,
                 trans_target_pose,
                 constraint_pose=constraint_pose,
                 arms_tag="left",
             )
+        self.plan_cache.put(cache_key, result)
+        return result
 
     def right_plan_path(
         self,
@@ -473,6 +644,11 @@ class Robot:
 
         trans_target_pose = self._trans_from_gripper_to_endlink(target_pose, arm_tag="right")
 
+        cache_key = self._plan_cache_key("plan_path", "right", now_qpos, trans_target_pose, constraint_pose)
+        result = self.plan_cache.get(cache_key)
+        if result is not None:
+            return result
+
         if self.communication_flag:
             self.right_conn.send({
                 "cmd": "plan_path",
@@ -481,14 +657,16 @@ class Robot:
                 "constraint_pose": constraint_pose,
                 "arms_tag": "right",
             })
-            return self.right_conn.recv()
+            result = self.right_conn.recv()
         else:
-            return self.right_planner.plan_path(
+            result = self.right_planner.plan_path(
                 now_qpos,
                 trans_target_pose,
                 constraint_pose=constraint_pose,
                 arms_tag="right",
             )
+        self.plan_cache.put(cache_key, result)
+        return result
 
     # The data of gripper has been normalized
     def get_left_arm_jointState(self) -> list:
@@ -609,7 +787,32 @@ class Robot:
     def set_arm_joints(self, target_position, target_velocity, arm_tag):
         self._entity_qf(self.left_entity)
         self._entity_qf(self.right_entity)
-
+        self._set_arm_drive(target_position, target_velocity, arm_tag)
+
+    def set_arm_joints_together(self,
+                                left_position=None,
+                                left_velocity=None,
+                                right_position=None,
+                                right_velocity=None,
+                                left_gripper_val=None,
+                                right_gripper_val=None):
+        """
+        Drive targets of both arms and grippers for one physics step, the passive forces are computed once
+        instead of once per set_arm_joints / set_gripper call. None leaves that part unchanged.
+        """
+        self._entity_qf(self.left_entity)
+        if self.right_entity is not self.left_entity:
+            self._entity_qf(self.right_entity)
+        if left_position is not None:
+            self._set_arm_drive(left_position, left_velocity, "left")
+        if right_position is not None:
+            self._set_arm_drive(right_position, right_velocity, "right")
+        if left_gripper_val is not None:
+            self._set_gripper_drive(left_gripper_val, "left")
+        if right_gripper_val is not None:
+            self._set_gripper_drive(right_gripper_val, "right")
+
+    def _set_arm_drive(self, target_position, target_velocity, arm_tag):
         joint_lst = self.left_arm_joints if arm_tag == "left" else self.right_arm_joints
         for j in range(len(joint_lst)):
             joint = joint_lst[j]
@@ -628,6 +831,9 @@ class Robot:
     def set_gripper(self, gripper_val, arm_tag, gripper_eps=0.1):  # gripper_val in [0,1]
         self._entity_qf(self.left_entity)
         self._entity_qf(self.right_entity)
+        self._set_gripper_drive(gripper_val, arm_tag, gripper_eps)
+
+    def _set_gripper_drive(self, gripper_val, arm_tag, gripper_eps=0.1):
         gripper_val = np.clip(gripper_val, 0, 1)
 
         if arm_tag == "left":
@@ -686,6 +892,17 @@ def planner_process_worker(conn, args):
                 )
                 conn.send(result)
 
+            elif msg["cmd"] == "plan_batch_groups":
+                result = [
+                    planner.plan_batch(
+                        msg["qpos"],
+                        target_pose_list,
+                        constraint_pose=msg.get("constraint_pose", None),
+                        arms_tag=msg["arms_tag"],
+                    ) for target_pose_list in msg["target_pose_lists"]
+                ]
+                conn.send(result)
+
             elif msg["cmd"] == "plan_grippers":
                 result = planner.plan_grippers(
                     msg["now_val"],
@@ -5,6 +5,7 @@ from copy import deepcopy
 
 
 class rotate_qrcode(Base_Task):
+    success_requires_open_grippers = True
 
     def setup_demo(self, **kwags):
         super()._init_task_env_(**kwags)
@@ -5,6 +5,7 @@ import math
 
 
 class stack_blocks_two(Base_Task):
+    success_requires_open_grippers = True
 
     def setup_demo(self, **kwags):
         super()._init_task_env_(**kwags)
@@ -8,3 +8,4 @@ from .actor_utils import *
 from .transforms import *
 from .pkl2hdf5 import *
 from .images_to_video import *
+from .hdf5_writer import *
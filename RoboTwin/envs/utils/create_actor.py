@@ -5,6 +5,8 @@ import transforms3d as t3d
 import sapien.physx as sapienp
 import json
 import os, re
+from copy import deepcopy
+from collections import OrderedDict
 
 from .actor_utils import Actor, ArticulationActor
 
@@ -15,6 +17,66 @@ class UnStableError(Exception):
         super().__init__(msg)
 
 
+class ModelCache:
+    """
+    Process-wide LRU cache of what create_actor / create_glb / create_obj read from disk for a model: the parsed
+    model_data json, the scale and the resolved collision / visual files. Keyed by
+    (kind, modelname, model_id, scale, convex), `max_size` 0 disables caching.
+
+    Mesh data is not held here: SAPIEN keeps cooked collision meshes and render meshes cached by file name
+    (see sapien.render.clear_cache), and shapes cannot be shared between entities, so every spawn still builds
+    its own entity from those.
+    """
+
+    def __init__(self, max_size=512):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hit_num = 0
+        self.miss_num = 0
+
+    def get(self, key, load):
+        if key in self.entries:
+            self.hit_num += 1
+            self.entries.move_to_end(key)
+            return deepcopy(self.entries[key])  # tasks may edit actor.config
+        self.miss_num += 1
+        value = load()
+        if self.max_size > 0:
+            self.entries[key] = deepcopy(value)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        self.entries.clear()
+        self.hit_num = 0
+        self.miss_num = 0
+
+    def summary(self):
+        lookup_num = self.hit_num + self.miss_num
+        hit_rate = self.hit_num / lookup_num if lookup_num > 0 else 0.0
+        return f"model cache: {self.hit_num} / {lookup_num} hits ({hit_rate:.1%}), {len(self.entries)} entries"
+
+
+MODEL_CACHE = ModelCache()
+
+
+def _model_cache_key(kind, modelname, model_id, scale, convex):
+    if isinstance(scale, (list, tuple, np.ndarray)):
+        scale = tuple(float(x) for x in scale)
+    return (kind, modelname, model_id, scale, convex)
+
+
+def _load_model_data(json_file_path, scale):
+    try:
+        with open(json_file_path, "r") as file:
+            model_data = json.load(file)
+        scale = model_data["scale"]
+    except:
+        model_data = None
+    return model_data, scale
+
+
 def preprocess(scene, pose: sapien.Pose) -> tuple[sapien.Scene, sapien.Pose]:
     """Add entity to scene. Add bias to z axis if scene is not sapien.Scene."""
     if isinstance(scene, sapien.Scene):
@@ -410,12 +472,10 @@ def create_obj(
         file_name = modeldir / f"textured{model_id}.obj"
         json_file_path = modeldir / f"model_data{model_id}.json"
 
-    try:
-        with open(json_file_path, "r") as file:
-            model_data = json.load(file)
-        scale = model_data["scale"]
-    except:
-        model_data = None
+    model_data, scale = MODEL_CACHE.get(
+        _model_cache_key("obj", modelname, model_id, scale, convex),
+        lambda: _load_model_data(json_file_path, scale),
+    )
 
     builder = scene.create_actor_builder()
     if is_static:
@@ -456,12 +516,10 @@ def create_glb(
         file_name = modeldir / f"base{model_id}.glb"
         json_file_path = modeldir / f"model_data{model_id}.json"
 
-    try:
-        with open(json_file_path, "r") as file:
-            model_data = json.load(file)
-        scale = model_data["scale"]
-    except:
-        model_data = None
+    model_data, scale = MODEL_CACHE.get(
+        _model_cache_key("glb", modelname, model_id, scale, convex),
+        lambda: _load_model_data(json_file_path, scale),
+    )
 
     builder = scene.create_actor_builder()
     if is_static:
@@ -510,33 +568,33 @@ def create_actor(
     scene, pose = preprocess(scene, pose)
     modeldir = Path("assets/objects") / modelname
 
-    if model_id is None:
-        json_file_path = modeldir / "model_data.json"
-    else:
-        json_file_path = modeldir / f"model_data{model_id}.json"
-
-    collision_file = ""
-    visual_file = ""
-    if (modeldir / "collision").exists():
-        collision_file = get_glb_or_obj_file(modeldir / "collision", model_id)
-    if collision_file == "" or not collision_file.exists():
-        collision_file = get_glb_or_obj_file(modeldir, model_id)
-
-    if (modeldir / "visual").exists():
-        visual_file = get_glb_or_obj_file(modeldir / "visual", model_id)
-    if visual_file == "" or not visual_file.exists():
-        visual_file = get_glb_or_obj_file(modeldir, model_id)
-
-    if not collision_file.exists() or not visual_file.exists():
+    def load_model():
+        if model_id is None:
+            json_file_path = modeldir / "model_data.json"
+        else:
+            json_file_path = modeldir / f"model_data{model_id}.json"
+
+        collision_file = ""
+        visual_file = ""
+        if (modeldir / "collision").exists():
+            collision_file = get_glb_or_obj_file(modeldir / "collision", model_id)
+        if collision_file == "" or not collision_file.exists():
+            collision_file = get_glb_or_obj_file(modeldir, model_id)
+
+        if (modeldir / "visual").exists():
+            visual_file = get_glb_or_obj_file(modeldir / "visual", model_id)
+        if visual_file == "" or not visual_file.exists():
+            visual_file = get_glb_or_obj_file(modeldir, model_id)
+
+        if not collision_file.exists() or not visual_file.exists():
+            return None
+        return (*_load_model_data(json_file_path, scale), collision_file, visual_file)
+
+    model = MODEL_CACHE.get(_model_cache_key("actor", modelname, model_id, scale, convex), load_model)
+    if model is None:
         print(modelname, "is not exist model file!")
         return None
-
-    try:
-        with open(json_file_path, "r") as file:
-            model_data = json.load(file)
-        scale = model_data["scale"]
-    except:
-        model_data = None
+    model_data, scale, collision_file, visual_file = model
 
     builder = scene.create_actor_builder()
     if is_static:
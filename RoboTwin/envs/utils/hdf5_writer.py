@@ -0,0 +1,259 @@
+import h5py
+import numpy as np
+import os
+import cv2
+import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .images_to_video import VideoStreamWriter
+
+
+def image_encoding(img):
+    success, encoded_image = cv2.imencode(".jpg", img)
+    if not success:
+        raise ValueError("cv2.imencode failed to encode the image")
+    return encoded_image.tobytes()
+
+
+class EncodedImage:
+    """
+    An rgb frame together with its JPEG bytes, so the writer does not encode it again.
+    """
+    __slots__ = ("raw", "jpeg")
+
+    def __init__(self, raw, jpeg):
+        self.raw = raw
+        self.jpeg = jpeg
+
+
+def encode_images(data: dict) -> dict:
+    """
+    Return a shallow copy of an observation dict with every "rgb" leaf JPEG-encoded.
+    """
+    res = {}
+    for key, value in data.items():
+        if isinstance(value, dict):
+            res[key] = encode_images(value)
+        elif "rgb" in key and not isinstance(value, EncodedImage):
+            raw = np.asarray(value)
+            res[key] = EncodedImage(raw, image_encoding(raw))
+        else:
+            res[key] = value
+    return res
+
+
+class EpisodeWriter:
+    """
+    Write the observations of one episode into an hdf5 file as they are captured.
+
+    The file layout is the same as `pkl_files_to_hdf5_and_video`: one group per dict level and one dataset per leaf,
+    with the frame index as the first axis. Array leaves are appended to chunked, resizable datasets. Leaves whose
+    key contains "rgb" are JPEG-encoded right away; since the fixed-length byte dtype depends on the largest frame,
+    only the (compressed) bytes are kept until `close`. The head camera stream is piped to ffmpeg frame by frame.
+    """
+
+    def __init__(self, hdf5_path, video_path=None, video_key="observation/head_camera/rgb", chunk_bytes=1 << 20):
+        os.makedirs(os.path.dirname(hdf5_path) or ".", exist_ok=True)
+        self.hdf5_path = hdf5_path
+        self.video_path = video_path
+        self.video_key = video_key
+        self.chunk_bytes = chunk_bytes
+
+        self.file = h5py.File(hdf5_path, "w")
+        self.video_writer = (VideoStreamWriter(video_path) if video_path is not None else None)
+        self.leaf_paths = None  # fixed by the first frame
+        self.datasets = {}
+        self.encoded = {}
+        self.empty = {}
+        self.frame_num = 0
+
+    def append(self, data: dict):
+        leaf_paths = []
+        self._append(self.file, data, "", leaf_paths)
+        if self.leaf_paths is None:
+            self.leaf_paths = set(leaf_paths)
+        self.frame_num += 1
+
+    def _append(self, group, data, prefix, leaf_paths):
+        for key, value in data.items():
+            path = prefix + key
+            if isinstance(value, dict):
+                if self.leaf_paths is None:
+                    subgroup = group.require_group(key)
+                elif key in group:
+                    subgroup = group[key]
+                else:
+                    continue
+                self._append(subgroup, value, path + "/", leaf_paths)
+                continue
+
+            # same as parse_dict_structure: the structure of the first frame decides what is stored
+            if self.leaf_paths is not None and path not in self.leaf_paths:
+                continue
+            leaf_paths.append(path)
+
+            if "rgb" in key:
+                if not isinstance(value, EncodedImage):
+                    raw = np.asarray(value)
+                    value = EncodedImage(raw, image_encoding(raw))
+                self.encoded.setdefault(path, []).append(value.jpeg)
+                if self.video_writer is not None and path == self.video_key:
+                    self.video_writer.write(value.raw)
+                continue
+
+            arr = np.asarray(value)
+            if arr.size == 0:
+                shape, dtype, count = self.empty.get(path, (arr.shape, arr.dtype, 0))
+                self.empty[path] = (shape, dtype, count + 1)
+                continue
+
+            if path not in self.datasets:
+                rows = int(np.clip(self.chunk_bytes // max(arr.nbytes, 1), 1, 1024))
+                self.datasets[path] = group.create_dataset(
+                    key,
+                    shape=(0, ) + arr.shape,
+                    maxshape=(None, ) + arr.shape,
+                    chunks=(rows, ) + arr.shape,
+                    dtype=arr.dtype,
+                )
+            dataset = self.datasets[path]
+            n = dataset.shape[0]
+            dataset.resize(n + 1, axis=0)
+            dataset[n] = arr
+
+    def flush(self):
+        if self.file is not None:
+            self.file.flush()
+
+    def close(self):
+        if self.file is None:
+            return
+        for path, encode_data in self.encoded.items():
+            max_len = max(len(jpeg_data) for jpeg_data in encode_data)
+            self.file.create_dataset(path, data=encode_data, dtype=f"S{max_len}")
+        for path, (shape, dtype, count) in self.empty.items():
+            self.file.create_dataset(path, data=np.zeros((count, ) + shape, dtype=dtype))
+        self.file.close()
+        self.file = None
+        self.encoded, self.empty, self.datasets = {}, {}, {}
+
+        if self.video_writer is not None:
+            self.video_writer.close()
+
+    def abort(self):
+        """
+        Drop a partially written episode.
+        """
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        if self.video_writer is not None and self.video_writer.ffmpeg is not None:
+            self.video_writer.ffmpeg.stdin.close()
+            self.video_writer.ffmpeg.wait()
+            self.video_writer.ffmpeg = None
+        for path in (self.hdf5_path, self.video_path):
+            if path is not None and os.path.exists(path):
+                os.remove(path)
+
+
+class AsyncEpisodeWriter:
+    """
+    Take `EpisodeWriter` off the simulation thread.
+
+    `append` hands the raw observation to a pool of encoder threads (cv2 releases the GIL while encoding) and returns.
+    A single writer thread persists the encoded frames in capture order. At most `max_queue` frames are in flight;
+    once the queue is full `append` blocks, and the time spent blocked is counted so the pool can be sized.
+    """
+
+    def __init__(self, writer: EpisodeWriter, num_workers=2, max_queue=8):
+        self.writer = writer
+        self.encoder = ThreadPoolExecutor(max_workers=num_workers, thread_name_prefix="episode_encoder")
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.error = None
+
+        self.num_workers = num_workers
+        self.max_queue = max_queue
+        self.frame_num = 0
+        self.blocked_time = 0.0
+        self.blocked_num = 0
+        self.peak_depth = 0
+        self.depth_sum = 0
+
+        self.thread = threading.Thread(target=self._write_loop, name="episode_writer", daemon=True)
+        self.thread.start()
+
+    @property
+    def hdf5_path(self):
+        return self.writer.hdf5_path
+
+    @property
+    def video_path(self):
+        return self.writer.video_path
+
+    def _write_loop(self):
+        while True:
+            future = self.queue.get()
+            try:
+                if future is None:
+                    return
+                if self.error is None:
+                    self.writer.append(future.result())
+            except Exception as e:
+                self.error = e
+            finally:
+                self.queue.task_done()
+
+    def _raise_error(self):
+        if self.error is not None:
+            raise RuntimeError(f"episode writer failed: {self.error}") from self.error
+
+    def append(self, data: dict):
+        self._raise_error()
+        future = self.encoder.submit(encode_images, data)
+
+        depth = self.queue.qsize()
+        self.depth_sum += depth
+        self.peak_depth = max(self.peak_depth, depth)
+        try:
+            self.queue.put_nowait(future)
+        except queue.Full:
+            st = time.perf_counter()
+            self.queue.put(future)
+            self.blocked_time += time.perf_counter() - st
+            self.blocked_num += 1
+        self.frame_num += 1
+
+    def flush(self):
+        """
+        Barrier: return once every appended frame has been written.
+        """
+        self.queue.join()
+        self._raise_error()
+        self.writer.flush()
+
+    def get_stats(self) -> dict:
+        return {
+            "frame_num": self.frame_num,
+            "num_workers": self.num_workers,
+            "max_queue": self.max_queue,
+            "peak_queue_depth": self.peak_depth,
+            "mean_queue_depth": self.depth_sum / max(self.frame_num, 1),
+            "blocked_num": self.blocked_num,
+            "blocked_time": self.blocked_time,
+        }
+
+    def _stop(self):
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+        self.encoder.shutdown(wait=True)
+
+    def close(self):
+        self.flush()
+        self._stop()
+        self.writer.close()
+
+    def abort(self):
+        self._stop()
+        self.writer.abort()
@@ -6,16 +6,9 @@ import pickle
 import pdb
 
 
-def images_to_video(imgs: np.ndarray, out_path: str, fps: float = 30.0, is_rgb: bool = True) -> None:
-    if (not isinstance(imgs, np.ndarray) or imgs.ndim != 4 or imgs.shape[3] not in (3, 4)):
-        raise ValueError("imgs must be a numpy.ndarray of shape (N, H, W, C), with C equal to 3 or 4.")
+def _open_ffmpeg(out_path: str, W: int, H: int, pixel_format: str, fps: float) -> subprocess.Popen:
     os.makedirs(os.path.dirname(out_path), exist_ok=True)
-    n_frames, H, W, C = imgs.shape
-    if C == 3:
-        pixel_format = "rgb24" if is_rgb else "bgr24"
-    else:
-        pixel_format = "rgba"
-    ffmpeg = subprocess.Popen(
+    return subprocess.Popen(
         [
             "ffmpeg",
             "-y",
@@ -41,6 +34,19 @@ def images_to_video(imgs: np.ndarray, out_path: str, fps: float = 30.0, is_rgb:
         ],
         stdin=subprocess.PIPE,
     )
+
+
+def _get_pixel_format(C: int, is_rgb: bool) -> str:
+    if C == 3:
+        return "rgb24" if is_rgb else "bgr24"
+    return "rgba"
+
+
+def images_to_video(imgs: np.ndarray, out_path: str, fps: float = 30.0, is_rgb: bool = True) -> None:
+    if (not isinstance(imgs, np.ndarray) or imgs.ndim != 4 or imgs.shape[3] not in (3, 4)):
+        raise ValueError("imgs must be a numpy.ndarray of shape (N, H, W, C), with C equal to 3 or 4.")
+    n_frames, H, W, C = imgs.shape
+    ffmpeg = _open_ffmpeg(out_path, W, H, _get_pixel_format(C, is_rgb), fps)
     ffmpeg.stdin.write(imgs.tobytes())
     ffmpeg.stdin.close()
     if ffmpeg.wait() != 0:
@@ -49,3 +55,41 @@ def images_to_video(imgs: np.ndarray, out_path: str, fps: float = 30.0, is_rgb:
     print(
         f"🎬 Video is saved to `{out_path}`, containing \033[94m{n_frames}\033[0m frames at {W}×{H} resolution and {fps} FPS."
     )
+
+
+class VideoStreamWriter:
+    """
+    Feed frames to ffmpeg one by one instead of stacking the whole video in memory.
+    The ffmpeg process is started on the first frame, once the resolution is known.
+    """
+
+    def __init__(self, out_path: str, fps: float = 30.0, is_rgb: bool = True):
+        self.out_path = out_path
+        self.fps = fps
+        self.is_rgb = is_rgb
+        self.ffmpeg = None
+        self.n_frames = 0
+        self.size = None
+
+    def write(self, img: np.ndarray) -> None:
+        if img.ndim != 3 or img.shape[2] not in (3, 4):
+            raise ValueError("img must be a numpy.ndarray of shape (H, W, C), with C equal to 3 or 4.")
+        if self.ffmpeg is None:
+            H, W, C = img.shape
+            self.size = (W, H)
+            self.ffmpeg = _open_ffmpeg(self.out_path, W, H, _get_pixel_format(C, self.is_rgb), self.fps)
+        self.ffmpeg.stdin.write(np.ascontiguousarray(img).tobytes())
+        self.n_frames += 1
+
+    def close(self) -> None:
+        if self.ffmpeg is None:
+            return
+        self.ffmpeg.stdin.close()
+        if self.ffmpeg.wait() != 0:
+            raise IOError(f"Cannot open ffmpeg. Please check the output path and ensure ffmpeg is supported.")
+        self.ffmpeg = None
+
+        W, H = self.size
+        print(
+            f"🎬 Video is saved to `{self.out_path}`, containing \033[94m{self.n_frames}\033[0m frames at {W}×{H} resolution and {self.fps} FPS."
+        )
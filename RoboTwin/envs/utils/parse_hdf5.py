@@ -1,5 +1,28 @@
 import h5py, cv2
 import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+def decode_image(buf):
+    """
+    将一帧字节流解码为图像 (H, W, C), dtype=uint8。
+
+    Args:
+        buf: Python bytes 或 np.ndarray(dtype=uint8)
+    """
+    if isinstance(buf, (bytes, bytearray)):
+        arr = np.frombuffer(buf, dtype=np.uint8)
+    elif isinstance(buf, np.ndarray) and buf.dtype == np.uint8:
+        arr = buf
+    else:
+        raise TypeError(f"Unsupported buffer type: {type(buf)}")
+
+    # 解码成 BGR 图像
+    img = cv2.imdecode(arr, cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError("cv2.imdecode 返回 None，说明字节流可能不是有效的图片格式")
+    return img
 
 
 def parse_img_array(data):
@@ -11,27 +34,8 @@ def parse_img_array(data):
     Returns:
         imgs: np.ndarray of shape (N, H, W, C), dtype=uint8
     """
-    # 确保 data 是可迭代的一维数组
-    flat = data.ravel()
-
-    imgs = []
-    for buf in flat:
-        # buf 可能是 bytes，也可能是 np.ndarray(dtype=uint8)
-        if isinstance(buf, (bytes, bytearray)):
-            arr = np.frombuffer(buf, dtype=np.uint8)
-        elif isinstance(buf, np.ndarray) and buf.dtype == np.uint8:
-            arr = buf
-        else:
-            raise TypeError(f"Unsupported buffer type: {type(buf)}")
-
-        # 解码成 BGR 图像
-        img = cv2.imdecode(arr, cv2.IMREAD_COLOR)
-        if img is None:
-            raise ValueError("cv2.imdecode 返回 None，说明字节流可能不是有效的图片格式")
-        imgs.append(img)
-
-    # 将 list 转成形如 (N, H, W, C) 的 ndarray
-    return np.stack(imgs, axis=0)
+    # 确保 data 是可迭代的一维数组，再逐帧解码，拼成形如 (N, H, W, C) 的 ndarray
+    return np.stack([decode_image(buf) for buf in data.ravel()], axis=0)
 
 
 def h5_to_dict(node):
@@ -52,7 +56,171 @@ def h5_to_dict(node):
     return result
 
 
-def read_hdf5(file_path):
-    with h5py.File(file_path, "r") as f:
-        data_dict = h5_to_dict(f)
+class LazyFrames:
+    """
+    Sliceable view of a JPEG frame dataset, frames are decoded when indexed.
+
+    frames[i] is one (H, W, C) image, frames[a:b], frames[[i, j]] and frames[...] are (N, H, W, C) arrays.
+    Decoded frames go through the episode's LRU cache and, if it has one, its decode thread pool.
+    """
+
+    def __init__(self, episode, path):
+        self.episode = episode
+        self.path = path
+        self.dataset = episode.file[path]
+
+    def __len__(self):
+        return len(self.dataset)
+
+    @property
+    def shape(self):
+        return (len(self), ) + self.episode.decode_frame(self.path, 0).shape if len(self) > 0 else (0, )
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            if index < 0:
+                index += len(self)
+            return self.episode.decode_frame(self.path, int(index))
+        if index is Ellipsis:
+            index = slice(None)
+        ids = np.arange(len(self))[index]
+        return self.episode.decode_frames(self.path, ids)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class LazyEpisode:
+    """
+    Episode hdf5 file opened for reading without loading it.
+
+    `episode[path]` returns a LazyFrames view for "rgb" datasets and the h5py dataset (itself sliceable and read
+    on access) for everything else, e.g. episode["observation/head_camera/rgb"][10:20],
+    episode["joint_action/vector"][:], episode["pointcloud"][5]. `to_numpy()` loads everything like read_hdf5.
+
+    decode_workers > 0 decodes multi-frame slices on a thread pool (cv2 releases the GIL while decoding),
+    `cache_size` bounds the number of decoded frames kept (LRU), 0 disables the cache.
+    """
+
+    def __init__(self, file_path, decode_workers=0, cache_size=64):
+        self.file_path = file_path
+        self.file = h5py.File(file_path, "r")
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.pool = ThreadPoolExecutor(decode_workers) if decode_workers > 0 else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        self.cache.clear()
+
+    def __contains__(self, path):
+        return path in self.file
+
+    def keys(self):
+        return self.file.keys()
+
+    def __getitem__(self, path):
+        item = self.file[path]
+        if isinstance(item, h5py.Dataset) and "rgb" in item.name.split("/")[-1]:
+            return LazyFrames(self, path)
+        return item
+
+    def __len__(self):
+        return len(self.file["joint_action/vector"])
+
+    @property
+    def cameras(self) -> list:
+        if "observation" not in self.file:
+            return []
+        return [name for name, item in self.file["observation"].items() if "rgb" in item]
+
+    def camera(self, name) -> LazyFrames:
+        return self[f"observation/{name}/rgb"]
+
+    @property
+    def joint_action(self) -> h5py.Group:
+        return self.file["joint_action"]
+
+    @property
+    def pointcloud(self) -> h5py.Dataset:
+        return self.file["pointcloud"]
+
+    def _cache_get(self, key):
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return self.cache[key]
+        return None
+
+    def _cache_put(self, key, img):
+        if self.cache_size <= 0:
+            return
+        self.cache[key] = img
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def decode_frame(self, path, idx):
+        img = self._cache_get((path, idx))
+        if img is None:
+            img = decode_image(self.file[path][idx])
+            self._cache_put((path, idx), img)
+        return img
+
+    def decode_frames(self, path, ids):
+        imgs = [self._cache_get((path, int(idx))) for idx in ids]
+        missing = [i for i in range(len(ids)) if imgs[i] is None]
+        if len(missing) > 0:
+            dataset = self.file[path]
+            missing_ids = ids[missing]
+            # h5py fancy indexing needs increasing indices
+            order = np.argsort(missing_ids, kind="stable")
+            unique_ids, inverse = np.unique(missing_ids[order], return_inverse=True)
+            bufs = dataset[unique_ids] if len(unique_ids) < len(dataset) else dataset[()]
+            if self.pool is not None and len(unique_ids) > 1:
+                decoded = list(self.pool.map(decode_image, bufs))
+            else:
+                decoded = [decode_image(buf) for buf in bufs]
+            for i, k in zip(np.array(missing)[order], inverse):
+                imgs[i] = decoded[k]
+            for idx, img in zip(unique_ids, decoded):
+                self._cache_put((path, int(idx)), img)
+        if len(imgs) == 0:
+            return np.empty((0, ), dtype=np.uint8)
+        return np.stack(imgs, axis=0)
+
+    def to_numpy(self) -> dict:
+        """
+        Everything in the file as nested dicts of numpy arrays with decoded images, the same as read_hdf5.
+        """
+        return self._to_numpy(self.file)
+
+    def _to_numpy(self, node):
+        result = {}
+        for name, item in node.items():
+            if isinstance(item, h5py.Dataset):
+                if "rgb" in name:
+                    result[name] = LazyFrames(self, item.name)[...]
+                else:
+                    result[name] = item[()]
+            elif isinstance(item, h5py.Group):
+                result[name] = self._to_numpy(item)
+        if hasattr(node, "attrs") and len(node.attrs) > 0:
+            result["_attrs"] = dict(node.attrs)
+        return result
+
+
+def read_hdf5(file_path, decode_workers=0):
+    with LazyEpisode(file_path, decode_workers=decode_workers, cache_size=0) as episode:
+        data_dict = episode.to_numpy()
     return data_dict
@@ -122,6 +122,15 @@ def check_overlap(radius, x, y, area):
     return dx * dx + dy * dy <= radius * radius
 
 
+def check_overlap_batch(radius, x, y, area):
+    """
+    check_overlap for arrays of candidate positions.
+    """
+    dx = np.where(x <= area[0], area[0] - x, np.where(x < area[2], 0, x - area[2]))
+    dy = np.where(y <= area[1], area[1] - y, np.where(y < area[3], 0, y - area[3]))
+    return dx * dx + dy * dy <= radius * radius
+
+
 def rand_pose_cluttered(
     xlim: np.ndarray,
     ylim: np.ndarray,
@@ -136,7 +145,15 @@ def rand_pose_cluttered(
     z_max=0,
     prohibited_area=None,
     obj_margin=0.005,
+    max_try=100,
+    attempts: list = None,
 ) -> sapien.Pose:
+    """
+    Rejection-sample a free table position: all `max_try` candidates are drawn and tested against the
+    prohibited areas and the placed objects (`size_dict`) at once, the first valid one is taken. The random
+    stream is then rewound and replayed up to that candidate, so the draws (and the resulting scenes) are the
+    same as testing candidates one by one. The number of candidates tried is appended to `attempts`.
+    """
     if len(xlim) < 2 or xlim[1] < xlim[0]:
         xlim = np.array([xlim[0], xlim[0]])
     if len(ylim) < 2 or ylim[1] < ylim[0]:
@@ -144,33 +161,35 @@ def rand_pose_cluttered(
     if len(zlim) < 2 or zlim[1] < zlim[0]:
         zlim = np.array([zlim[0], zlim[0]])
 
-    times = 0
-    while True:
-        times += 1
-        if times > 100:
-            return False, None
-        x = np.random.uniform(xlim[0], xlim[1])
-        y = np.random.uniform(ylim[0], ylim[1])
-        new_obj_radius = obj_radius + obj_margin
-        is_overlap = False
-        for area in prohibited_area:
-            if check_overlap(new_obj_radius, x, y, area):
-                is_overlap = True
-                break
-        if is_overlap:
-            continue
-        distances = np.sqrt((np.array([sub_list[0] for sub_list in size_dict]) - x)**2 +
-                            (np.array([sub_list[1] for sub_list in size_dict]) - y)**2)
-        max_distances = np.array([sub_list[3] + new_obj_radius + obj_margin for sub_list in size_dict])
-
-        if y - new_obj_radius < 0:
-            if z_max > 0.05:
-                continue
-        if (x - new_obj_radius < -0.6 or x + new_obj_radius > 0.6 or y - new_obj_radius < -0.34
-                or y + new_obj_radius > 0.34):
-            continue
-        if np.all(distances > max_distances) and y + new_obj_radius < ylim[1]:
-            break
+    random_state = np.random.get_state()
+    xy = np.random.uniform([xlim[0], ylim[0]], [xlim[1], ylim[1]], size=(max_try, 2))
+    x, y = xy[:, 0], xy[:, 1]
+    new_obj_radius = obj_radius + obj_margin
+
+    valid = np.ones(max_try, dtype=bool)
+    for area in prohibited_area:
+        valid &= ~check_overlap_batch(new_obj_radius, x, y, area)
+    if len(size_dict) > 0:
+        placed = np.array([sub_list[:4] for sub_list in size_dict], dtype=np.float64)
+        distances = np.sqrt((placed[None, :, 0] - x[:, None])**2 + (placed[None, :, 1] - y[:, None])**2)
+        max_distances = placed[:, 3] + new_obj_radius + obj_margin
+        valid &= np.all(distances > max_distances[None, :], axis=1)
+    if z_max > 0.05:
+        valid &= ~(y - new_obj_radius < 0)
+    valid &= ~((x - new_obj_radius < -0.6) | (x + new_obj_radius > 0.6) | (y - new_obj_radius < -0.34)
+               | (y + new_obj_radius > 0.34))
+    valid &= y + new_obj_radius < ylim[1]
+
+    if not valid.any():
+        if attempts is not None:
+            attempts.append(max_try)
+        return False, None
+    idx = int(np.argmax(valid))
+    if attempts is not None:
+        attempts.append(idx + 1)
+    np.random.set_state(random_state)
+    np.random.uniform(size=2 * (idx + 1))  # consume the draws of the candidates up to the accepted one
+    x, y = xy[idx]
 
     z = np.random.uniform(zlim[0], zlim[1])
     z = z - z_offset
@@ -207,6 +226,7 @@ def rand_create_cluttered_actor(
     z_max=0,
     fix_root_link=True,
     prohibited_area=None,
+    attempts: list = None,
 ) -> tuple[bool, Actor | None]:
 
     if qpos is None:
@@ -229,6 +249,7 @@ def rand_create_cluttered_actor(
         z_offset=z_offset,
         z_max=z_max,
         prohibited_area=prohibited_area,
+        attempts=attempts,
     )
 
     if not success:
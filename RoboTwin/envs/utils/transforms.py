@@ -528,3 +528,18 @@ def get_face_prod(q, local_axis, target_axis):
     face = q_mat @ np.array(local_axis).reshape(3, 1)
     face_prod = np.dot(face.reshape(3), np.array(target_axis))
     return face_prod
+
+
+def interpolate_gripper_path(gripper_path, n_step):
+    """
+    Spread `n_step` steps over the segments of `gripper_path` (earlier segments get the remainder) and
+    interpolate linearly inside each one, excluding the segment start. Returns an array of length `n_step`.
+    """
+    gripper_path = np.asarray(gripper_path, dtype=np.float64)
+    seg_num = len(gripper_path) - 1
+    seg_steps = n_step // seg_num + (np.arange(seg_num) < n_step % seg_num)
+    seg_id = np.repeat(np.arange(seg_num), seg_steps)
+    # 1-based index of every step inside its segment
+    seg_pos = np.arange(n_step) - np.repeat(np.cumsum(seg_steps) - seg_steps, seg_steps) + 1
+    seg_start, seg_end = gripper_path[seg_id], gripper_path[seg_id + 1]
+    return seg_start + (seg_end - seg_start) * (seg_pos / seg_steps[seg_id])
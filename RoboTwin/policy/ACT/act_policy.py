@@ -3,6 +3,7 @@ import os
 import torch
 import numpy as np
 import pickle
+from collections import deque
 from torch.nn import functional as F
 import torchvision.transforms as transforms
 
@@ -132,6 +133,7 @@ class ACT:
             print(f"Temporal aggregation enabled with {self.num_queries} queries")
 
         self.t = 0  # Current timestep
+        self.env_states = {}  # env_id -> timestep / action chunks, for batched evaluation
 
         # Load statistics for normalization
         ckpt_dir = args_override.get("ckpt_dir", "")
@@ -216,4 +218,60 @@ class ACT:
         action = self.post_process(raw_action)
 
         self.t += 1
-        return action
\ No newline at end of file
+        return action
+
+    def reset_env_state(self, env_id):
+        """Per-env timestep and action chunks for batched evaluation."""
+        self.env_states[env_id] = {
+            "t": 0,
+            "all_actions": None,
+            # (query timestep, action chunk) of the chunks still covering the current step
+            "chunks": deque(maxlen=self.num_queries),
+        }
+
+    def get_action_batch(self, observations: dict) -> dict:
+        """
+        observations: {env_id: encoded observation}
+        Envs due for a query share one policy call; returns {env_id: action of shape (1, action_dim)}.
+        """
+        for env_id in observations:
+            if env_id not in self.env_states:
+                self.reset_env_state(env_id)
+
+        query_ids = [env_id for env_id in observations if self.env_states[env_id]["t"] % self.query_frequency == 0]
+        if len(query_ids) > 0:
+            qpos = np.stack([self.pre_process(np.array(observations[env_id]["qpos"])) for env_id in query_ids])
+            qpos = torch.from_numpy(qpos).float().to(self.device)
+            camera_names = ["head_cam", "left_cam", "right_cam"]
+            curr_image = np.stack([
+                np.stack([observations[env_id][cam_name] for cam_name in camera_names], axis=0)
+                for env_id in query_ids
+            ])
+            curr_image = torch.from_numpy(curr_image).float().to(self.device)
+
+            with torch.no_grad():
+                all_actions = self.policy(qpos, curr_image)
+            for i, env_id in enumerate(query_ids):
+                state = self.env_states[env_id]
+                state["all_actions"] = all_actions[i:i + 1]
+                if self.temporal_agg:
+                    state["chunks"].append((state["t"], all_actions[i:i + 1]))
+
+        actions = {}
+        for env_id in observations:
+            state = self.env_states[env_id]
+            t = state["t"]
+            if self.temporal_agg:
+                # same weighting as get_action, oldest chunk first
+                actions_for_curr_step = torch.cat([chunk[:, t - query_t] for query_t, chunk in state["chunks"]])
+                k = 0.01
+                exp_weights = np.exp(-k * np.arange(len(actions_for_curr_step)))
+                exp_weights = exp_weights / exp_weights.sum()
+                exp_weights = (torch.from_numpy(exp_weights).to(self.device).unsqueeze(dim=1))
+                raw_action = (actions_for_curr_step * exp_weights).sum(dim=0, keepdim=True)
+            else:
+                raw_action = state["all_actions"][:, t % self.query_frequency]
+
+            actions[env_id] = self.post_process(raw_action.cpu().numpy())
+            state["t"] += 1
+        return actions
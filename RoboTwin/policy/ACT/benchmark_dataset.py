@@ -0,0 +1,69 @@
+"""
+Startup time and sampling throughput of the ACT EpisodicDataset.
+
+Times the normalization stats with and without the sidecar (norm_stats_cache.pkl in the dataset dir), then
+samples/sec through the training dataloader when reading every remaining action of the episode (the previous
+behaviour) and when reading only chunk_size actions.
+
+    python benchmark_dataset.py sim-beat_block_hammer-demo_clean-50 --chunk-size 50
+"""
+import os
+import time
+import json
+from argparse import ArgumentParser
+
+from torch.utils.data import DataLoader
+
+from utils import EpisodicDataset, get_cached_norm_stats
+
+
+def samples_per_sec(dataset, batch_size, batches, num_workers):
+    dataloader = DataLoader(dataset, batch_size=batch_size, shuffle=True, num_workers=num_workers)
+    n_samples = 0
+    st = time.perf_counter()
+    while n_samples < batches * batch_size:
+        for batch in dataloader:
+            n_samples += len(batch[0])
+            if n_samples >= batches * batch_size:
+                break
+    return n_samples / (time.perf_counter() - st)
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("task_name", type=str, help="task in SIM_TASK_CONFIGS.json")
+    parser.add_argument("--chunk-size", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--batches", type=int, default=50)
+    parser.add_argument("--num-workers", type=int, default=1)
+    usr_args = parser.parse_args()
+
+    with open("./SIM_TASK_CONFIGS.json", "r") as f:
+        task_config = json.load(f)[usr_args.task_name]
+    dataset_dir, num_episodes = task_config["dataset_dir"], task_config["num_episodes"]
+
+    cache_path = os.path.join(dataset_dir, "norm_stats_cache.pkl")
+    if os.path.exists(cache_path):
+        os.remove(cache_path)
+    for name in ["norm stats (no sidecar)", "norm stats (sidecar)"]:
+        st = time.perf_counter()
+        norm_stats, max_action_len, episode_lens = get_cached_norm_stats(dataset_dir, num_episodes)
+        print(f"{name:>26}: {time.perf_counter() - st:8.3f} s")
+
+    episode_ids = list(range(num_episodes))
+    for name, chunk_size in [("all actions", None), (f"{usr_args.chunk_size} actions", usr_args.chunk_size)]:
+        dataset = EpisodicDataset(
+            episode_ids,
+            dataset_dir,
+            task_config["camera_names"],
+            norm_stats,
+            max_action_len,
+            chunk_size=chunk_size,
+            episode_lens=episode_lens,
+        )
+        speed = samples_per_sec(dataset, usr_args.batch_size, usr_args.batches, usr_args.num_workers)
+        print(f"{name:>26}: {speed:8.1f} samples / s")
+
+
+if __name__ == "__main__":
+    main()
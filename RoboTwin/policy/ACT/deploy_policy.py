@@ -11,6 +11,12 @@ from .act_policy import ACT
 import copy
 from argparse import Namespace
 
+# only render / fetch what encode_obs consumes
+OBS_SPEC = {
+    "cameras": ["head_camera", "left_camera", "right_camera"],
+    "data_type": {"rgb": True, "qpos": True},
+}
+
 def encode_obs(observation):
     head_cam = cv2.resize(observation["observation"]["head_camera"]["rgb"], (640, 480), interpolation=cv2.INTER_LINEAR)
     left_cam = cv2.resize(observation["observation"]["left_camera"]["rgb"], (640, 480), interpolation=cv2.INTER_LINEAR)
@@ -37,13 +43,24 @@ def eval(TASK_ENV, model, observation):
 
     # Get action from model
     actions = model.get_action(obs)
-    for action in actions:
-        TASK_ENV.take_action(action)
-        observation = TASK_ENV.get_obs()
-    return observation
+    observations = TASK_ENV.take_action_chunk(actions, obs_every=len(actions))
+    return list(observations.values())[-1]
+
+
+def eval_batch(TASK_ENVS, model, observations):
+    """
+    TASK_ENVS: VectorTaskEnv (script/vector_env.py), step the envs with `TASK_ENVS.take_actions`
+    observations: {env_id: observation} of the envs that need an action
+    """
+    obs = {env_id: encode_obs(observation) for env_id, observation in observations.items()}
+    actions = model.get_action_batch(obs)
+    TASK_ENVS.take_actions(actions)
 
 
-def reset_model(model):
+def reset_model(model, env_id=None):
+    if env_id is not None:
+        model.reset_env_state(env_id)
+        return
     # Reset temporal aggregation state if enabled
     if model.temporal_agg:
         model.all_time_actions = torch.zeros([
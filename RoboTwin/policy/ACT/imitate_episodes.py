@@ -121,7 +121,7 @@ def main(args):
         exit()
 
     train_dataloader, val_dataloader, stats, _ = load_data(dataset_dir, num_episodes, camera_names, batch_size_train,
-                                                           batch_size_val)
+                                                           batch_size_val, chunk_size=policy_config["num_queries"])
 
     # save dataset stats
     if not os.path.isdir(ckpt_dir):
@@ -2,6 +2,7 @@ import numpy as np
 import torch
 import os
 import h5py
+import pickle
 from torch.utils.data import TensorDataset, DataLoader
 
 import IPython
@@ -11,49 +12,75 @@ e = IPython.embed
 
 class EpisodicDataset(torch.utils.data.Dataset):
 
-    def __init__(self, episode_ids, dataset_dir, camera_names, norm_stats, max_action_len):
+    def __init__(self, episode_ids, dataset_dir, camera_names, norm_stats, max_action_len, chunk_size=None,
+                 episode_lens=None):
         super(EpisodicDataset).__init__()
         self.episode_ids = episode_ids
         self.dataset_dir = dataset_dir
         self.camera_names = camera_names
         self.norm_stats = norm_stats
         self.max_action_len = max_action_len
+        # the policy only trains on the first chunk_size actions, there is no need to read the rest
+        self.action_len = max_action_len if chunk_size is None else min(chunk_size, max_action_len)
+        self.episode_lens = episode_lens
         self.is_sim = None
+        self._files, self._files_pid = {}, None
         self.__getitem__(0)  # initialize self.is_sim
+        self.close()  # do not hand open files to forked dataloader workers
 
     def __len__(self):
         return len(self.episode_ids)
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_files"], state["_files_pid"] = {}, None
+        return state
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+        self._files, self._files_pid = {}, None
+
+    def _file(self, episode_id):
+        # handles are opened lazily in each dataloader worker, never shared across a fork
+        if self._files_pid != os.getpid():
+            self._files, self._files_pid = {}, os.getpid()
+        if episode_id not in self._files:
+            dataset_path = os.path.join(self.dataset_dir, f"episode_{episode_id}.hdf5")
+            self._files[episode_id] = h5py.File(dataset_path, "r")
+        return self._files[episode_id]
+
     def __getitem__(self, index):
         sample_full_episode = False
 
         episode_id = self.episode_ids[index]
-        dataset_path = os.path.join(self.dataset_dir, f"episode_{episode_id}.hdf5")
-        with h5py.File(dataset_path, "r") as root:
-            is_sim = None
-            original_action_shape = root["/action"].shape
-            episode_len = original_action_shape[0]
-            if sample_full_episode:
-                start_ts = 0
-            else:
-                start_ts = np.random.choice(episode_len)
-            # get observation at start_ts only
-            qpos = root["/observations/qpos"][start_ts]
-            image_dict = dict()
-            for cam_name in self.camera_names:
-                image_dict[cam_name] = root[f"/observations/images/{cam_name}"][start_ts]
-            # get all actions after and including start_ts
-            if is_sim:
-                action = root["/action"][start_ts:]
-                action_len = episode_len - start_ts
-            else:
-                action = root["/action"][max(0, start_ts - 1):]  # hack, to make timesteps more aligned
-                action_len = episode_len - max(0, start_ts - 1)  # hack, to make timesteps more aligned
+        root = self._file(episode_id)
+        is_sim = None
+        if self.episode_lens is not None:
+            episode_len = self.episode_lens[episode_id]
+        else:
+            episode_len = root["/action"].shape[0]
+        if sample_full_episode:
+            start_ts = 0
+        else:
+            start_ts = np.random.choice(episode_len)
+        # get observation at start_ts only
+        qpos = root["/observations/qpos"][start_ts]
+        image_dict = dict()
+        for cam_name in self.camera_names:
+            image_dict[cam_name] = root[f"/observations/images/{cam_name}"][start_ts]
+        # get the actions after and including start_ts that the policy trains on
+        if is_sim:
+            action_start = start_ts
+        else:
+            action_start = max(0, start_ts - 1)  # hack, to make timesteps more aligned
+        action = root["/action"][action_start:action_start + self.action_len]
+        action_len = len(action)
 
         self.is_sim = is_sim
-        padded_action = np.zeros((self.max_action_len, action.shape[1]), dtype=np.float32)  # 根据max_action_len初始化
+        padded_action = np.zeros((self.action_len, action.shape[1]), dtype=np.float32)  # 根据action_len初始化
         padded_action[:action_len] = action
-        is_pad = np.ones(self.max_action_len, dtype=bool)  # 初始化为全1（True）
+        is_pad = np.ones(self.action_len, dtype=bool)  # 初始化为全1（True）
         is_pad[:action_len] = 0  # 前action_len个位置设置为0（False），表示非填充部分
 
         # new axis for different cameras
@@ -79,7 +106,55 @@ class EpisodicDataset(torch.utils.data.Dataset):
         return image_data, qpos_data, action_data, is_pad
 
 
+def _episode_files_key(dataset_dir, num_episodes):
+    key = []
+    for episode_idx in range(num_episodes):
+        st = os.stat(os.path.join(dataset_dir, f"episode_{episode_idx}.hdf5"))
+        key.append((episode_idx, st.st_mtime_ns, st.st_size))
+    return key
+
+
 def get_norm_stats(dataset_dir, num_episodes):
+    stats, max_action_len, _ = get_cached_norm_stats(dataset_dir, num_episodes)
+    return stats, max_action_len
+
+
+def get_cached_norm_stats(dataset_dir, num_episodes, cache_name="norm_stats_cache.pkl"):
+    """
+    get_norm_stats plus the action length of every episode, read from a sidecar file in `dataset_dir` as long as
+    the episode files keep their mtime and size, and computed (and saved) otherwise.
+    """
+    cache_path = os.path.join(dataset_dir, cache_name)
+    key = _episode_files_key(dataset_dir, num_episodes)
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, "rb") as f:
+                cache = pickle.load(f)
+            if cache["key"] == key:
+                return cache["stats"], cache["max_action_len"], cache["episode_lens"]
+        except (OSError, pickle.UnpicklingError, EOFError, KeyError) as e:
+            print(f"ignoring unreadable {cache_path}: {e}")
+
+    stats, max_action_len, episode_lens = _compute_norm_stats(dataset_dir, num_episodes)
+    try:
+        tmp_path = cache_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(
+                {
+                    "key": key,
+                    "stats": stats,
+                    "max_action_len": max_action_len,
+                    "episode_lens": episode_lens,
+                },
+                f,
+            )
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"could not save {cache_path}: {e}")
+    return stats, max_action_len, episode_lens
+
+
+def _compute_norm_stats(dataset_dir, num_episodes):
     all_qpos_data = []
     all_action_data = []
     for episode_idx in range(num_episodes):
@@ -90,6 +165,8 @@ def get_norm_stats(dataset_dir, num_episodes):
         all_qpos_data.append(torch.from_numpy(qpos))
         all_action_data.append(torch.from_numpy(action))
 
+    episode_lens = [a.size(0) for a in all_action_data]
+
     # Pad all tensors to the maximum size
     max_qpos_len = max(q.size(0) for q in all_qpos_data)
     max_action_len = max(a.size(0) for a in all_action_data)
@@ -133,10 +210,10 @@ def get_norm_stats(dataset_dir, num_episodes):
         "example_qpos": qpos,
     }
 
-    return stats, max_action_len
+    return stats, max_action_len, episode_lens
 
 
-def load_data(dataset_dir, num_episodes, camera_names, batch_size_train, batch_size_val):
+def load_data(dataset_dir, num_episodes, camera_names, batch_size_train, batch_size_val, chunk_size=None):
     print(f"\nData from: {dataset_dir}\n")
     # obtain train test split
     train_ratio = 0.8
@@ -145,11 +222,13 @@ def load_data(dataset_dir, num_episodes, camera_names, batch_size_train, batch_s
     val_indices = shuffled_indices[int(train_ratio * num_episodes):]
 
     # obtain normalization stats for qpos and action
-    norm_stats, max_action_len = get_norm_stats(dataset_dir, num_episodes)
+    norm_stats, max_action_len, episode_lens = get_cached_norm_stats(dataset_dir, num_episodes)
 
     # construct dataset and dataloader
-    train_dataset = EpisodicDataset(train_indices, dataset_dir, camera_names, norm_stats, max_action_len)
-    val_dataset = EpisodicDataset(val_indices, dataset_dir, camera_names, norm_stats, max_action_len)
+    train_dataset = EpisodicDataset(train_indices, dataset_dir, camera_names, norm_stats, max_action_len,
+                                    chunk_size=chunk_size, episode_lens=episode_lens)
+    val_dataset = EpisodicDataset(val_indices, dataset_dir, camera_names, norm_stats, max_action_len,
+                                  chunk_size=chunk_size, episode_lens=episode_lens)
     train_dataloader = DataLoader(
         train_dataset,
         batch_size=batch_size_train,
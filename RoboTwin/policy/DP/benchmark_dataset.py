@@ -0,0 +1,72 @@
+"""
+Startup time, memory and sampling throughput of RobotImageDataset in memory and lazy mode.
+
+Each mode runs in its own process: builds the dataset, then iterates --batches batches through the training
+dataloader.
+
+    python benchmark_dataset.py data/beat_block_hammer-demo_clean-50.zarr --num-workers 4
+"""
+import sys
+import time
+import resource
+import subprocess
+from argparse import ArgumentParser
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_mode(usr_args):
+    from diffusion_policy.dataset.robot_image_dataset import RobotImageDataset
+    from diffusion_policy.workspace.robotworkspace import create_dataloader
+
+    st = time.perf_counter()
+    dataset = RobotImageDataset(
+        usr_args.zarr_path,
+        horizon=usr_args.horizon,
+        pad_before=usr_args.horizon // 2 - 1,
+        pad_after=usr_args.horizon // 2 - 1,
+        batch_size=usr_args.batch_size,
+        lazy=usr_args.mode == "lazy",
+    )
+    startup = time.perf_counter() - st
+    startup_rss = peak_rss_mb()
+
+    dataloader = create_dataloader(
+        dataset,
+        batch_size=usr_args.batch_size,
+        shuffle=True,
+        num_workers=usr_args.num_workers,
+        pin_memory=False,
+        persistent_workers=False,
+    )
+    n_batches = min(usr_args.batches, len(dataloader))
+    st = time.perf_counter()
+    for batch_idx, batch in enumerate(dataloader):
+        if batch_idx + 1 >= n_batches:
+            break
+    samples_per_sec = n_batches * usr_args.batch_size / (time.perf_counter() - st)
+    print(f"{usr_args.mode:>9}: startup {startup:7.2f} s, RSS after startup {startup_rss:8.0f} MB, "
+          f"peak RSS {peak_rss_mb():8.0f} MB, {samples_per_sec:8.0f} samples / s")
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("zarr_path", type=str)
+    parser.add_argument("--batch-size", type=int, default=128)
+    parser.add_argument("--horizon", type=int, default=8)
+    parser.add_argument("--batches", type=int, default=50)
+    parser.add_argument("--num-workers", type=int, default=0)
+    parser.add_argument("--mode", type=str, default=None, choices=["in-memory", "lazy"])
+    usr_args = parser.parse_args()
+
+    if usr_args.mode is not None:
+        run_mode(usr_args)
+        return
+    for mode in ["in-memory", "lazy"]:
+        subprocess.run([sys.executable, __file__, *sys.argv[1:], "--mode", mode], check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,12 @@ import numpy as np
 from .dp_model import DP
 import yaml
 
+# only render / fetch what encode_obs consumes
+OBS_SPEC = {
+    "cameras": ["head_camera", "left_camera", "right_camera"],
+    "data_type": {"rgb": True, "qpos": True},
+}
+
 def encode_obs(observation):
     head_cam = (np.moveaxis(observation["observation"]["head_camera"]["rgb"], -1, 0) / 255)
     left_cam = (np.moveaxis(observation["observation"]["left_camera"]["rgb"], -1, 0) / 255)
@@ -41,11 +47,27 @@ def eval(TASK_ENV, model, observation):
     # ======== Get Action ========
     actions = model.get_action(obs)
 
-    for action in actions:
-        TASK_ENV.take_action(action)
-        observation = TASK_ENV.get_obs()
+    # only the last n_obs_steps observations of the chunk reach the model
+    observations = TASK_ENV.take_action_chunk(actions, obs_indices=range(-model.n_obs_steps, 0))
+    for observation in observations.values():
         obs = encode_obs(observation)
         model.update_obs(obs)
 
-def reset_model(model):
-    model.reset_obs()
+def eval_batch(TASK_ENVS, model, observations):
+    """
+    TASK_ENVS: VectorTaskEnv (script/vector_env.py), step the envs with `TASK_ENVS.take_actions`
+    model: The model from 'get_model()' function
+    observations: {env_id: observation} of the envs that need an action
+    """
+    obs = {env_id: encode_obs(observation) for env_id, observation in observations.items()}
+
+    # ======== Get Action ========
+    actions = model.get_action_batch(obs)
+
+    step_observations = TASK_ENVS.take_actions(actions)
+    for env_id, env_observations in step_observations.items():
+        for observation in env_observations:
+            model.update_obs(encode_obs(observation), env_id=env_id)
+
+def reset_model(model, env_id=None):
+    model.reset_obs(env_id=env_id)
@@ -143,6 +143,30 @@ class ReplayBuffer:
         group = zarr.open(os.path.expanduser(zarr_path), mode)
         return cls.create_from_group(group, **kwargs)
 
+    @classmethod
+    def create_lazy_from_path(cls, zarr_path, keys=None, lazy_keys=(), cache_size=2**30):
+        """
+        Load `keys` to memory except `lazy_keys`, which stay on disk behind a shared
+        LRU cache of `cache_size` bytes of compressed chunks.
+        Reading a slice of a lazy key decompresses only the chunks it covers.
+        """
+        store = zarr.LRUStoreCache(zarr.DirectoryStore(os.path.expanduser(zarr_path)), max_size=cache_size)
+        src_root = zarr.open(store, "r")
+        meta = dict()
+        for key, value in src_root["meta"].items():
+            if len(value.shape) == 0:
+                meta[key] = np.array(value)
+            else:
+                meta[key] = value[:]
+
+        if keys is None:
+            keys = src_root["data"].keys()
+        data = dict()
+        for key in keys:
+            arr = src_root["data"][key]
+            data[key] = arr if key in lazy_keys else arr[:]
+        return cls(root={"meta": meta, "data": data})
+
     # ============= copy constructors ===============
     @classmethod
     def copy_from_store(
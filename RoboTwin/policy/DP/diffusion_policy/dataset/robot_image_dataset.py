@@ -1,6 +1,7 @@
 from typing import Dict
 import numba
 import torch
+import zarr
 import numpy as np
 import copy
 from diffusion_policy.common.pytorch_util import dict_apply
@@ -28,14 +29,25 @@ class RobotImageDataset(BaseImageDataset):
         val_ratio=0.0,
         batch_size=128,
         max_train_episodes=None,
+        lazy=False,
+        lazy_cache_size=2**30,
     ):
 
         super().__init__()
-        self.replay_buffer = ReplayBuffer.copy_from_path(
-            zarr_path,
-            # keys=['head_camera', 'front_camera', 'left_camera', 'right_camera', 'state', 'action'],
-            keys=["head_camera", "state", "action"],
-        )
+        if lazy:
+            # images stay on disk, each batch decompresses only the frames it samples
+            self.replay_buffer = ReplayBuffer.create_lazy_from_path(
+                zarr_path,
+                keys=["head_camera", "state", "action"],
+                lazy_keys=["head_camera"],
+                cache_size=lazy_cache_size,
+            )
+        else:
+            self.replay_buffer = ReplayBuffer.copy_from_path(
+                zarr_path,
+                # keys=['head_camera', 'front_camera', 'left_camera', 'right_camera', 'state', 'action'],
+                keys=["head_camera", "state", "action"],
+            )
 
         val_mask = get_val_mask(n_episodes=self.replay_buffer.n_episodes, val_ratio=val_ratio, seed=seed)
         train_mask = ~val_mask
@@ -120,7 +132,8 @@ class RobotImageDataset(BaseImageDataset):
         elif isinstance(idx, np.ndarray):
             assert len(idx) == self.batch_size
             for k, v in self.sampler.replay_buffer.items():
-                batch_sample_sequence(
+                sample_fn = batch_sample_sequence if isinstance(v, np.ndarray) else lazy_batch_sample_sequence
+                sample_fn(
                     self.buffers[k],
                     v,
                     self.sampler.indices,
@@ -183,3 +196,31 @@ def batch_sample_sequence(
         _batch_sample_sequence_parallel(data, input_arr, indices, idx, sequence_length)
     else:
         _batch_sample_sequence_sequential(data, input_arr, indices, idx, sequence_length)
+
+
+def lazy_batch_sample_sequence(
+    data: np.ndarray,
+    input_arr: zarr.Array,
+    indices: np.ndarray,
+    idx: np.ndarray,
+    sequence_length: int,
+):
+    """
+    batch_sample_sequence for an on-disk array: reads the frames of the batch at once,
+    so each chunk is decompressed at most once per batch.
+    """
+    batch_size = len(idx)
+    assert data.shape == (batch_size, sequence_length, *input_arr.shape[1:])
+    batch_indices = indices[idx]
+    frames = np.concatenate([np.arange(start, end) for start, end in batch_indices[:, :2]])
+    unique_frames, inverse = np.unique(frames, return_inverse=True)
+    values = input_arr.oindex[unique_frames]
+    offset = 0
+    for i, (buffer_start_idx, buffer_end_idx, sample_start_idx, sample_end_idx) in enumerate(batch_indices):
+        n_frames = buffer_end_idx - buffer_start_idx
+        data[i, sample_start_idx:sample_end_idx] = values[inverse[offset:offset + n_frames]]
+        offset += n_frames
+        if sample_start_idx > 0:
+            data[i, :sample_start_idx] = data[i, sample_start_idx]
+        if sample_end_idx < sequence_length:
+            data[i, sample_end_idx:] = data[i, sample_end_idx - 1]
@@ -15,20 +15,45 @@ class DP:
 
     def __init__(self, ckpt_file: str, n_obs_steps, n_action_steps):
         self.policy = self.get_policy(ckpt_file, None, "cuda:0")
+        self.n_obs_steps = n_obs_steps
+        self.n_action_steps = n_action_steps
         self.runner = DPRunner(n_obs_steps=n_obs_steps, n_action_steps=n_action_steps)
+        self.env_runners = {}  # env_id -> DPRunner, for batched evaluation
 
-    def update_obs(self, observation):
-        self.runner.update_obs(observation)
+    def get_runner(self, env_id=None):
+        if env_id is None:
+            return self.runner
+        if env_id not in self.env_runners:
+            self.env_runners[env_id] = DPRunner(n_obs_steps=self.n_obs_steps, n_action_steps=self.n_action_steps)
+        return self.env_runners[env_id]
+
+    def release_env(self, env_id):
+        self.env_runners.pop(env_id, None)
+
+    def update_obs(self, observation, env_id=None):
+        self.get_runner(env_id).update_obs(observation)
     
-    def reset_obs(self):
-        self.runner.reset_obs()
+    def reset_obs(self, env_id=None):
+        self.get_runner(env_id).reset_obs()
 
-    def get_action(self, observation=None):
-        action = self.runner.get_action(self.policy, observation)
+    def get_action(self, observation=None, env_id=None):
+        action = self.get_runner(env_id).get_action(self.policy, observation)
         return action
 
-    def get_last_obs(self):
-        return self.runner.obs[-1]
+    def get_action_batch(self, observations: dict) -> dict:
+        """
+        observations: {env_id: encoded observation}, appended to each env's window before the batched call.
+        """
+        runners = []
+        for env_id, observation in observations.items():
+            runner = self.get_runner(env_id)
+            runner.update_obs(observation)
+            runners.append(runner)
+        actions = self.runner.get_action_batch(self.policy, runners)
+        return dict(zip(observations.keys(), actions))
+
+    def get_last_obs(self, env_id=None):
+        return self.get_runner(env_id).obs[-1]
 
     def get_policy(self, checkpoint, output_dir, device):
         # load checkpoint
@@ -103,6 +103,27 @@ class RobotRunner(BaseRunner):
         action = np_action_dict["action"].squeeze(0)
         return action
 
+    def get_action_batch(self, policy: BasePolicy, runners):
+        """
+        Run the policy once on the observation windows of several runners (one per env).
+        Returns actions of shape (len(runners), n_action_steps, action_dim).
+        """
+        device, dtype = policy.device, policy.dtype
+        obs = [runner.get_n_steps_obs() for runner in runners]
+
+        # run policy
+        with torch.no_grad():
+            obs_dict_input = {}  # flush unused keys
+            for key in ["point_cloud", "agent_pos"]:
+                obs_dict_input[key] = torch.from_numpy(np.stack([o[key] for o in obs])).to(device=device)
+
+            action_dict = policy.predict_action(obs_dict_input)
+
+        # device_transfer
+        np_action_dict = dict_apply(action_dict, lambda x: x.detach().to("cpu").numpy())
+        action = np_action_dict["action"]
+        return action
+
     def run(self, policy: BasePolicy):
         pass
 
@@ -13,6 +13,7 @@ from omegaconf import OmegaConf
 import pathlib
 import sys
 from train_dp3 import TrainDP3Workspace
+from diffusion_policy_3d.env_runner.robot_runner import RobotRunner
 
 OmegaConf.register_new_resolver("eval", eval, replace=True)
 
@@ -30,14 +31,42 @@ class DP3:
 
     def __init__(self, cfg, usr_args) -> None:
         self.policy, self.env_runner = self.get_policy_and_runner(cfg, usr_args)
+        self.env_runners = {}  # env_id -> RobotRunner, for batched evaluation
 
-    def update_obs(self, observation):
-        self.env_runner.update_obs(observation)
+    def get_runner(self, env_id=None):
+        if env_id is None:
+            return self.env_runner
+        if env_id not in self.env_runners:
+            self.env_runners[env_id] = RobotRunner(
+                n_obs_steps=self.env_runner.n_obs_steps,
+                n_action_steps=self.env_runner.n_action_steps,
+            )
+        return self.env_runners[env_id]
 
-    def get_action(self, observation=None):
-        action = self.env_runner.get_action(self.policy, observation)
+    def release_env(self, env_id):
+        self.env_runners.pop(env_id, None)
+
+    def update_obs(self, observation, env_id=None):
+        self.get_runner(env_id).update_obs(observation)
+
+    def get_action(self, observation=None, env_id=None):
+        action = self.get_runner(env_id).get_action(self.policy, observation)
         return action
 
+    def get_action_batch(self, observations: dict) -> dict:
+        """
+        observations: {env_id: encoded observation or None}, appended to each env's window like get_action,
+        then one batched policy call on the windows.
+        """
+        runners = []
+        for env_id, observation in observations.items():
+            runner = self.get_runner(env_id)
+            if observation is not None:
+                runner.update_obs(observation)
+            runners.append(runner)
+        actions = self.env_runner.get_action_batch(self.policy, runners)
+        return dict(zip(observations.keys(), actions))
+
     def get_policy_and_runner(self, cfg, usr_args):
         workspace = TrainDP3Workspace(cfg)
         policy, env_runner = workspace.get_policy_and_runner(cfg, usr_args)
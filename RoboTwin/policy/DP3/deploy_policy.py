@@ -90,6 +90,23 @@ def eval(TASK_ENV, model, observation):
         model.update_obs(obs)  # Update Observation, `update_obs` here can be modified
 
 
+def eval_batch(TASK_ENVS, model, observations):
+    """
+    TASK_ENVS: VectorTaskEnv (script/vector_env.py), step the envs with `TASK_ENVS.take_actions`
+    observations: {env_id: observation} of the envs that need an action
+    """
+    for env_id, observation in observations.items():
+        if len(model.get_runner(env_id).obs) == 0:  # avoid an empty observation window at the first frame
+            model.update_obs(encode_obs(observation), env_id=env_id)
+
+    actions = model.get_action_batch({env_id: None for env_id in observations})  # one batched call for all envs
+
+    step_observations = TASK_ENVS.take_actions(actions)
+    for env_id, env_observations in step_observations.items():
+        for observation in env_observations:
+            model.update_obs(encode_obs(observation), env_id=env_id)
+
+
 def reset_model(
-        model):  # Clean the model cache at the beginning of every evaluation episode, such as the observation window
-    model.env_runner.reset_obs()
+        model, env_id=None):  # Clean the model cache at the beginning of every evaluation episode, such as the observation window
+    model.get_runner(env_id).reset_obs()
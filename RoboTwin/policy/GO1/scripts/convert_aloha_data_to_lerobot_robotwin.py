@@ -7,19 +7,21 @@ Script to convert Aloha hdf5 data to the LeRobot dataset v2.1 format.
 import dataclasses
 from pathlib import Path
 import shutil
+import sys
 from typing import Literal
 
 import h5py
 from lerobot.common.datasets.lerobot_dataset import HF_LEROBOT_HOME, LeRobotDataset
 
 import numpy as np
-import torch
-import tqdm
 import tyro
 import json
 import os
 import fnmatch
 
+sys.path.append("../../script")
+from dataset_converter import LeRobotWriter, run_conversion
+
 
 @dataclasses.dataclass(frozen=True)
 class DatasetConfig:
@@ -143,7 +145,7 @@ def has_effort(hdf5_files: list[Path]) -> bool:
         return "/observations/effort" in ep
 
 
-def load_raw_images_per_camera(ep: h5py.File, cameras: list[str]) -> dict[str, np.ndarray]:
+def load_raw_images_per_camera(ep, cameras: list[str]) -> dict[str, np.ndarray]:
     imgs_per_cam = {}
     for camera in cameras:
         uncompressed = ep[f"/observations/images/{camera}"].ndim == 4
@@ -166,37 +168,52 @@ def load_raw_images_per_camera(ep: h5py.File, cameras: list[str]) -> dict[str, n
     return imgs_per_cam
 
 
-def load_raw_episode_data(
-    ep_path: Path,
-) -> tuple[
-    dict[str, np.ndarray],
-    torch.Tensor,
-    torch.Tensor,
-    torch.Tensor | None,
-    torch.Tensor | None,
-]:
-    with h5py.File(ep_path, "r") as ep:
-        state = torch.from_numpy(ep["/observations/qpos"][:])
-        action = torch.from_numpy(ep["/action"][:])
-
-        velocity = None
-        if "/observations/qvel" in ep:
-            velocity = torch.from_numpy(ep["/observations/qvel"][:])
-
-        effort = None
-        if "/observations/effort" in ep:
-            effort = torch.from_numpy(ep["/observations/effort"][:])
-
-        imgs_per_cam = load_raw_images_per_camera(
-            ep,
-            [
-                "cam_high",
-                "cam_left_wrist",
-                "cam_right_wrist",
-            ],
-        )
-
-    return imgs_per_cam, state, action, velocity, effort
+def convert_episode(episode, episode_id) -> dict:
+    """
+    Frames of one processed episode (LazyEpisode) for LeRobotWriter, images decoded in the converter process.
+    """
+    state = episode["/observations/qpos"][:]
+    action = episode["/action"][:]
+
+    velocity = None
+    if "/observations/qvel" in episode:
+        velocity = episode["/observations/qvel"][:]
+
+    effort = None
+    if "/observations/effort" in episode:
+        effort = episode["/observations/effort"][:]
+
+    imgs_per_cam = load_raw_images_per_camera(
+        episode,
+        [
+            "cam_high",
+            "cam_left_wrist",
+            "cam_right_wrist",
+        ],
+    )
+    num_frames = state.shape[0]
+    # add prompt
+    dir_path = os.path.dirname(episode.file_path)
+    json_Path = f"{dir_path}/instructions.json"
+
+    with open(json_Path, "r") as f_instr:
+        instruction_dict = json.load(f_instr)
+        instructions = instruction_dict["instructions"]
+        # own generator per episode, forked workers would otherwise share the global random state
+        instruction = np.random.default_rng().choice(instructions)
+    frames = []
+    for i in range(num_frames):
+        frame = {"observation.state": state[i], "action": action[i]}
+
+        for camera, img_array in imgs_per_cam.items():
+            frame[f"observation.images.{camera}"] = img_array[i]
+
+        if velocity is not None:
+            frame["observation.velocity"] = velocity[i]
+        if effort is not None:
+            frame["observation.effort"] = effort[i]
+        frames.append(frame)
+    return {"frames": frames, "task": str(instruction)}
 
 
 def populate_dataset(
@@ -204,36 +221,17 @@ def populate_dataset(
     hdf5_files: list[Path],
     task: str,
     episodes: list[int] | None = None,
+    workers: int | None = None,
 ) -> LeRobotDataset:
     if episodes is None:
         episodes = range(len(hdf5_files))
 
-    for ep_idx in tqdm.tqdm(episodes):
-        ep_path = hdf5_files[ep_idx]
-
-        imgs_per_cam, state, action, velocity, effort = load_raw_episode_data(ep_path)
-        num_frames = state.shape[0]
-        # add prompt
-        dir_path = os.path.dirname(ep_path)
-        json_Path = f"{dir_path}/instructions.json"
-
-        with open(json_Path, "r") as f_instr:
-            instruction_dict = json.load(f_instr)
-            instructions = instruction_dict["instructions"]
-            instruction = np.random.choice(instructions)
-        for i in range(num_frames):
-            frame = {"observation.state": state[i], "action": action[i]}
-
-            for camera, img_array in imgs_per_cam.items():
-                frame[f"observation.images.{camera}"] = img_array[i]
-
-            if velocity is not None:
-                frame["observation.velocity"] = velocity[i]
-            if effort is not None:
-                frame["observation.effort"] = effort[i]
-            dataset.add_frame(frame, task=instruction)
-        dataset.save_episode()
-
+    run_conversion(
+        convert_episode,
+        LeRobotWriter(dataset),
+        [(ep_idx, hdf5_files[ep_idx]) for ep_idx in episodes],
+        workers=workers,
+    )
     return dataset
 
 
@@ -248,6 +246,7 @@ def port_aloha(
     is_mobile: bool = False,
     mode: Literal["video", "image"] = "image",
     dataset_config: DatasetConfig = DEFAULT_DATASET_CONFIG,
+    workers: int | None = None,
 ):
     if (HF_LEROBOT_HOME / repo_id).exists():
         shutil.rmtree(HF_LEROBOT_HOME / repo_id)
@@ -274,6 +273,7 @@ def port_aloha(
         hdf5_files,
         task=task,
         episodes=episodes,
+        workers=workers,
     )
     # dataset.consolidate()
 
@@ -1,5 +1,13 @@
 # import packages and module here
 
+# Optional: declare the observation your policy consumes, so get_obs only renders / fetches that (see envs/_base_task.py)
+# OBS_SPEC = {
+#     "cameras": ["head_camera"],  # cameras to render
+#     "data_type": {"rgb": True, "qpos": True},  # modalities to fetch
+#     "resolution": (320, 240),  # (W, H) of rgb, optional
+#     "dtype": "uint8",  # "uint8" in [0, 255] or "float32" in [0, 1], optional
+# }
+
 
 def encode_obs(observation):  # Post-Process Observation
     obs = observation
@@ -38,7 +46,26 @@ def eval(TASK_ENV, model, observation):
         obs = encode_obs(observation)
         model.update_obs(obs)  # Update Observation, `update_obs` here can be modified
 
+    # If the model only needs some of the observations (e.g. the last one), execute the chunk in one call and
+    # render only those: {action index: observation}
+    # observations = TASK_ENV.take_action_chunk(actions, obs_every=len(actions))
+
+
+# Optional: batched evaluation over several environments (used when `eval_env_num` > 1)
+# def eval_batch(TASK_ENVS, model, observations):
+#     """
+#     TASK_ENVS: VectorTaskEnv (script/vector_env.py)
+#     observations: {env_id: observation} of the envs that need an action
+#     """
+#     obs = {env_id: encode_obs(observation) for env_id, observation in observations.items()}
+#     actions = model.get_action_batch(obs)  # one model call for all envs, {env_id: action chunk}
+#     step_observations = TASK_ENVS.take_actions(actions)  # {env_id: [observation after each action]}
+#     for env_id, env_observations in step_observations.items():
+#         for observation in env_observations:
+#             model.update_obs(encode_obs(observation), env_id=env_id)
+
 
 def reset_model(model):  
     # Clean the model cache at the beginning of every evaluation episode, such as the observation window
+    # With eval_batch, this is called as reset_model(model, env_id=env_id) for each env
     pass
@@ -1,5 +1,6 @@
 import json
 import os
+import sys
 import h5py
 import numpy as np
 from PIL import Image
@@ -7,7 +8,10 @@ from io import BytesIO
 import argparse
 from glob import glob
 import random
-from tqdm import tqdm
+from functools import partial
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "script"))
+from dataset_converter import Hdf5EpisodeWriter, run_conversion
 
 def decode_and_resize_images(image_bytes_array, size=256):
     resized = []
@@ -27,35 +31,40 @@ def load_instruction(instruction_dir, episode_idx):
     if not candidates:
         raise ValueError(f"No instructions found in {json_path}")
     return random.choice(candidates)
-def process_one_episode(input_path, output_path, episode_idx, instruction_dir, resize_size=256):
-    with h5py.File(input_path, "r") as f:
-        action = f["joint_action/vector"][()]
+def process_one_episode(episode, episode_idx, instruction_dir, resize_size=256):
+    try:
+        action = episode["joint_action/vector"][()]
         rel_action = np.zeros_like(action)
         rel_action[:-1] = action[1:] - action[:-1]
         rel_action[-1] = rel_action[-2]
 
-        head = decode_and_resize_images(f["observation/head_camera/rgb"][()], size=resize_size)
-        left = decode_and_resize_images(f["observation/left_camera/rgb"][()], size=resize_size)
-        right = decode_and_resize_images(f["observation/right_camera/rgb"][()], size=resize_size)
-        front = decode_and_resize_images(f["observation/front_camera/rgb"][()], size=resize_size)
+        # raw JPEG bytes, decoded with PIL as before
+        head = decode_and_resize_images(episode["observation/head_camera/rgb"].dataset[()], size=resize_size)
+        left = decode_and_resize_images(episode["observation/left_camera/rgb"].dataset[()], size=resize_size)
+        right = decode_and_resize_images(episode["observation/right_camera/rgb"].dataset[()], size=resize_size)
+        front = decode_and_resize_images(episode["observation/front_camera/rgb"].dataset[()], size=resize_size)
 
-    # 读取 instruction JSON
-    json_path = os.path.join(instruction_dir, f"episode{episode_idx}.json")
-    with open(json_path, "r") as f:
-        inst_data = json.load(f)
-    seen_list = inst_data.get("seen", [])
-    unseen_list = inst_data.get("unseen", [])
+        # 读取 instruction JSON
+        json_path = os.path.join(instruction_dir, f"episode{episode_idx}.json")
+        with open(json_path, "r") as f:
+            inst_data = json.load(f)
+        seen_list = inst_data.get("seen", [])
+        unseen_list = inst_data.get("unseen", [])
+    except Exception as e:
+        print(f"[ERROR] Failed to process {episode.file_path}: {e}")
+        return None
 
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    with h5py.File(output_path, "w") as f:
-        f.create_dataset("head_camera_image", data=head, dtype="uint8", chunks=(1, resize_size, resize_size, 3))
-        f.create_dataset("left_wrist_image", data=left, dtype="uint8", chunks=(1, resize_size, resize_size, 3))
-        f.create_dataset("right_wrist_image", data=right, dtype="uint8", chunks=(1, resize_size, resize_size, 3))
-        f.create_dataset("low_cam_image", data=front, dtype="uint8", chunks=(1, resize_size, resize_size, 3))
-        f.create_dataset("action", data=action)
-        f.create_dataset("relative_action", data=rel_action)
-        f.create_dataset("seen", data=np.array(seen_list, dtype=h5py.string_dtype(encoding="utf-8")))
-        f.create_dataset("unseen", data=np.array(unseen_list, dtype=h5py.string_dtype(encoding="utf-8")))
+    image_chunks = (1, resize_size, resize_size, 3)
+    return {
+        "head_camera_image": (head, "uint8", image_chunks),
+        "left_wrist_image": (left, "uint8", image_chunks),
+        "right_wrist_image": (right, "uint8", image_chunks),
+        "low_cam_image": (front, "uint8", image_chunks),
+        "action": action,
+        "relative_action": rel_action,
+        "seen": np.array(seen_list, dtype=h5py.string_dtype(encoding="utf-8")),
+        "unseen": np.array(unseen_list, dtype=h5py.string_dtype(encoding="utf-8")),
+    }
 
 
 def main(args):
@@ -75,16 +84,11 @@ def main(args):
     print(f"Total episodes: {len(all_eps)}")
     print(f"Train: {len(train_eps)}, Val: {len(val_eps)}")
 
+    convert = partial(process_one_episode, instruction_dir=instruction_dir, resize_size=resize_size)
     for split_name, split_eps in [("train", train_eps), ("val", val_eps)]:
+        print(f"Processing {split_name}")
         out_dir = os.path.join(output_base, split_name)
-        os.makedirs(out_dir, exist_ok=True)
-        for i, ep in enumerate(tqdm(split_eps, desc=f"Processing {split_name}")):
-            ep_name = f"episode_{i}.hdf5"
-            out_path = os.path.join(out_dir, ep_name)
-            try:
-                process_one_episode(ep, out_path, i, instruction_dir, resize_size=resize_size)
-            except Exception as e:
-                print(f"[ERROR] Failed to process {ep}: {e}")
+        run_conversion(convert, Hdf5EpisodeWriter(out_dir), list(enumerate(split_eps)), workers=args.workers)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
@@ -98,6 +102,8 @@ if __name__ == "__main__":
                         help="Fraction of data to use as validation")
     parser.add_argument("--img_resize_size", type=int, default=256,
                         help="Final size for RGB images")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Converter processes (default: all cores)")
     args = parser.parse_args()
     main(args)
 
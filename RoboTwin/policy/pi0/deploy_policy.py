@@ -41,11 +41,11 @@ def eval(TASK_ENV, model, observation):
 
     actions = model.get_action()[:model.pi0_step]
 
-    for action in actions:
-        TASK_ENV.take_action(action)
-        observation = TASK_ENV.get_obs()
-        input_rgb_arr, input_state = encode_obs(observation)
-        model.update_observation_window(input_rgb_arr, input_state)
+    # the observation window only holds the latest observation
+    observations = TASK_ENV.take_action_chunk(actions, obs_every=len(actions))
+    observation = list(observations.values())[-1]
+    input_rgb_arr, input_state = encode_obs(observation)
+    model.update_observation_window(input_rgb_arr, input_state)
 
     # ============================
 
@@ -1,48 +1,13 @@
 import sys
 
 import os
-import h5py
 import numpy as np
-import pickle
-import cv2
 import argparse
+import functools
 import yaml, json
 
-
-def load_hdf5(dataset_path):
-    if not os.path.isfile(dataset_path):
-        print(f"Dataset does not exist at \n{dataset_path}\n")
-        exit()
-
-    with h5py.File(dataset_path, "r") as root:
-        left_gripper, left_arm = (
-            root["/joint_action/left_gripper"][()],
-            root["/joint_action/left_arm"][()],
-        )
-        right_gripper, right_arm = (
-            root["/joint_action/right_gripper"][()],
-            root["/joint_action/right_arm"][()],
-        )
-        image_dict = dict()
-        for cam_name in root[f"/observation/"].keys():
-            image_dict[cam_name] = root[f"/observation/{cam_name}/rgb"][()]
-
-    return left_gripper, left_arm, right_gripper, right_arm, image_dict
-
-
-def images_encoding(imgs):
-    encode_data = []
-    padded_data = []
-    max_len = 0
-    for i in range(len(imgs)):
-        success, encoded_image = cv2.imencode(".jpg", imgs[i])
-        jpeg_data = encoded_image.tobytes()
-        encode_data.append(jpeg_data)
-        max_len = max(max_len, len(jpeg_data))
-    # padding
-    for i in range(len(imgs)):
-        padded_data.append(encode_data[i].ljust(max_len, b"\0"))
-    return encode_data, max_len
+sys.path.append("../../script")
+from dataset_converter import Hdf5EpisodeWriter, jpeg_frames, robotwin_episodes, run_conversion
 
 
 def get_task_config(task_name):
@@ -51,17 +16,35 @@ def get_task_config(task_name):
     return args
 
 
-def data_transform(path, episode_num, save_path):
-    begin = 0
-    floders = os.listdir(path)
-    # assert episode_num <= len(floders), "data num not enough"
-
-    if not os.path.exists(save_path):
-        os.makedirs(save_path)
-
+def convert_episode(episode, episode_id, image_size=(640, 480)):
+    left_gripper, left_arm = (
+        episode["joint_action/left_gripper"][()],
+        episode["joint_action/left_arm"][()],
+    )
+    right_gripper, right_arm = (
+        episode["joint_action/right_gripper"][()],
+        episode["joint_action/right_arm"][()],
+    )
+    state = np.concatenate((left_arm, left_gripper[:, None], right_arm, right_gripper[:, None]), axis=1)  # joints angle
+    state = state.astype(np.float32)
+    step_num = len(state) - 1
+    return {
+        "action": state[1:],
+        "observations": {
+            "qpos": state[:-1],
+            "left_arm_dim": np.full(step_num, left_arm.shape[1]),
+            "right_arm_dim": np.full(step_num, right_arm.shape[1]),
+            "images": {
+                "cam_high": jpeg_frames(episode.camera("head_camera"), slice(-1), image_size),
+                "cam_right_wrist": jpeg_frames(episode.camera("right_camera"), slice(-1), image_size),
+                "cam_left_wrist": jpeg_frames(episode.camera("left_camera"), slice(-1), image_size),
+            },
+        },
+    }
+
+
+def save_instructions(path, episode_num, save_path, desc_type="seen"):
     for i in range(episode_num):
-
-        desc_type = "seen"
         instruction_data_path = os.path.join(path, "instructions", f"episode{i}.json")
         with open(instruction_data_path, "r") as f_instr:
             instruction_dict = json.load(f_instr)
@@ -76,74 +59,16 @@ def data_transform(path, episode_num, save_path):
         ) as f:
             json.dump(save_instructions_json, f, indent=2)
 
-        left_gripper_all, left_arm_all, right_gripper_all, right_arm_all, image_dict = (load_hdf5(
-            os.path.join(path, "data", f"episode{i}.hdf5")))
-        qpos = []
-        actions = []
-        cam_high = []
-        cam_right_wrist = []
-        cam_left_wrist = []
-        left_arm_dim = []
-        right_arm_dim = []
-
-        last_state = None
-        for j in range(0, left_gripper_all.shape[0]):
-
-            left_gripper, left_arm, right_gripper, right_arm = (
-                left_gripper_all[j],
-                left_arm_all[j],
-                right_gripper_all[j],
-                right_arm_all[j],
-            )
-
-            state = np.array(left_arm.tolist() + [left_gripper] + right_arm.tolist() + [right_gripper])  # joints angle
-
-            state = state.astype(np.float32)
-
-            if j != left_gripper_all.shape[0] - 1:
-                qpos.append(state)
-
-                camera_high_bits = image_dict["head_camera"][j]
-                camera_high = cv2.imdecode(np.frombuffer(camera_high_bits, np.uint8), cv2.IMREAD_COLOR)
-                camera_high_resized = cv2.resize(camera_high, (640, 480))
-                cam_high.append(camera_high_resized)
-
-                camera_right_wrist_bits = image_dict["right_camera"][j]
-                camera_right_wrist = cv2.imdecode(np.frombuffer(camera_right_wrist_bits, np.uint8), cv2.IMREAD_COLOR)
-                camera_right_wrist_resized = cv2.resize(camera_right_wrist, (640, 480))
-                cam_right_wrist.append(camera_right_wrist_resized)
-
-                camera_left_wrist_bits = image_dict["left_camera"][j]
-                camera_left_wrist = cv2.imdecode(np.frombuffer(camera_left_wrist_bits, np.uint8), cv2.IMREAD_COLOR)
-                camera_left_wrist_resized = cv2.resize(camera_left_wrist, (640, 480))
-                cam_left_wrist.append(camera_left_wrist_resized)
-
-            if j != 0:
-                action = state
-                actions.append(action)
-                left_arm_dim.append(left_arm.shape[0])
-                right_arm_dim.append(right_arm.shape[0])
-
-        hdf5path = os.path.join(save_path, f"episode_{i}/episode_{i}.hdf5")
-
-        with h5py.File(hdf5path, "w") as f:
-            f.create_dataset("action", data=np.array(actions))
-            obs = f.create_group("observations")
-            obs.create_dataset("qpos", data=np.array(qpos))
-            obs.create_dataset("left_arm_dim", data=np.array(left_arm_dim))
-            obs.create_dataset("right_arm_dim", data=np.array(right_arm_dim))
-            image = obs.create_group("images")
-            cam_high_enc, len_high = images_encoding(cam_high)
-            cam_right_wrist_enc, len_right = images_encoding(cam_right_wrist)
-            cam_left_wrist_enc, len_left = images_encoding(cam_left_wrist)
-            image.create_dataset("cam_high", data=cam_high_enc, dtype=f"S{len_high}")
-            image.create_dataset("cam_right_wrist", data=cam_right_wrist_enc, dtype=f"S{len_right}")
-            image.create_dataset("cam_left_wrist", data=cam_left_wrist_enc, dtype=f"S{len_left}")
-
-        begin += 1
-        print(f"proccess {i} success!")
-
-    return begin
+
+def data_transform(path, episode_num, save_path, workers=None, resume=False, image_size=(640, 480)):
+    save_instructions(path, episode_num, save_path)
+    return run_conversion(
+        functools.partial(convert_episode, image_size=image_size),
+        Hdf5EpisodeWriter(save_path, file_pattern="episode_{0}/episode_{0}.hdf5"),
+        robotwin_episodes(path, episode_num),
+        workers=workers,
+        resume=resume,
+    )
 
 
 if __name__ == "__main__":
@@ -161,6 +86,11 @@ if __name__ == "__main__":
         default=50,
         help="Number of episodes to process (e.g., 50)",
     )
+    parser.add_argument("--workers", type=int, default=None, help="converter processes (default: all cores)")
+    parser.add_argument("--resume", action="store_true", help="skip episodes converted by an earlier run")
+    parser.add_argument("--image-size", type=int, nargs=2, default=[640, 480], metavar=("W", "H"),
+                        help="resize frames to W H (frames already at this size keep their JPEG bytes)")
+    parser.add_argument("--keep-size", action="store_true", help="keep the collected frame size and JPEG bytes")
     args = parser.parse_args()
 
     task_name = args.task_name
@@ -177,4 +107,7 @@ if __name__ == "__main__":
         load_dir,
         expert_data_num,
         target_dir,
+        workers=args.workers,
+        resume=args.resume,
+        image_size=None if args.keep_size else args.image_size,
     )
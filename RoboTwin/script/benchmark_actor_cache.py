@@ -0,0 +1,65 @@
+"""
+Per-episode setup time with cold and warm model caches.
+
+Runs setup_demo for the same seeds twice: once clearing the model cache (envs.utils.create_actor.MODEL_CACHE)
+and SAPIEN's render model cache before every episode, once keeping both warm. Cluttered table configs
+(demo_randomized) spawn the most actors and gain the most. The scene is reused across episodes (reuse_scene
+true) so the timings are the actor spawns and not the scene build; --rebuild-scene times full setups instead.
+
+    python script/benchmark_actor_cache.py beat_block_hammer demo_randomized --episode-num 10
+"""
+import sys
+
+sys.path.append("./")
+sys.path.append("./script")
+
+import time
+import importlib
+from argparse import ArgumentParser
+
+from sapien.render import clear_cache as sapien_clear_cache
+
+from benchmark_success_check import load_task_args
+from envs.utils.create_actor import MODEL_CACHE, UnStableError
+
+
+def run(TASK_ENV, args, seeds, cold):
+    durations = []
+    for episode_id, seed in enumerate(seeds):
+        if cold:
+            MODEL_CACHE.clear()
+            sapien_clear_cache()
+        st = time.perf_counter()
+        try:
+            TASK_ENV.setup_demo(now_ep_num=episode_id, seed=seed, **args)
+        except UnStableError:
+            pass
+        durations.append(time.perf_counter() - st)
+        TASK_ENV.close_env()
+    return durations
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("task_name", type=str)
+    parser.add_argument("task_config", type=str)
+    parser.add_argument("--episode-num", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rebuild-scene", action="store_true", help="reuse_scene false, rebuild every episode")
+    usr_args = parser.parse_args()
+
+    args = load_task_args(usr_args.task_name, usr_args.task_config)
+    args["reuse_scene"] = not usr_args.rebuild_scene
+    TASK_ENV = getattr(importlib.import_module(f"envs.{usr_args.task_name}"), usr_args.task_name)()
+    seeds = list(range(usr_args.seed, usr_args.seed + usr_args.episode_num))
+
+    run(TASK_ENV, args, seeds[:1], cold=False)  # build the scene once, both runs reuse it unless --rebuild-scene
+    for name, cold in [("cold cache", True), ("warm cache", False)]:
+        durations = run(TASK_ENV, args, seeds, cold)
+        print(f"{name:>12}: {sum(durations) / len(durations) * 1000:8.1f} ms / episode "
+              f"(first {durations[0] * 1000:.1f} ms, max {max(durations) * 1000:.1f} ms)")
+    print(MODEL_CACHE.summary())
+
+
+if __name__ == "__main__":
+    main()
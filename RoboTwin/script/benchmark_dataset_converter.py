@@ -0,0 +1,55 @@
+"""
+Conversion time of run_conversion for different worker counts.
+
+Converts the first --episode-num episodes of a collected dataset once per worker count, with the image work of
+the pi0 / RDT converters (head, right and left camera resized to --image-size and JPEG-encoded, joint states
+copied) and an Hdf5EpisodeWriter into a temporary directory.
+
+    python script/benchmark_dataset_converter.py data/beat_block_hammer/demo_clean --episode-num 100 --workers 1 4 8
+"""
+import sys
+
+sys.path.append("./script")
+
+import time
+import tempfile
+import functools
+from argparse import ArgumentParser
+
+from dataset_converter import Hdf5EpisodeWriter, jpeg_frames, robotwin_episodes, run_conversion
+
+
+def convert_episode(episode, episode_id, image_size):
+    return {
+        "joint_action": episode["joint_action/vector"][()],
+        "images": {
+            camera: jpeg_frames(episode.camera(camera), slice(None), image_size)
+            for camera in ["head_camera", "right_camera", "left_camera"]
+        },
+    }
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("load_dir", type=str, help="collected data, data/<task>/<config>")
+    parser.add_argument("--episode-num", type=int, default=100)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--image-size", type=int, nargs=2, default=[640, 480], metavar=("W", "H"))
+    usr_args = parser.parse_args()
+
+    episodes = robotwin_episodes(usr_args.load_dir, usr_args.episode_num)
+    convert = functools.partial(convert_episode, image_size=usr_args.image_size)
+    durations = {}
+    for workers in usr_args.workers:
+        with tempfile.TemporaryDirectory() as save_path:
+            st = time.perf_counter()
+            run_conversion(convert, Hdf5EpisodeWriter(save_path), episodes, workers=workers)
+            durations[workers] = time.perf_counter() - st
+    base = durations[usr_args.workers[0]]
+    for workers, duration in durations.items():
+        print(f"{workers:>3} workers: {duration:8.1f} s for {len(episodes)} episodes "
+              f"({base / duration:.2f}x vs {usr_args.workers[0]} workers)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Point cloud downsampling time on depth frames.
+
+Back-projects synthetic depth frames (a table plane with boxes on it) at 320x240 and 640x480 and times each
+pcd_downsample_method, next to the pytorch3d farthest point sampling the cameras used before (when installed).
+
+    python script/benchmark_pcd_downsample.py --num-points 1024 --repeat 5
+"""
+import sys
+
+sys.path.append("./")
+
+import time
+import importlib.util
+from argparse import ArgumentParser
+
+import numpy as np
+import torch
+
+spec = importlib.util.spec_from_file_location("pcd_downsample", "./envs/camera/pcd_downsample.py")
+pcd_downsample = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(pcd_downsample)
+
+
+def depth_frame_points(width, height, fovy=np.deg2rad(37), seed=0):
+    rng = np.random.default_rng(seed)
+    depth = np.full((height, width), 1.0, dtype=np.float32)
+    for _ in range(8):
+        x, y = rng.integers(0, width - width // 8), rng.integers(0, height - height // 8)
+        w, h = rng.integers(width // 20, width // 8), rng.integers(height // 20, height // 8)
+        depth[y:y + h, x:x + w] = rng.uniform(0.8, 0.95)
+    depth += rng.normal(scale=1e-3, size=depth.shape).astype(np.float32)
+
+    f = height / 2 / np.tan(fovy / 2)
+    u, v = np.meshgrid(np.arange(width), np.arange(height))
+    points = np.stack([(u - width / 2) / f * depth, (v - height / 2) / f * depth, depth], axis=-1)
+    return points.reshape(-1, 3).astype(np.float32)
+
+
+def pytorch3d_fps(points, num_points, device):
+    import pytorch3d.ops as torch3d_ops
+
+    points = torch.from_numpy(points).to(device)
+    _, indices = torch3d_ops.sample_farthest_points(points=points.unsqueeze(0), K=[num_points])
+    return indices.cpu().numpy()[0]
+
+
+def timeit(func, repeat):
+    func()  # warm up (numba compilation, CUDA context)
+    st = time.perf_counter()
+    for _ in range(repeat):
+        res = func()
+    return (time.perf_counter() - st) / repeat, res
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("--num-points", type=int, default=1024)
+    parser.add_argument("--repeat", type=int, default=5)
+    usr_args = parser.parse_args()
+
+    for width, height in [(320, 240), (640, 480)]:
+        points = depth_frame_points(width, height)
+        print(f"{width}x{height} ({len(points)} points -> {usr_args.num_points})")
+
+        methods = {}
+        if pcd_downsample.torch3d_ops is not None:
+            methods["pytorch3d fps (cpu)"] = lambda: pytorch3d_fps(points, usr_args.num_points, "cpu")
+            if torch.cuda.is_available():
+                methods["pytorch3d fps (cuda)"] = lambda: pytorch3d_fps(points, usr_args.num_points, "cuda")
+        for method in pcd_downsample.PCD_DOWNSAMPLE_METHODS:
+            methods[method] = lambda method=method: pcd_downsample.downsample_pcd_indices(
+                points, usr_args.num_points, method=method, rng=np.random.default_rng(0), use_cuda=False)
+
+        for name, func in methods.items():
+            duration, indices = timeit(func, usr_args.repeat)
+            print(f"{name:>22}: {duration * 1000:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Setup time and unstable seeds with and without the early-exit stability check.
+
+Runs setup_demo of each task for a range of seeds once with the fixed 2000 + 500 step check
+(stable_check_window 0) and once with the early exit, reports the average setup time and whether both flag the
+same seeds as unstable. Tasks with articulated objects (open_laptop, open_microwave, put_object_cabinet) belong
+in the regression set.
+
+    python script/benchmark_stable_check.py place_shoe open_laptop open_microwave put_object_cabinet \
+        --task-config demo_randomized --seed-num 100 --window 100
+"""
+import sys
+
+sys.path.append("./")
+sys.path.append("./script")
+
+import time
+import importlib
+from argparse import ArgumentParser
+
+from benchmark_success_check import load_task_args
+from envs.utils.create_actor import UnStableError
+
+
+def run(TASK_ENV, args, seeds):
+    unstable_seeds, duration = [], 0.0
+    for episode_id, seed in enumerate(seeds):
+        st = time.perf_counter()
+        try:
+            TASK_ENV.setup_demo(now_ep_num=episode_id, seed=seed, **args)
+        except UnStableError:
+            unstable_seeds.append(seed)
+        duration += time.perf_counter() - st
+        TASK_ENV.close_env()
+    return unstable_seeds, duration
+
+
+def compare(task_name, task_config, seeds, window):
+    args = load_task_args(task_name, task_config)
+    TASK_ENV = getattr(importlib.import_module(f"envs.{task_name}"), task_name)()
+
+    results = []
+    for name, stable_check_window in [("fixed horizon", 0), (f"early exit ({window} steps)", window)]:
+        args["stable_check_window"] = stable_check_window
+        unstable_seeds, duration = run(TASK_ENV, args, seeds)
+        results.append(set(unstable_seeds))
+        print(f"{task_name} {name:>26}: {duration / len(seeds) * 1000:8.1f} ms / setup, "
+              f"unstable seeds {unstable_seeds}")
+
+    if results[0] == results[1]:
+        print(f"\033[92m{task_name}: same unstable seeds\033[0m")
+        return True
+    print(f"\033[91m{task_name}: unstable seeds differ: {sorted(results[0] ^ results[1])}\033[0m")
+    return False
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("task_names", type=str, nargs="+")
+    parser.add_argument("--task-config", type=str, default="demo_randomized")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--seed-num", type=int, default=100)
+    parser.add_argument("--window", type=int, default=100, help="stable_check_window in physics steps")
+    usr_args = parser.parse_args()
+
+    seeds = list(range(usr_args.seed, usr_args.seed + usr_args.seed_num))
+    differing = [
+        task_name for task_name in usr_args.task_names
+        if not compare(task_name, usr_args.task_config, seeds, usr_args.window)
+    ]
+    if differing:
+        sys.exit(f"unstable seeds differ for {differing}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Eval step throughput with and without success-check scheduling.
+
+Replays the joint actions of collected episodes (data/{task_name}/{task_config}) through take_action, the way a
+policy is evaluated, once checking success after every physics step and once with the given period and the
+task's check_success_precondition. Reports actions per second and whether every episode ends the same way.
+
+    python script/benchmark_success_check.py stack_blocks_three demo_clean --episode-num 10 --period 10
+"""
+import sys
+
+sys.path.append("./")
+
+import os
+import time
+import importlib
+from argparse import ArgumentParser
+
+import h5py
+import yaml
+
+from envs._GLOBAL_CONFIGS import CONFIGS_PATH
+
+
+def load_task_args(task_name, task_config):
+    with open(f"./task_config/{task_config}.yml", "r", encoding="utf-8") as f:
+        args = yaml.load(f.read(), Loader=yaml.FullLoader)
+    args["task_name"] = task_name
+    args["task_config"] = task_config
+
+    with open(os.path.join(CONFIGS_PATH, "_embodiment_config.yml"), "r", encoding="utf-8") as f:
+        _embodiment_types = yaml.load(f.read(), Loader=yaml.FullLoader)
+
+    def get_embodiment_config(robot_file):
+        with open(os.path.join(robot_file, "config.yml"), "r", encoding="utf-8") as f:
+            return yaml.load(f.read(), Loader=yaml.FullLoader)
+
+    embodiment_type = args.get("embodiment")
+    if len(embodiment_type) == 1:
+        args["left_robot_file"] = _embodiment_types[embodiment_type[0]]["file_path"]
+        args["right_robot_file"] = _embodiment_types[embodiment_type[0]]["file_path"]
+        args["dual_arm_embodied"] = True
+    elif len(embodiment_type) == 3:
+        args["left_robot_file"] = _embodiment_types[embodiment_type[0]]["file_path"]
+        args["right_robot_file"] = _embodiment_types[embodiment_type[1]]["file_path"]
+        args["embodiment_dis"] = embodiment_type[2]
+        args["dual_arm_embodied"] = False
+    else:
+        raise ValueError("embodiment items should be 1 or 3")
+    args["left_embodiment_config"] = get_embodiment_config(args["left_robot_file"])
+    args["right_embodiment_config"] = get_embodiment_config(args["right_robot_file"])
+
+    args["render_freq"] = 0
+    args["save_data"] = False
+    args["eval_mode"] = True
+    args["eval_video_save_dir"] = None
+    return args
+
+
+def load_episodes(task_name, task_config, episode_num):
+    save_path = os.path.join("./data", task_name, task_config)
+    with open(os.path.join(save_path, "seed.txt"), "r") as f:
+        seed_list = [int(seed) for seed in f.read().split()]
+    episodes = []
+    for episode_id in range(min(episode_num, len(seed_list))):
+        with h5py.File(os.path.join(save_path, "data", f"episode{episode_id}.hdf5"), "r") as f:
+            episodes.append((episode_id, seed_list[episode_id], f["joint_action/vector"][()]))
+    return episodes
+
+
+def run_episodes(TASK_ENV, args, episodes, use_precondition=True):
+    """
+    Returns ({episode_id: (success, executed actions)}, executed actions, seconds spent in take_action).
+    """
+    results, action_num, action_time = {}, 0, 0.0
+    for episode_id, seed, actions in episodes:
+        TASK_ENV.setup_demo(now_ep_num=episode_id, seed=seed, is_test=True, **args)
+        if not use_precondition:
+            TASK_ENV.check_success_precondition = lambda: True
+        st = time.perf_counter()
+        for action in actions:
+            TASK_ENV.take_action(action)
+            if TASK_ENV.eval_success or TASK_ENV.take_action_cnt >= TASK_ENV.step_lim:
+                break
+        action_time += time.perf_counter() - st
+        action_num += TASK_ENV.take_action_cnt
+        results[episode_id] = (TASK_ENV.eval_success, TASK_ENV.take_action_cnt)
+        if not use_precondition:
+            del TASK_ENV.check_success_precondition
+        TASK_ENV.close_env()
+    return results, action_num, action_time
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("task_name", type=str)
+    parser.add_argument("task_config", type=str)
+    parser.add_argument("--episode-num", type=int, default=10)
+    parser.add_argument("--period", type=int, default=10, help="success check period in physics steps")
+    usr_args = parser.parse_args()
+
+    args = load_task_args(usr_args.task_name, usr_args.task_config)
+    episodes = load_episodes(usr_args.task_name, usr_args.task_config, usr_args.episode_num)
+    TASK_ENV = getattr(importlib.import_module(f"envs.{usr_args.task_name}"), usr_args.task_name)()
+
+    settings = [
+        ("every step", 1, False),
+        (f"period {usr_args.period} + precondition", usr_args.period, True),
+    ]
+    all_results = []
+    for name, period, use_precondition in settings:
+        args["success_check_period"] = period
+        results, action_num, action_time = run_episodes(TASK_ENV, args, episodes, use_precondition)
+        all_results.append(results)
+        success_num = sum(success for success, _ in results.values())
+        print(f"{name:>28}: {action_num / action_time:8.2f} actions/s ({action_num} actions, {action_time:.1f}s), "
+              f"success {success_num}/{len(results)}")
+
+    mismatch = [
+        episode_id for episode_id in all_results[0]
+        if all_results[0][episode_id][0] != all_results[1][episode_id][0]
+    ]
+    if mismatch:
+        print(f"\033[91msuccess differs on episodes {mismatch}\033[0m")
+    else:
+        print("\033[92msame success outcome on every episode\033[0m")
+
+
+if __name__ == "__main__":
+    main()
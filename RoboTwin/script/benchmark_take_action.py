@@ -0,0 +1,73 @@
+"""
+take_action throughput on random joint actions.
+
+Runs the same random qpos actions (small jitters and larger moves around the home pose) through take_action
+with TOPP for every action and with the small-move fast path, and reports take_action steps per second.
+
+    python script/benchmark_take_action.py beat_block_hammer demo_clean --action-num 1000
+"""
+import sys
+
+sys.path.append("./")
+sys.path.append("./script")
+
+import time
+import importlib
+from argparse import ArgumentParser
+
+import numpy as np
+
+from benchmark_success_check import load_task_args
+
+
+def random_actions(TASK_ENV, action_num, seed=0, small_rate=0.7):
+    rng = np.random.default_rng(seed)
+    home = np.array(TASK_ENV.robot.get_left_arm_jointState() + TASK_ENV.robot.get_right_arm_jointState())
+    left_arm_dim = len(TASK_ENV.robot.get_left_arm_jointState()) - 1
+    gripper_ids = [left_arm_dim, len(home) - 1]
+
+    actions = []
+    for _ in range(action_num):
+        scale = 0.004 if rng.random() < small_rate else 0.15
+        action = home + rng.normal(scale=scale, size=home.shape)
+        action[gripper_ids] = rng.random(2)
+        actions.append(action)
+    return actions
+
+
+def run(TASK_ENV, args, actions, seed):
+    TASK_ENV.setup_demo(now_ep_num=0, seed=seed, **args)
+    TASK_ENV.step_lim = len(actions) + 1
+    TASK_ENV.check_success_precondition = lambda: False  # never end the episode
+    st = time.perf_counter()
+    for action in actions:
+        TASK_ENV.take_action(action)
+    duration = time.perf_counter() - st
+    del TASK_ENV.check_success_precondition
+    TASK_ENV.close_env()
+    return duration
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("task_name", type=str)
+    parser.add_argument("task_config", type=str)
+    parser.add_argument("--action-num", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--threshold", type=float, default=0.01, help="qpos_fast_path_threshold (rad)")
+    usr_args = parser.parse_args()
+
+    args = load_task_args(usr_args.task_name, usr_args.task_config)
+    TASK_ENV = getattr(importlib.import_module(f"envs.{usr_args.task_name}"), usr_args.task_name)()
+    TASK_ENV.setup_demo(now_ep_num=0, seed=usr_args.seed, **args)
+    actions = random_actions(TASK_ENV, usr_args.action_num, seed=usr_args.seed)
+    TASK_ENV.close_env()
+
+    for name, threshold in [("TOPP for every action", 0), (f"fast path < {usr_args.threshold} rad", usr_args.threshold)]:
+        args["qpos_fast_path_threshold"] = threshold
+        duration = run(TASK_ENV, args, actions, usr_args.seed)
+        print(f"{name:>28}: {len(actions) / duration:8.2f} steps/s ({len(actions)} actions, {duration:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+Checks that choose_grasp_pose selects the same grasp as the per-contact-point implementation it replaced.
+
+Plays the expert of each task for a range of seeds. Every choose_grasp_pose call of the expert is answered by the
+current implementation (candidates of all contact points planned through plan_multi_path_groups, contact points
+that can give a top-down grasp first, the rest only on a miss) and, in the same robot state, by the previous
+one (get_grasp_pose per contact point, i.e. one planner call each, then the same top-down / side / weighted
+reduction). The plan cache is disabled so neither reuses the other's planner results. Reports per task how many
+calls differ and the planner calls and time of both, and exits non-zero if any selected grasp differs.
+
+    python script/check_grasp_selection.py beat_block_hammer place_shoe stack_blocks_three --task-config demo_clean \
+        --seed-num 50
+"""
+import sys
+
+sys.path.append("./")
+sys.path.append("./script")
+
+import time
+import importlib
+from copy import deepcopy
+from argparse import ArgumentParser
+
+import numpy as np
+import transforms3d as t3d
+
+from benchmark_success_check import load_task_args
+from envs._GLOBAL_CONFIGS import GRASP_DIRECTION_DIC
+from envs.utils import cal_quat_dis
+from envs.utils.create_actor import UnStableError
+
+
+def previous_choose_grasp_pose(TASK_ENV, actor, arm_tag, pre_dis=0.1, target_dis=0, contact_point_id=None):
+    """
+    choose_grasp_pose before the grouped planning: one get_grasp_pose (one planner call) per contact point.
+    """
+    if not TASK_ENV.plan_success:
+        return
+    res_pre_top_down_pose, res_top_down_pose, dis_top_down = None, None, 1e9
+    res_pre_side_pose, res_side_pose, dis_side = None, None, 1e9
+    res_pre_pose, res_pose, dis = None, None, 1e9
+
+    pref_direction = TASK_ENV.robot.get_grasp_perfect_direction(arm_tag)
+
+    def get_grasp_pose(pre_grasp_pose, pre_grasp_dis):
+        grasp_pose = np.array(deepcopy(pre_grasp_pose))
+        direction_mat = t3d.quaternions.quat2mat(grasp_pose[-4:])
+        grasp_pose[:3] += [pre_grasp_dis, 0, 0] @ np.linalg.inv(direction_mat)
+        return grasp_pose.tolist()
+
+    if contact_point_id is not None:
+        if type(contact_point_id) != list:
+            contact_point_id = [contact_point_id]
+        contact_point_id = [(i, None) for i in contact_point_id]
+    else:
+        contact_point_id = actor.iter_contact_points()
+
+    for i, _ in contact_point_id:
+        pre_pose = TASK_ENV.get_grasp_pose(actor, arm_tag, contact_point_id=i, pre_dis=pre_dis)
+        if pre_pose is None:
+            continue
+        pose = get_grasp_pose(pre_pose, pre_dis - target_dis)
+        now_dis_top_down = cal_quat_dis(
+            pose[-4:],
+            GRASP_DIRECTION_DIC[("top_down_little_left" if arm_tag == "right" else "top_down_little_right")],
+        )
+        now_dis_side = cal_quat_dis(pose[-4:], GRASP_DIRECTION_DIC[pref_direction])
+
+        if res_pre_top_down_pose is None or now_dis_top_down < dis_top_down:
+            res_pre_top_down_pose, res_top_down_pose, dis_top_down = pre_pose, pose, now_dis_top_down
+        if res_pre_side_pose is None or now_dis_side < dis_side:
+            res_pre_side_pose, res_side_pose, dis_side = pre_pose, pose, now_dis_side
+        now_dis = 0.7 * now_dis_top_down + 0.3 * now_dis_side
+        if res_pre_pose is None or now_dis < dis:
+            res_pre_pose, res_pose, dis = pre_pose, pose, now_dis
+
+    if dis_top_down < 0.15:
+        return res_pre_top_down_pose, res_top_down_pose
+    if dis_side < 0.15:
+        return res_pre_side_pose, res_side_pose
+    return res_pre_pose, res_pose
+
+
+def same_grasp(a, b, atol):
+    if a is None or b is None:
+        return a is None and b is None
+    return all((x is None and y is None) or (x is not None and y is not None and np.allclose(x, y, atol=atol))
+               for x, y in zip(a, b))
+
+
+class GraspComparison:
+    """
+    Wraps choose_grasp_pose of a task instance, runs both implementations and returns the current one's result.
+    """
+
+    def __init__(self, TASK_ENV, atol):
+        self.TASK_ENV = TASK_ENV
+        self.choose_grasp_pose = TASK_ENV.choose_grasp_pose
+        self.atol = atol
+        self.call_num = 0
+        self.differing = []
+        self.duration = {"current": 0.0, "previous": 0.0}
+        self.planner_calls = {"current": 0, "previous": 0}
+        self.seed = None
+        TASK_ENV.choose_grasp_pose = self
+
+    def _count_planner_calls(self, name, fn):
+        robot = self.TASK_ENV.robot
+        originals = {
+            attr: getattr(robot, attr)
+            for attr in ["left_plan_multi_path", "right_plan_multi_path", "plan_multi_path_groups"]
+        }
+
+        def counted(original):
+
+            def call(*args, **kwargs):
+                self.planner_calls[name] += 1
+                return original(*args, **kwargs)
+
+            return call
+
+        for attr, original in originals.items():
+            setattr(robot, attr, counted(original))
+        try:
+            st = time.perf_counter()
+            res = fn()
+            self.duration[name] += time.perf_counter() - st
+        finally:
+            for attr in originals:
+                delattr(robot, attr)
+        return res
+
+    def __call__(self, actor, arm_tag, **kwargs):
+        self.call_num += 1
+        previous = self._count_planner_calls(
+            "previous", lambda: previous_choose_grasp_pose(self.TASK_ENV, actor, arm_tag, **kwargs))
+        current = self._count_planner_calls("current", lambda: self.choose_grasp_pose(actor, arm_tag, **kwargs))
+        if not same_grasp(previous, current, self.atol):
+            self.differing.append((self.seed, str(arm_tag), previous, current))
+        return current
+
+
+def compare(task_name, task_config, seeds, atol):
+    args = load_task_args(task_name, task_config)
+    args["need_plan"] = True
+    args["save_data"] = False
+    args["eval_mode"] = False
+    TASK_ENV = getattr(importlib.import_module(f"envs.{task_name}"), task_name)()
+    comparison = GraspComparison(TASK_ENV, atol)
+
+    for episode_id, seed in enumerate(seeds):
+        comparison.seed = seed
+        try:
+            TASK_ENV.setup_demo(now_ep_num=episode_id, seed=seed, **args)
+        except UnStableError:
+            TASK_ENV.close_env()
+            continue
+        TASK_ENV.robot.plan_cache.max_size = 0
+        TASK_ENV.robot.plan_cache.entries.clear()
+        try:
+            TASK_ENV.play_once()
+        except Exception as e:
+            print(f"{task_name} seed {seed}: expert failed ({e})")
+        TASK_ENV.close_env()
+
+    for seed, arm_tag, previous, current in comparison.differing:
+        print(f"\033[91m{task_name} seed {seed} {arm_tag} arm:\033[0m previous {previous}, current {current}")
+    print(f"{task_name}: {len(comparison.differing)} / {comparison.call_num} choose_grasp_pose calls differ; "
+          f"planner calls previous {comparison.planner_calls['previous']}, current "
+          f"{comparison.planner_calls['current']}; time previous {comparison.duration['previous']:.2f} s, current "
+          f"{comparison.duration['current']:.2f} s")
+    return len(comparison.differing) == 0
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("task_names", type=str, nargs="+")
+    parser.add_argument("--task-config", type=str, default="demo_clean")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--seed-num", type=int, default=50)
+    parser.add_argument("--atol", type=float, default=1e-6, help="tolerance for the selected poses")
+    usr_args = parser.parse_args()
+
+    seeds = list(range(usr_args.seed, usr_args.seed + usr_args.seed_num))
+    differing = [
+        task_name for task_name in usr_args.task_names
+        if not compare(task_name, usr_args.task_config, seeds, usr_args.atol)
+    ]
+    if differing:
+        sys.exit(f"selected grasps differ for {differing}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Checks that converted episodes carry the collected JPEG bytes unchanged.
+
+Compares the sha256 of every image payload in the hdf5 written by the pi0 / RDT / GO1 converters (passthrough
+mode: --keep-size, or frames already at --image-size) with the frames of the collected episodes they came from.
+
+    python script/check_jpeg_passthrough.py data/beat_block_hammer/demo_clean \\
+        policy/pi0/processed_data/beat_block_hammer-demo_clean-50 50
+"""
+import os
+import sys
+import hashlib
+from argparse import ArgumentParser
+
+import h5py
+
+CAMERAS = {"cam_high": "head_camera", "cam_right_wrist": "right_camera", "cam_left_wrist": "left_camera"}
+
+
+def payload_digests(dataset):
+    # fixed-length bytes datasets come back without their null padding
+    return [hashlib.sha256(bytes(buf)).hexdigest() for buf in dataset[()]]
+
+
+def check_episode(collected_path, converted_path):
+    mismatches = []
+    with h5py.File(collected_path, "r") as src, h5py.File(converted_path, "r") as dst:
+        for cam, src_cam in CAMERAS.items():
+            expected = payload_digests(src[f"observation/{src_cam}/rgb"])[:-1]
+            actual = payload_digests(dst[f"observations/images/{cam}"])
+            if expected != actual:
+                mismatches.append(cam)
+    return mismatches
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("load_dir", type=str, help="collected data, data/<task>/<config>")
+    parser.add_argument("processed_dir", type=str, help="converter output with episode_<i>/episode_<i>.hdf5")
+    parser.add_argument("episode_num", type=int)
+    usr_args = parser.parse_args()
+
+    failed = 0
+    for i in range(usr_args.episode_num):
+        mismatches = check_episode(
+            os.path.join(usr_args.load_dir, "data", f"episode{i}.hdf5"),
+            os.path.join(usr_args.processed_dir, f"episode_{i}", f"episode_{i}.hdf5"),
+        )
+        if mismatches:
+            failed += 1
+            print(f"\033[91mepisode {i}: payloads differ for {mismatches}\033[0m")
+    if failed:
+        sys.exit(f"{failed} / {usr_args.episode_num} episodes differ")
+    print(f"\033[92mall image payloads of {usr_args.episode_num} episodes are byte-identical\033[0m")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Checks that an episode does not depend on whether its scene was reused.
+
+Plans the expert of each task for a range of seeds twice, once rebuilding the scene every episode
+(reuse_scene false) and once reusing it across all of them (reuse_scene true, the scene history of a collect
+worker), and compares per seed the initial actor poses and articulation qpos after setup_demo, the expert's
+plan_success and check_success, and the planned left / right joint paths saved to _traj_data. Exits non-zero
+if any seed differs; reuse_scene can only be turned on in a task config once this passes.
+
+    python script/check_scene_reuse.py beat_block_hammer place_shoe open_laptop --task-config demo_randomized \
+        --seed-num 50
+"""
+import sys
+
+sys.path.append("./")
+sys.path.append("./script")
+
+import importlib
+from argparse import ArgumentParser
+
+import numpy as np
+
+from benchmark_success_check import load_task_args
+from envs.utils.create_actor import UnStableError
+
+
+def initial_state(TASK_ENV):
+    state = {}
+    for actor in TASK_ENV.scene.get_all_actors():
+        pose = actor.get_pose()
+        state[f"actor {actor.get_name()}"] = np.concatenate([pose.p, pose.q])
+    for articulation in TASK_ENV.scene.get_all_articulations():
+        pose = articulation.get_root_pose()
+        state[f"articulation {articulation.get_name()}"] = np.concatenate([pose.p, pose.q, articulation.get_qpos()])
+    return state
+
+
+def joint_path(path):
+    return [{key: np.asarray(value) for key, value in result.items()} for result in path]
+
+
+def run_seed(TASK_ENV, args, seed, episode_id):
+    try:
+        TASK_ENV.setup_demo(now_ep_num=episode_id, seed=seed, **args)
+    except UnStableError:
+        TASK_ENV.close_env()
+        return {"unstable": True}
+    res = {"unstable": False, "initial_state": initial_state(TASK_ENV)}
+    try:
+        TASK_ENV.play_once()
+        res["plan_success"] = TASK_ENV.plan_success
+        res["success"] = bool(TASK_ENV.plan_success and TASK_ENV.check_success())
+    except Exception as e:
+        res["plan_success"], res["success"] = f"error: {e}", False
+    res["left_joint_path"] = joint_path(TASK_ENV.left_joint_path)
+    res["right_joint_path"] = joint_path(TASK_ENV.right_joint_path)
+    TASK_ENV.close_env()
+    return res
+
+
+def diff_paths(name, fresh, reused, atol):
+    if len(fresh) != len(reused):
+        return [f"{name}: {len(fresh)} vs {len(reused)} plans"]
+    diffs = []
+    for idx, (a, b) in enumerate(zip(fresh, reused)):
+        for key in sorted(a.keys() | b.keys()):
+            if key not in a or key not in b or a[key].shape != b[key].shape:
+                diffs.append(f"{name}[{idx}].{key}: shape differs")
+            elif a[key].dtype.kind in "fc" and not np.allclose(a[key], b[key], atol=atol):
+                diffs.append(f"{name}[{idx}].{key}: max diff {np.max(np.abs(a[key] - b[key])):.2e}")
+            elif a[key].dtype.kind not in "fc" and not np.array_equal(a[key], b[key]):
+                diffs.append(f"{name}[{idx}].{key}: {a[key]} vs {b[key]}")
+    return diffs
+
+
+def diff_seed(fresh, reused, atol):
+    if fresh["unstable"] or reused["unstable"]:
+        return [] if fresh["unstable"] == reused["unstable"] else [
+            f"unstable: {fresh['unstable']} vs {reused['unstable']}"
+        ]
+    diffs = []
+    fresh_state, reused_state = fresh["initial_state"], reused["initial_state"]
+    if fresh_state.keys() != reused_state.keys():
+        diffs.append(f"scene bodies differ: {sorted(fresh_state.keys() ^ reused_state.keys())}")
+    for name in sorted(fresh_state.keys() & reused_state.keys()):
+        a, b = fresh_state[name], reused_state[name]
+        if a.shape != b.shape or not np.allclose(a, b, atol=atol):
+            diffs.append(f"initial {name}: max diff {np.max(np.abs(a - b)) if a.shape == b.shape else 'shape'}")
+    for key in ["plan_success", "success"]:
+        if fresh[key] != reused[key]:
+            diffs.append(f"{key}: {fresh[key]} vs {reused[key]}")
+    for key in ["left_joint_path", "right_joint_path"]:
+        diffs.extend(diff_paths(key, fresh[key], reused[key], atol))
+    return diffs
+
+
+def compare(task_name, task_config, seeds, atol):
+    args = load_task_args(task_name, task_config)
+    args["need_plan"] = True
+    args["save_data"] = False
+    args["eval_mode"] = False
+
+    results = {}
+    for reuse_scene in [False, True]:
+        args["reuse_scene"] = reuse_scene
+        TASK_ENV = getattr(importlib.import_module(f"envs.{task_name}"), task_name)()
+        results[reuse_scene] = [run_seed(TASK_ENV, args, seed, episode_id) for episode_id, seed in enumerate(seeds)]
+
+    differing = 0
+    for seed, fresh, reused in zip(seeds, results[False], results[True]):
+        diffs = diff_seed(fresh, reused, atol)
+        if diffs:
+            differing += 1
+            print(f"\033[91m{task_name} seed {seed}:\033[0m " + "; ".join(diffs[:5]) +
+                  (f" (+{len(diffs) - 5} more)" if len(diffs) > 5 else ""))
+    expert_success = [sum(res.get("success", False) for res in results[flag]) for flag in [False, True]]
+    print(f"{task_name}: {differing} / {len(seeds)} seeds differ, expert success fresh {expert_success[0]}, "
+          f"reused {expert_success[1]}")
+    return differing == 0
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("task_names", type=str, nargs="+")
+    parser.add_argument("--task-config", type=str, default="demo_randomized")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--seed-num", type=int, default=50)
+    parser.add_argument("--atol", type=float, default=1e-6, help="tolerance for poses, qpos and joint paths")
+    usr_args = parser.parse_args()
+
+    seeds = list(range(usr_args.seed, usr_args.seed + usr_args.seed_num))
+    differing = [
+        task_name for task_name in usr_args.task_names
+        if not compare(task_name, usr_args.task_config, seeds, usr_args.atol)
+    ]
+    if differing:
+        sys.exit(f"fresh and reused scenes differ for {differing}")
+
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,11 @@ import json
 import traceback
 import os
 import time
+import itertools
+import queue
+import multiprocessing
+from collections import deque
+from copy import deepcopy
 from argparse import ArgumentParser
 
 current_file_path = os.path.abspath(__file__)
@@ -36,7 +41,7 @@ def get_embodiment_config(robot_file):
     return embodiment_args
 
 
-def main(task_name=None, task_config=None):
+def main(task_name=None, task_config=None, workers=1, seed_chunk=1):
 
     task = class_decorator(task_name)
     config_path = f"./task_config/{task_config}.yml"
@@ -100,10 +105,110 @@ def main(task_name=None, task_config=None):
     args["embodiment_name"] = embodiment_name
     args['task_config'] = task_config
     args["save_path"] = os.path.join(args["save_path"], str(args["task_name"]), args["task_config"])
-    run(task, args)
+    run(task, args, workers=workers, seed_chunk=seed_chunk)
 
 
-def run(TASK_ENV, args):
+def save_seed_list(save_path, seed_list):
+    seed_file = os.path.join(save_path, "seed.txt")
+    with open(seed_file + ".tmp", "w") as file:
+        for sed in seed_list:
+            file.write("%s " % sed)
+    os.replace(seed_file + ".tmp", seed_file)
+
+
+def save_scene_info(save_path, info_db):
+    info_file_path = os.path.join(save_path, "scene_info.json")
+    with open(info_file_path + ".tmp", "w", encoding="utf-8") as file:
+        json.dump(info_db, file, ensure_ascii=False, indent=4)
+    os.replace(info_file_path + ".tmp", info_file_path)
+
+
+def load_scene_info(save_path):
+    info_file_path = os.path.join(save_path, "scene_info.json")
+    if not os.path.exists(info_file_path):
+        return {}
+    with open(info_file_path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def try_seed(TASK_ENV, args, seed, ep_num=None):
+    """
+    Plan one episode with the expert and report whether the seed is usable.
+    `ep_num` is the episode the seed becomes on success, None in worker processes, which do not know it.
+    Returns (success, traj_data), traj_data is None on failure.
+    """
+    traj_data = None
+    ep_name = f"episode {ep_num}" if ep_num is not None else "seed"
+    try:
+        TASK_ENV.setup_demo(now_ep_num=ep_num if ep_num is not None else 0, seed=seed, **args)
+        TASK_ENV.play_once()
+
+        if TASK_ENV.plan_success and TASK_ENV.check_success():
+            print(f"simulate data {ep_name} success! (seed = {seed})")
+            traj_data = {
+                "left_joint_path": deepcopy(TASK_ENV.left_joint_path),
+                "right_joint_path": deepcopy(TASK_ENV.right_joint_path),
+            }
+        else:
+            print(f"simulate data {ep_name} fail! (seed = {seed})")
+        print(TASK_ENV.robot.plan_cache.summary())
+        if TASK_ENV.cluttered_table and len(TASK_ENV.cluttered_attempts) > 0:
+            print(f"cluttered table: {len(TASK_ENV.record_cluttered_objects)} objects placed, "
+                  f"pose samples per object {TASK_ENV.cluttered_attempts}")
+
+        TASK_ENV.close_env()
+
+        if args["render_freq"]:
+            TASK_ENV.viewer.close()
+    except UnStableError as e:
+        print(" -------------")
+        print(f"simulate data {ep_name} fail! (seed = {seed})")
+        print("Error: ", e)
+        print(" -------------")
+        TASK_ENV.close_env()
+
+        if args["render_freq"]:
+            TASK_ENV.viewer.close()
+        time.sleep(0.3)
+    except Exception as e:
+        # stack_trace = traceback.format_exc()
+        print(" -------------")
+        print(f"simulate data {ep_name} fail! (seed = {seed})")
+        print("Error: ", e)
+        print(" -------------")
+        TASK_ENV.close_env()
+
+        if args["render_freq"]:
+            TASK_ENV.viewer.close()
+        time.sleep(1)
+
+    return traj_data is not None, traj_data
+
+
+def collect_episode(TASK_ENV, args, episode_idx, seed, clear_cache=False):
+    """
+    Replay the saved trajectory of one episode and write its hdf5 / video.
+    Returns the episode info used by scene_info.json.
+    """
+    print(f"\033[34mTask name: {args['task_name']}\033[0m")
+
+    TASK_ENV.setup_demo(now_ep_num=episode_idx, seed=seed, **args)
+
+    traj_data = TASK_ENV.load_tran_data(episode_idx)
+    args["left_joint_path"] = traj_data["left_joint_path"]
+    args["right_joint_path"] = traj_data["right_joint_path"]
+    TASK_ENV.set_path_lst(args)
+
+    info = TASK_ENV.play_once()
+
+    TASK_ENV.close_env(clear_cache=clear_cache)
+    TASK_ENV.merge_pkl_to_hdf5_video()
+    TASK_ENV.remove_data_cache()
+    assert TASK_ENV.check_success(), "Collect Error"
+    return info
+
+
+def run(TASK_ENV, args, workers=1, seed_chunk=1):
     epid, suc_num, fail_num, seed_list = 0, 0, 0, []
 
     print(f"Task Name: \033[34m{args['task_name']}\033[0m")
@@ -111,6 +216,14 @@ def run(TASK_ENV, args):
     # =========== Collect Seed ===========
     os.makedirs(args["save_path"], exist_ok=True)
 
+    if workers > 1:
+        pool = CollectWorkerPool(args["task_name"], workers)
+        if args["render_freq"]:
+            print("render_freq is ignored when collecting with multiple workers")
+            args["render_freq"] = 0
+    else:
+        pool = None
+
     if not args["use_seed"]:
         print("\033[93m" + "[Start Seed and Pre Motion Data Collection]" + "\033[0m")
         args["need_plan"] = True
@@ -124,53 +237,29 @@ def run(TASK_ENV, args):
                     epid = max(seed_list) + 1
             print(f"Exist seed file, Start from: {epid} / {suc_num}")
 
-        while suc_num < args["episode_num"]:
-            try:
-                TASK_ENV.setup_demo(now_ep_num=suc_num, seed=epid, **args)
-                TASK_ENV.play_once()
-
-                if TASK_ENV.plan_success and TASK_ENV.check_success():
-                    print(f"simulate data episode {suc_num} success! (seed = {epid})")
-                    seed_list.append(epid)
-                    TASK_ENV.save_traj_data(suc_num)
+        if pool is None:
+            seed_results = ((seed, *try_seed(TASK_ENV, args, seed, suc_num)) for seed in itertools.count(epid))
+        else:
+            seed_results = pool.search_seeds(args, epid, seed_chunk)
+
+        # results arrive in seed order, so accepted seeds become episodes in seed order
+        if suc_num < args["episode_num"]:
+            for seed, success, traj_data in seed_results:
+                if success:
+                    if pool is not None:
+                        print(f"seed {seed} -> episode {suc_num}")
+                    seed_list.append(seed)
+                    save_pkl(os.path.join(args["save_path"], "_traj_data", f"episode{suc_num}.pkl"), traj_data)
                     suc_num += 1
                 else:
-                    print(f"simulate data episode {suc_num} fail! (seed = {epid})")
                     fail_num += 1
+                epid = seed + 1
+                save_seed_list(args["save_path"], seed_list)
+                if suc_num >= args["episode_num"]:
+                    break
 
-                TASK_ENV.close_env()
-
-                if args["render_freq"]:
-                    TASK_ENV.viewer.close()
-            except UnStableError as e:
-                print(" -------------")
-                print(f"simulate data episode {suc_num} fail! (seed = {epid})")
-                print("Error: ", e)
-                print(" -------------")
-                fail_num += 1
-                TASK_ENV.close_env()
-
-                if args["render_freq"]:
-                    TASK_ENV.viewer.close()
-                time.sleep(0.3)
-            except Exception as e:
-                # stack_trace = traceback.format_exc()
-                print(" -------------")
-                print(f"simulate data episode {suc_num} fail! (seed = {epid})")
-                print("Error: ", e)
-                print(" -------------")
-                fail_num += 1
-                TASK_ENV.close_env()
-
-                if args["render_freq"]:
-                    TASK_ENV.viewer.close()
-                time.sleep(1)
-
-            epid += 1
-
-            with open(os.path.join(args["save_path"], "seed.txt"), "w") as file:
-                for sed in seed_list:
-                    file.write("%s " % sed)
+        if pool is not None:
+            pool.drain()
 
         print(f"\nComplete simulation, failed \033[91m{fail_num}\033[0m times / {epid} tries \n")
     else:
@@ -199,40 +288,180 @@ def run(TASK_ENV, args):
         while exist_hdf5(st_idx):
             st_idx += 1
 
-        for episode_idx in range(st_idx, args["episode_num"]):
-            print(f"\033[34mTask name: {args['task_name']}\033[0m")
-
-            TASK_ENV.setup_demo(now_ep_num=episode_idx, seed=seed_list[episode_idx], **args)
-
-            traj_data = TASK_ENV.load_tran_data(episode_idx)
-            args["left_joint_path"] = traj_data["left_joint_path"]
-            args["right_joint_path"] = traj_data["right_joint_path"]
-            TASK_ENV.set_path_lst(args)
-
-            info_file_path = os.path.join(args["save_path"], "scene_info.json")
-
-            if not os.path.exists(info_file_path):
-                with open(info_file_path, "w", encoding="utf-8") as file:
-                    json.dump({}, file, ensure_ascii=False)
-
-            with open(info_file_path, "r", encoding="utf-8") as file:
-                info_db = json.load(file)
-
-            info = TASK_ENV.play_once()
-            info_db[f"episode_{episode_idx}"] = info
-
-            with open(info_file_path, "w", encoding="utf-8") as file:
-                json.dump(info_db, file, ensure_ascii=False, indent=4)
-
-            TASK_ENV.close_env(clear_cache=((episode_idx + 1) % clear_cache_freq == 0))
-            TASK_ENV.merge_pkl_to_hdf5_video()
-            TASK_ENV.remove_data_cache()
-            assert TASK_ENV.check_success(), "Collect Error"
+        info_db = load_scene_info(args["save_path"])
+
+        if pool is None:
+            for episode_idx in range(st_idx, args["episode_num"]):
+                info = collect_episode(
+                    TASK_ENV,
+                    args,
+                    episode_idx,
+                    seed_list[episode_idx],
+                    clear_cache=((episode_idx + 1) % clear_cache_freq == 0),
+                )
+                info_db[f"episode_{episode_idx}"] = info
+                save_scene_info(args["save_path"], info_db)
+        else:
+            episode_ids = [idx for idx in range(st_idx, args["episode_num"]) if not exist_hdf5(idx)]
+            for episode_idx, info in pool.collect_episodes(args, episode_ids, seed_list):
+                info_db[f"episode_{episode_idx}"] = info
+                save_scene_info(args["save_path"], info_db)
+
+    if pool is not None:
+        pool.close()
 
+    if args["collect_data"]:
         command = f"cd description && bash gen_episode_instructions.sh {args['task_name']} {args['task_config']} {args['language_num']}"
         os.system(command)
 
 
+# =========== Multi-process Collection ===========
+
+
+def _collect_worker_loop(task_name, task_queue, result_queue):
+    """
+    Worker process, owns its own task instance (and thus its own SAPIEN scene and planners).
+    """
+    TASK_ENV = class_decorator(task_name)
+    collect_cnt = 0
+    while True:
+        job = task_queue.get()
+        if job is None:
+            break
+        job_type, job_id, args, payload = job
+        try:
+            if job_type == "seed":
+                st_seed, ed_seed = payload
+                res = [(seed, *try_seed(TASK_ENV, args, seed)) for seed in range(st_seed, ed_seed)]
+            elif job_type == "collect":
+                episode_idx, seed = payload
+                collect_cnt += 1
+                res = collect_episode(
+                    TASK_ENV,
+                    args,
+                    episode_idx,
+                    seed,
+                    clear_cache=(collect_cnt % args["clear_cache_freq"] == 0),
+                )
+            result_queue.put((job_id, True, res))
+        except Exception:
+            result_queue.put((job_id, False, traceback.format_exc()))
+
+
+class CollectWorkerPool:
+    """
+    A fixed set of worker processes, each holding one Base_Task instance.
+    The coordinator (this process) hands out jobs and consumes results in submission order.
+    """
+
+    def __init__(self, task_name, workers):
+        ctx = multiprocessing.get_context("spawn")
+        self.workers = workers
+        self.task_queue = ctx.Queue()
+        self.result_queue = ctx.Queue()
+        self.job_cnt = 0
+        self.outstanding = set()
+        self.finished = {}
+        self.procs = []
+        for _ in range(workers):
+            # not daemonic: the robot may start its own planner processes
+            proc = ctx.Process(target=_collect_worker_loop, args=(task_name, self.task_queue, self.result_queue))
+            proc.start()
+            self.procs.append(proc)
+
+    def _submit(self, job_type, args, payload):
+        job_id = self.job_cnt
+        self.job_cnt += 1
+        self.outstanding.add(job_id)
+        self.task_queue.put((job_type, job_id, args, payload))
+        return job_id
+
+    def _wait(self, job_id):
+        while job_id not in self.finished:
+            res_id, ok, res = self.result_queue.get()
+            if not ok:
+                self.terminate()
+                raise RuntimeError(f"collect worker failed:\n{res}")
+            self.outstanding.discard(res_id)
+            self.finished[res_id] = res
+        return self.finished.pop(job_id)
+
+    def _iter_in_order(self, next_job):
+        """
+        Keep every worker busy and yield results in submission order.
+        `next_job` returns (job_type, args, payload), or None when there is nothing left to submit.
+        """
+        pending = deque()
+        while True:
+            while len(pending) < 2 * self.workers:
+                job = next_job()
+                if job is None:
+                    break
+                pending.append(self._submit(*job))
+            if not pending:
+                return
+            yield self._wait(pending.popleft())
+
+    def search_seeds(self, args, st_seed, seed_chunk=1):
+        """
+        Yield (seed, success, traj_data) for st_seed, st_seed + 1, ... in seed order.
+        The caller stops consuming once enough seeds are found and then calls `drain`.
+        """
+        next_seed = st_seed
+
+        def next_job():
+            nonlocal next_seed
+            job = ("seed", args, (next_seed, next_seed + seed_chunk))
+            next_seed += seed_chunk
+            return job
+
+        for res in self._iter_in_order(next_job):
+            yield from res
+
+    def collect_episodes(self, args, episode_ids, seed_list):
+        """
+        Yield (episode_idx, info) for every episode in `episode_ids`, in order.
+        """
+        episode_iter = iter(episode_ids)
+        submitted = deque()
+
+        def next_job():
+            episode_idx = next(episode_iter, None)
+            if episode_idx is None:
+                return None
+            submitted.append(episode_idx)
+            return ("collect", args, (episode_idx, seed_list[episode_idx]))
+
+        for info in self._iter_in_order(next_job):
+            yield submitted.popleft(), info
+
+    def drain(self):
+        """
+        Drop the jobs that are no longer needed, and wait for the ones already running.
+        """
+        while True:
+            try:
+                job = self.task_queue.get(timeout=0.1)
+            except queue.Empty:
+                break
+            self.outstanding.discard(job[1])
+        while self.outstanding:
+            res_id, _, _ = self.result_queue.get()
+            self.outstanding.discard(res_id)
+        self.finished.clear()
+
+    def close(self):
+        for _ in self.procs:
+            self.task_queue.put(None)
+        for proc in self.procs:
+            proc.join()
+
+    def terminate(self):
+        for proc in self.procs:
+            proc.terminate()
+            proc.join()
+
+
 if __name__ == "__main__":
     from test_render import Sapien_TEST
     Sapien_TEST()
@@ -243,8 +472,10 @@ if __name__ == "__main__":
     parser = ArgumentParser()
     parser.add_argument("task_name", type=str)
     parser.add_argument("task_config", type=str)
+    parser.add_argument("--workers", type=int, default=1, help="number of collection processes")
+    parser.add_argument("--seed_chunk", type=int, default=1, help="seeds handed to a worker at a time")
     parser = parser.parse_args()
     task_name = parser.task_name
     task_config = parser.task_config
 
-    main(task_name=task_name, task_config=task_config)
+    main(task_name=task_name, task_config=task_config, workers=parser.workers, seed_chunk=parser.seed_chunk)
@@ -0,0 +1,99 @@
+"""
+Compares two collections of the same task config, e.g. a single-process and a multi-worker run.
+
+Diffs seed.txt, every _traj_data/episode<i>.pkl (planned joint paths) and every dataset of data/episode<i>.hdf5.
+Exits non-zero if anything differs.
+
+    bash collect_data.sh beat_block_hammer demo_clean 0 1 && mv data/beat_block_hammer/demo_clean /tmp/workers_1
+    bash collect_data.sh beat_block_hammer demo_clean 0 4 && mv data/beat_block_hammer/demo_clean /tmp/workers_4
+    python script/compare_collected_data.py /tmp/workers_1 /tmp/workers_4
+"""
+import os
+import sys
+import pickle
+from argparse import ArgumentParser
+
+import h5py
+import numpy as np
+
+
+def read_seeds(save_path):
+    with open(os.path.join(save_path, "seed.txt"), "r") as file:
+        return [int(seed) for seed in file.read().split()]
+
+
+def diff_values(name, a, b, atol):
+    if isinstance(a, dict) and isinstance(b, dict):
+        if a.keys() != b.keys():
+            return [f"{name}: keys {sorted(a.keys() ^ b.keys())}"]
+        return [diff for key in a for diff in diff_values(f"{name}.{key}", a[key], b[key], atol)]
+    if isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+        if len(a) != len(b):
+            return [f"{name}: length {len(a)} vs {len(b)}"]
+        return [diff for idx, (x, y) in enumerate(zip(a, b)) for diff in diff_values(f"{name}[{idx}]", x, y, atol)]
+    a, b = np.asarray(a), np.asarray(b)
+    if a.shape != b.shape:
+        return [f"{name}: shape {a.shape} vs {b.shape}"]
+    if a.dtype.kind in "fc" and b.dtype.kind in "fc":
+        if not np.allclose(a, b, atol=atol):
+            return [f"{name}: max diff {np.max(np.abs(a - b)):.2e}"]
+        return []
+    return [] if np.array_equal(a, b) else [f"{name}: values differ"]
+
+
+def diff_hdf5(path_a, path_b, atol):
+    diffs = []
+    with h5py.File(path_a, "r") as file_a, h5py.File(path_b, "r") as file_b:
+        names_a, names_b = [], []
+        file_a.visititems(lambda name, obj: names_a.append(name) if isinstance(obj, h5py.Dataset) else None)
+        file_b.visititems(lambda name, obj: names_b.append(name) if isinstance(obj, h5py.Dataset) else None)
+        if set(names_a) != set(names_b):
+            diffs.append(f"datasets {sorted(set(names_a) ^ set(names_b))}")
+        for name in sorted(set(names_a) & set(names_b)):
+            diffs.extend(diff_values(name, file_a[name][()], file_b[name][()], atol))
+    return diffs
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("save_path_a", type=str, help="data/<task>/<config> of the first run")
+    parser.add_argument("save_path_b", type=str, help="data/<task>/<config> of the second run")
+    parser.add_argument("--atol", type=float, default=0, help="tolerance for float arrays, 0: exact")
+    usr_args = parser.parse_args()
+
+    seeds_a, seeds_b = read_seeds(usr_args.save_path_a), read_seeds(usr_args.save_path_b)
+    differing = 0
+    if seeds_a != seeds_b:
+        differing += 1
+        print(f"\033[91mseed.txt differs:\033[0m {seeds_a} vs {seeds_b}")
+
+    for episode_idx in range(min(len(seeds_a), len(seeds_b))):
+        diffs = []
+        for sub_path, differ in [
+            (os.path.join("_traj_data", f"episode{episode_idx}.pkl"), None),
+            (os.path.join("data", f"episode{episode_idx}.hdf5"), diff_hdf5),
+        ]:
+            path_a = os.path.join(usr_args.save_path_a, sub_path)
+            path_b = os.path.join(usr_args.save_path_b, sub_path)
+            if not os.path.exists(path_a) or not os.path.exists(path_b):
+                if os.path.exists(path_a) != os.path.exists(path_b):
+                    diffs.append(f"{sub_path} exists in only one run")
+                continue
+            if differ is not None:
+                diffs.extend(f"{sub_path}: {diff}" for diff in differ(path_a, path_b, usr_args.atol))
+                continue
+            with open(path_a, "rb") as file_a, open(path_b, "rb") as file_b:
+                diffs.extend(
+                    diff_values(sub_path, pickle.load(file_a), pickle.load(file_b), usr_args.atol))
+        if diffs:
+            differing += 1
+            print(f"\033[91mepisode {episode_idx}:\033[0m " + "; ".join(diffs[:5]) +
+                  (f" (+{len(diffs) - 5} more)" if len(diffs) > 5 else ""))
+
+    if differing:
+        sys.exit(f"{differing} differences between {usr_args.save_path_a} and {usr_args.save_path_b}")
+    print(f"\033[92mseeds, joint paths and episodes of {len(seeds_a)} episodes are identical\033[0m")
+
+
+if __name__ == "__main__":
+    main()
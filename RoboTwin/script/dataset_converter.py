@@ -0,0 +1,251 @@
+"""
+Shared episode conversion for the policy process_data scripts.
+
+A converter is a function `convert(episode, episode_id)` that reads one collected episode through a
+LazyEpisode (envs/utils/parse_hdf5.py) and returns what its writer stores, or None to skip the episode.
+`run_conversion` fans episodes out to a process pool and hands the results to a writer:
+  - Hdf5EpisodeWriter: one hdf5 file per episode, written in the worker (nothing large goes back through the
+    pool), resumable.
+  - ZarrWriter: one zarr replay buffer (data/<key> + meta/episode_ends) for all episodes, appended to in the
+    main process in episode order.
+  - LeRobotWriter: adds the frames of each episode to a LeRobotDataset in the main process, in episode order.
+
+Policy scripts run from policy/<name> and import this module with sys.path.append("../../script").
+"""
+import os
+import sys
+import json
+import shutil
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import h5py
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "envs", "utils"))
+from parse_hdf5 import LazyEpisode
+
+
+def robotwin_episodes(load_dir, episode_num):
+    """
+    [(episode_id, hdf5 path)] of the first `episode_num` episodes collected in data/<task>/<config>.
+    """
+    return [(i, os.path.join(load_dir, "data", f"episode{i}.hdf5")) for i in range(episode_num)]
+
+
+def jpeg_frames(frames, index=slice(None), size=None):
+    """
+    JPEG payload of frames[index] (LazyFrames) as (array, dtype) for Hdf5EpisodeWriter. The collected JPEG bytes
+    are copied through unchanged when `size` (w, h) is None or already the frame size, otherwise the frames are
+    decoded, resized and re-encoded with the cv2 defaults the collector uses.
+    """
+    if size is None or len(frames) == 0 or tuple(frames.shape[2:0:-1]) == tuple(size):
+        data = frames.dataset[index]
+        return data, data.dtype
+    encode_data = []
+    for frame in frames[index]:
+        success, encoded_image = cv2.imencode(".jpg", cv2.resize(frame, tuple(size)))
+        if not success:
+            raise ValueError("cv2.imencode failed to encode the image")
+        encode_data.append(encoded_image.tobytes())
+    return encode_data, f"S{max(len(buf) for buf in encode_data)}"
+
+
+class Hdf5EpisodeWriter:
+    """
+    Writes the dict returned by the converter into `save_path/<file_pattern>` for each episode. Nested dicts
+    become groups, values are arrays, (array, dtype) or (array, dtype, chunks). Finished episode ids are recorded in
+    `save_path/progress.json`, so a rerun with resume=True skips them.
+    """
+    in_worker = True
+    resumable = True
+
+    def __init__(self, save_path, file_pattern="episode_{}.hdf5"):
+        self.save_path = save_path
+        self.file_pattern = file_pattern
+
+    def open(self, resume=False):
+        os.makedirs(self.save_path, exist_ok=True)
+
+    def episode_path(self, episode_id):
+        return os.path.join(self.save_path, self.file_pattern.format(episode_id))
+
+    def write(self, episode_id, data):
+        path = self.episode_path(episode_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with h5py.File(path, "w") as f:
+            self._write_group(f, data)
+
+    def _write_group(self, group, data):
+        for key, value in data.items():
+            if isinstance(value, dict):
+                self._write_group(group.create_group(key), value)
+            elif isinstance(value, tuple):
+                group.create_dataset(key, data=value[0], dtype=value[1], chunks=value[2] if len(value) > 2 else None)
+            else:
+                group.create_dataset(key, data=value)
+
+    def close(self):
+        pass
+
+
+class ZarrWriter:
+    """
+    Appends the per-episode arrays returned by the converter ({key: array with the step as first axis}) to
+    `save_path` as they arrive, with the layout ReplayBuffer.copy_from_path reads: data/<key> and
+    meta/episode_ends. Only the episode being written is held in memory. `dtypes` optionally casts keys
+    (e.g. {"state": "float32"}), `chunks` sets the steps per chunk of a key (e.g. {"head_camera": 1}), other
+    keys use `chunk_len`.
+    """
+    in_worker = False
+    resumable = False
+
+    def __init__(self, save_path, dtypes=None, chunks=None, chunk_len=100):
+        self.save_path = save_path
+        self.dtypes = dtypes or {}
+        self.chunks = chunks or {}
+        self.chunk_len = chunk_len
+
+    def open(self, resume=False):
+        import zarr
+
+        if os.path.exists(self.save_path):
+            shutil.rmtree(self.save_path)
+        self.compressor = zarr.Blosc(cname="zstd", clevel=3, shuffle=1)
+        zarr_root = zarr.group(self.save_path)
+        self.zarr_data = zarr_root.create_group("data")
+        self.zarr_episode_ends = zarr_root.create_group("meta").zeros(
+            "episode_ends",
+            shape=(0, ),
+            chunks=(1024, ),
+            dtype="int64",
+            compressor=self.compressor,
+        )
+        self.total_count = 0
+
+    def _array(self, key, value):
+        if key not in self.zarr_data:
+            self.zarr_data.zeros(
+                key,
+                shape=(0, *value.shape[1:]),
+                chunks=(self.chunks.get(key, self.chunk_len), *value.shape[1:]),
+                dtype=self.dtypes.get(key, value.dtype),
+                compressor=self.compressor,
+            )
+        return self.zarr_data[key]
+
+    def write(self, episode_id, data):
+        episode_len = len(next(iter(data.values())))
+        for key, value in data.items():
+            value = np.asarray(value)
+            assert len(value) == episode_len, f"{key} has {len(value)} steps, expected {episode_len}"
+            self._array(key, value).append(value, axis=0)
+        self.total_count += episode_len
+        # episode_ends last, so an interrupted run never lists an episode whose data is incomplete
+        self.zarr_episode_ends.append(np.array([self.total_count]))
+
+    def close(self):
+        pass
+
+
+class LeRobotWriter:
+    """
+    Adds episodes to a LeRobotDataset (created by the caller, e.g. LeRobotDataset.create). The converter returns
+    {"frames": [frame dict per step], "task": instruction}.
+    """
+    in_worker = False
+    resumable = False
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+
+    def open(self, resume=False):
+        pass
+
+    def write(self, episode_id, data):
+        for frame in data["frames"]:
+            self.dataset.add_frame(frame, task=data["task"])
+        self.dataset.save_episode()
+
+    def close(self):
+        pass
+
+
+def _load_progress(path):
+    if not os.path.exists(path):
+        return set()
+    with open(path, "r") as f:
+        return set(json.load(f)["done"])
+
+
+def _save_progress(path, done):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"done": sorted(done)}, f)
+    os.replace(tmp_path, path)
+
+
+def _init_worker():
+    import cv2
+
+    cv2.setNumThreads(1)  # one episode per process, avoid oversubscribing cores
+
+
+def _convert_episode(convert, writer, episode_id, hdf5_path):
+    """
+    `writer` is only passed (and written to here) for writers running in the workers.
+    """
+    if not os.path.isfile(hdf5_path):
+        raise FileNotFoundError(f"Dataset does not exist at \n{hdf5_path}\n")
+    with LazyEpisode(hdf5_path, cache_size=0) as episode:
+        result = convert(episode, episode_id)
+    if writer is not None:
+        if result is not None:
+            writer.write(episode_id, result)
+        return None
+    return result
+
+
+def run_conversion(convert, writer, episodes, workers=None, resume=False):
+    """
+    Convert `episodes` ([(episode_id, hdf5 path)]) with `convert` on `workers` processes (default: all cores,
+    0: in this process) and store them with `writer`. Results reach writers that run in this process in
+    episode order; at most 2 * workers episodes are in flight. Returns the number of converted episodes.
+    """
+    workers = os.cpu_count() if workers is None else workers
+    writer.open(resume=resume)
+    progress_path = os.path.join(writer.save_path, "progress.json") if writer.resumable else None
+    done = _load_progress(progress_path) if progress_path is not None and resume else set()
+    todo = [(episode_id, path) for episode_id, path in episodes if episode_id not in done]
+    worker_writer = writer if writer.in_worker else None
+
+    def finish(episode_id, result):
+        if not writer.in_worker and result is not None:
+            writer.write(episode_id, result)
+        if progress_path is not None:
+            done.add(episode_id)
+            _save_progress(progress_path, done)
+        print(f"processing episode: {len(done) if progress_path is not None else episode_id + 1} / {len(episodes)}",
+              end="\r")
+
+    if workers == 0:
+        for episode_id, path in todo:
+            finish(episode_id, _convert_episode(convert, worker_writer, episode_id, path))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            pending = deque()
+            todo = iter(todo)
+            for episode_id, path in todo:
+                pending.append((episode_id, pool.submit(_convert_episode, convert, worker_writer, episode_id, path)))
+                if len(pending) >= 2 * workers:
+                    break
+            while pending:
+                episode_id, future = pending.popleft()
+                finish(episode_id, future.result())
+                for next_id, path in todo:
+                    pending.append((next_id, pool.submit(_convert_episode, convert, worker_writer, next_id, path)))
+                    break
+    print()
+    writer.close()
+    return len(episodes)
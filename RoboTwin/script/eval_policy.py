@@ -7,6 +7,8 @@ sys.path.append(f"./policy")
 sys.path.append("./description/utils")
 from envs import CONFIGS_PATH
 from envs.utils.create_actor import UnStableError
+from script.expert_check_cache import ExpertCheckCache
+from script.vector_env import VectorTaskEnv
 
 import numpy as np
 from pathlib import Path
@@ -158,19 +160,46 @@ def main(usr_args):
     seed = usr_args["seed"]
 
     st_seed = 100000 * (1 + seed)
+    # seeds the expert already checked in earlier runs skip straight to the policy rollout
+    expert_cache = None
+    if usr_args.get("expert_check_cache", True):
+        expert_cache = ExpertCheckCache(
+            task_name,
+            task_config,
+            embodiment_name,
+            robot_files=[args["left_robot_file"], args["right_robot_file"]],
+        )
     suc_nums = []
     test_num = 100
     topk = 1
 
     model = get_model(usr_args)
-    st_seed, suc_num = eval_policy(task_name,
-                                   TASK_ENV,
-                                   args,
-                                   model,
-                                   st_seed,
-                                   test_num=test_num,
-                                   video_size=video_size,
-                                   instruction_type=instruction_type)
+    # run `eval_env_num` task instances in parallel if the policy implements eval_batch
+    eval_env_num = usr_args.get("eval_env_num", 1)
+    if eval_env_num > 1 and hasattr(importlib.import_module(policy_name), "eval_batch"):
+        TASK_ENVS = VectorTaskEnv(args["task_name"], eval_env_num)
+        try:
+            st_seed, suc_num = eval_policy_batch(task_name,
+                                                 TASK_ENVS,
+                                                 args,
+                                                 model,
+                                                 st_seed,
+                                                 test_num=test_num,
+                                                 video_size=video_size,
+                                                 instruction_type=instruction_type,
+                                                 expert_cache=expert_cache)
+        finally:
+            TASK_ENVS.close()
+    else:
+        st_seed, suc_num = eval_policy(task_name,
+                                       TASK_ENV,
+                                       args,
+                                       model,
+                                       st_seed,
+                                       test_num=test_num,
+                                       video_size=video_size,
+                                       instruction_type=instruction_type,
+                                       expert_cache=expert_cache)
     suc_nums.append(suc_num)
 
     topk_success_rate = sorted(suc_nums, reverse=True)[:topk]
@@ -193,7 +222,8 @@ def eval_policy(task_name,
                 st_seed,
                 test_num=100,
                 video_size=None,
-                instruction_type=None):
+                instruction_type=None,
+                expert_cache=None):
     print(f"\033[34mTask Name: {args['task_name']}\033[0m")
     print(f"\033[34mPolicy Name: {args['policy_name']}\033[0m")
 
@@ -214,36 +244,42 @@ def eval_policy(task_name,
     clear_cache_freq = args["clear_cache_freq"]
 
     args["eval_mode"] = True
+    # policies may declare which cameras / modalities they consume, see envs/_base_task.py get_obs
+    args["obs_spec"] = getattr(importlib.import_module(policy_name), "OBS_SPEC", None)
 
     while succ_seed < test_num:
         render_freq = args["render_freq"]
         args["render_freq"] = 0
 
         if expert_check:
-            try:
-                TASK_ENV.setup_demo(now_ep_num=now_id, seed=now_seed, is_test=True, **args)
-                episode_info = TASK_ENV.play_once()
-                TASK_ENV.close_env()
-            except UnStableError as e:
-                # print(" -------------")
-                # print("Error: ", e)
-                # print(" -------------")
-                TASK_ENV.close_env()
-                now_seed += 1
-                args["render_freq"] = render_freq
-                continue
-            except Exception as e:
-                # stack_trace = traceback.format_exc()
-                # print(" -------------")
-                # print("Error: ", e)
-                # print(" -------------")
-                TASK_ENV.close_env()
-                now_seed += 1
-                args["render_freq"] = render_freq
-                print("error occurs !")
-                continue
-
-        if (not expert_check) or (TASK_ENV.plan_success and TASK_ENV.check_success()):
+            cached = expert_cache.get(now_seed) if expert_cache is not None else None
+            if cached is not None:
+                expert_status = cached["status"]
+                episode_info = cached["episode_info"]
+            else:
+                expert_status = None
+                try:
+                    TASK_ENV.setup_demo(now_ep_num=now_id, seed=now_seed, is_test=True, **args)
+                    episode_info = TASK_ENV.play_once()
+                    TASK_ENV.close_env()
+                    expert_status = "success" if (TASK_ENV.plan_success and TASK_ENV.check_success()) else "fail"
+                except UnStableError as e:
+                    # print(" -------------")
+                    # print("Error: ", e)
+                    # print(" -------------")
+                    TASK_ENV.close_env()
+                    expert_status = "unstable"
+                except Exception as e:
+                    # stack_trace = traceback.format_exc()
+                    # print(" -------------")
+                    # print("Error: ", e)
+                    # print(" -------------")
+                    TASK_ENV.close_env()
+                    print("error occurs !")
+                if expert_cache is not None and expert_status is not None:
+                    expert_cache.put(now_seed, expert_status, episode_info if expert_status == "success" else None)
+
+        if (not expert_check) or expert_status == "success":
             succ_seed += 1
             suc_test_seed_list.append(now_seed)
         else:
@@ -321,9 +357,118 @@ def eval_policy(task_name,
         # TASK_ENV._take_picture()
         now_seed += 1
 
+    if expert_cache is not None:
+        print(expert_cache.summary())
     return now_seed, TASK_ENV.suc
 
 
+def eval_policy_batch(task_name,
+                      TASK_ENVS,
+                      args,
+                      model,
+                      st_seed,
+                      test_num=100,
+                      video_size=None,
+                      instruction_type=None,
+                      expert_cache=None):
+    """
+    Same protocol as `eval_policy`, spread over the envs of a VectorTaskEnv.
+
+    Envs whose episode is running are stepped together: the policy's `eval_batch` gets all their
+    observations at once. Finished envs are refilled with the next seed while the others keep stepping.
+    Seeds are handed out in order and the first `test_num` expert-solvable seeds are scored, so the
+    result matches `eval_policy` regardless of the env count.
+    """
+    print(f"\033[34mTask Name: {args['task_name']}\033[0m")
+    print(f"\033[34mPolicy Name: {args['policy_name']}\033[0m")
+
+    policy_name = args["policy_name"]
+    eval_batch = eval_function_decorator(policy_name, "eval_batch")
+    reset_func = eval_function_decorator(policy_name, "reset_model")
+
+    clear_cache_freq = args["clear_cache_freq"]
+    args["eval_mode"] = True
+    args["render_freq"] = 0  # no viewer in the env workers
+    # policies may declare which cameras / modalities they consume, see envs/_base_task.py get_obs
+    args["obs_spec"] = getattr(importlib.import_module(policy_name), "OBS_SPEC", None)
+
+    now_seed = st_seed
+    now_id = 0
+    seed_results = {}  # seed -> None (expert failed) / rollout success
+    env_seed = {}
+    env_episode_num = [0] * TASK_ENVS.env_num
+    resetting = set()
+    running = {}  # env_id -> latest observation
+
+    def expert_succ_num():
+        return sum(1 for res in seed_results.values() if res is not None) + len(running)
+
+    def start_episode(env_id):
+        nonlocal now_seed, now_id
+        if expert_succ_num() >= test_num:
+            return
+        cached = expert_cache.get(now_seed) if expert_cache is not None else None
+        TASK_ENVS.call_async(env_id,
+                             "reset",
+                             episode_id=now_id,
+                             seed=now_seed,
+                             args=args,
+                             instruction_type=instruction_type,
+                             cached=cached,
+                             video_size=video_size,
+                             description_num=test_num)
+        env_seed[env_id] = (now_seed, cached is None)
+        resetting.add(env_id)
+        now_seed += 1
+        now_id += 1
+
+    for env_id in range(TASK_ENVS.env_num):
+        start_episode(env_id)
+
+    while resetting or running:
+        if running:
+            eval_batch(TASK_ENVS, model, dict(running))
+            for env_id in list(running.keys()):
+                if not TASK_ENVS.episode_done[env_id]:
+                    running[env_id] = TASK_ENVS.last_obs[env_id]
+                    continue
+                del running[env_id]
+                seed, _ = env_seed[env_id]
+                seed_results[seed] = bool(TASK_ENVS.episode_success[env_id])
+                env_episode_num[env_id] += 1
+                TASK_ENVS.call(env_id, "finish", clear_cache=(env_episode_num[env_id] % clear_cache_freq == 0))
+                print("\033[92mSuccess!\033[0m" if seed_results[seed] else "\033[91mFail!\033[0m")
+                finished = [res for res in seed_results.values() if res is not None]
+                print(
+                    f"\033[93m{task_name}\033[0m | \033[94m{args['policy_name']}\033[0m | \033[92m{args['task_config']}\033[0m | \033[91m{args['ckpt_setting']}\033[0m\n"
+                    f"Success rate: \033[96m{sum(finished)}/{len(finished)}\033[0m => \033[95m{round(sum(finished)/len(finished)*100, 1)}%\033[0m, current seed: \033[90m{seed}\033[0m\n"
+                )
+                start_episode(env_id)
+
+        for env_id in TASK_ENVS.ready(resetting, timeout=0 if running else None):
+            resetting.discard(env_id)
+            res = TASK_ENVS.call_wait(env_id)
+            seed, checked = env_seed[env_id]
+            if checked and expert_cache is not None and res["status"] is not None:
+                expert_cache.put(seed, res["status"], res["episode_info"])
+            if res["status"] != "success":
+                seed_results[seed] = None
+                start_episode(env_id)
+                continue
+            reset_func(model, env_id=env_id)
+            TASK_ENVS.episode_done[env_id] = False
+            running[env_id] = res["observation"]
+
+    # score the first test_num expert-solvable seeds, as the serial loop would
+    scored = [seed_results[seed] for seed in sorted(seed_results) if seed_results[seed] is not None][:test_num]
+    suc = sum(scored)
+    print(f"Success rate: \033[96m{suc}/{len(scored)}\033[0m")
+
+    if expert_cache is not None:
+        print(expert_cache.summary())
+    return now_seed, suc
+
+
 def parse_args_and_config():
     parser = argparse.ArgumentParser()
     parser.add_argument("--config", type=str, required=True)
@@ -7,6 +7,7 @@ sys.path.append(f"./policy")
 sys.path.append("./description/utils")
 from envs import CONFIGS_PATH
 from envs.utils.create_actor import UnStableError
+from script.expert_check_cache import ExpertCheckCache
 
 import numpy as np
 from pathlib import Path
@@ -48,50 +49,7 @@ parent_directory = os.path.dirname(current_file_path)
 import numpy as np
 import json
 from typing import Any
-import base64
-
-class NumpyEncoder(json.JSONEncoder):
-    """Enhanced json encoder for numpy types with array reconstruction info"""
-    def default(self, obj):
-        if isinstance(obj, np.ndarray):
-            if obj.dtype == np.float32:
-                dtype = 'float32'
-            elif obj.dtype == np.float64:
-                dtype = 'float64'
-            elif obj.dtype == np.int32:
-                dtype = 'int32'
-            elif obj.dtype == np.int64:
-                dtype = 'int64'
-            else:
-                dtype = str(obj.dtype)
-            
-            return {
-                '__numpy_array__': True,
-                'data': base64.b64encode(obj.tobytes()).decode('ascii'),
-                'dtype': dtype,
-                'shape': obj.shape
-            }
-        elif isinstance(obj, np.integer):
-            return int(obj)
-        elif isinstance(obj, np.floating):
-            return float(obj)
-        elif isinstance(obj, np.bool_):
-            return bool(obj)
-        return super().default(obj)
-
-def numpy_to_json(data: Any) -> str:
-    """Convert numpy-containing data to JSON string with reconstruction info"""
-    return json.dumps(data, cls=NumpyEncoder)
-
-def json_to_numpy(json_str: str) -> Any:
-    """Convert JSON string back to Python objects with numpy arrays"""
-    def object_hook(dct):
-        if '__numpy_array__' in dct:
-            data = base64.b64decode(dct['data'])
-            return np.frombuffer(data, dtype=dct['dtype']).reshape(dct['shape'])
-        return dct
-    
-    return json.loads(json_str, object_hook=object_hook)
+from script.wire_protocol import SHM_HELLO, ShmChannel, send_message, recv_message
 
 def class_decorator(task_name):
     envs_module = importlib.import_module(f"envs.{task_name}")
@@ -131,12 +89,22 @@ def get_embodiment_config(robot_file):
     return embodiment_args
 
 class ModelClient:
-    def __init__(self, host='localhost', port=9999, timeout=30):
+    def __init__(self, host='localhost', port=9999, timeout=30, protocol="auto"):
+        """
+        protocol (see script/wire_protocol.py):
+            "auto": shared memory if the server runs on this host, "binary" otherwise
+            "shm" / "binary": force a transport, "json": for servers without the binary protocol
+        """
         self.host = host
         self.port = port
         self.timeout = timeout
+        self.protocol = protocol
+        self.framing = "json" if protocol == "json" else "binary"
+        self.shm = None
         self.sock = None
         self._connect()
+        if protocol in ["auto", "shm"]:
+            self._setup_shm()
 
     def _connect(self):
         attempts = 0
@@ -163,46 +131,42 @@ class ModelClient:
                         f"Failed to connect to server after {max_attempts} attempts: {str(e)}"
                     )
 
+    def _is_local_server(self):
+        peer_host = self.sock.getpeername()[0]
+        return peer_host in ["127.0.0.1", "::1"] or peer_host == self.sock.getsockname()[0]
+
+    def _setup_shm(self):
+        """Switch to the shared memory transport if the server can read our segment"""
+        if self.protocol == "auto" and not self._is_local_server():
+            return
+        shm = ShmChannel()
+        try:
+            response = self._send_recv({"cmd": SHM_HELLO, "obs": shm.hello()})
+        except ConnectionError:
+            response = None
+        if response is not None and response.get("res") is True:
+            self.shm = shm
+            self.framing = "shm"
+            print("🔗 Using shared memory transport")
+            return
+        shm.close()
+        if response is None or "error" in response:
+            # servers without the shared memory transport drop the connection on unknown commands
+            self.close()
+            self._connect()
+        print("🔗 Shared memory transport unavailable, using binary socket transport")
+
     def _send_recv(self, data):
         """Send request and receive response with numpy array support"""
         try:
-            # Serialize with numpy support
-            json_data = numpy_to_json(data).encode('utf-8')
-            
-            # Send data length and data
-            self.sock.sendall(len(json_data).to_bytes(4, 'big'))
-            self.sock.sendall(json_data)
-            
-            # Receive and deserialize response
-            response = self._recv_response()
+            send_message(self.sock, data, framing=self.framing, shm=self.shm)
+            response, _ = recv_message(self.sock, shm=self.shm)
             return response
             
         except Exception as e:
             self.close()
             raise ConnectionError(f"Communication error: {str(e)}")
 
-    def _recv_response(self):
-        """Receive response with numpy array reconstruction"""
-        # Read response length
-        len_data = self.sock.recv(4)
-        if not len_data:
-            raise ConnectionError("Connection closed by server")
-        
-        size = int.from_bytes(len_data, 'big')
-        
-        # Read complete response
-        chunks = []
-        received = 0
-        while received < size:
-            chunk = self.sock.recv(min(size - received, 4096))
-            if not chunk:
-                raise ConnectionError("Incomplete response received")
-            chunks.append(chunk)
-            received += len(chunk)
-        
-        # Deserialize with numpy reconstruction
-        return json_to_numpy(b''.join(chunks).decode('utf-8'))
-
     def call(self, func_name=None, obs=None):
         response = self._send_recv({"cmd": func_name, "obs": obs})
         return response['res']
@@ -217,6 +181,10 @@ class ModelClient:
             finally:
                 self.sock = None
                 print("🔌 Connection closed")
+        if self.shm is not None:
+            self.shm.close()
+            self.shm = None
+            self.framing = "binary"
 
     def __enter__(self):
         return self
@@ -325,12 +293,21 @@ def main(usr_args):
     seed = usr_args["seed"]
 
     st_seed = 100000 * (1 + seed)
+    # seeds the expert already checked in earlier runs skip straight to the policy rollout
+    expert_cache = None
+    if usr_args.get("expert_check_cache", True):
+        expert_cache = ExpertCheckCache(
+            task_name,
+            task_config,
+            embodiment_name,
+            robot_files=[args["left_robot_file"], args["right_robot_file"]],
+        )
     suc_nums = []
     test_num = 100
     topk = 1
 
     # model = get_model(usr_args)
-    model = ModelClient(port=port)
+    model = ModelClient(port=port, protocol=usr_args.get("protocol", "auto"))
     st_seed, suc_num = eval_policy(task_name,
                                    TASK_ENV,
                                    args,
@@ -339,7 +316,8 @@ def main(usr_args):
                                    test_num=test_num,
                                    video_size=video_size,
                                    instruction_type=instruction_type,
-                                   policy_conda_env=policy_conda_env)
+                                   policy_conda_env=policy_conda_env,
+                                   expert_cache=expert_cache)
     suc_nums.append(suc_num)
 
     topk_success_rate = sorted(suc_nums, reverse=True)[:topk]
@@ -363,7 +341,8 @@ def eval_policy(task_name,
                 test_num=100,
                 video_size=None,
                 instruction_type=None,
-                policy_conda_env=None):
+                policy_conda_env=None,
+                expert_cache=None):
     print(f"\033[34mTask Name: {args['task_name']}\033[0m")
     print(f"\033[34mPolicy Name: {args['policy_name']}\033[0m")
 
@@ -389,30 +368,34 @@ def eval_policy(task_name,
         args["render_freq"] = 0
 
         if expert_check:
-            try:
-                TASK_ENV.setup_demo(now_ep_num=now_id, seed=now_seed, is_test=True, **args)
-                episode_info = TASK_ENV.play_once()
-                TASK_ENV.close_env()
-            except UnStableError as e:
-                print(" -------------")
-                print("Error: ", e)
-                print(" -------------")
-                TASK_ENV.close_env()
-                now_seed += 1
-                args["render_freq"] = render_freq
-                continue
-            except Exception as e:
-                stack_trace = traceback.format_exc()
-                print(" -------------")
-                print("Error: ", stack_trace)
-                print(" -------------")
-                TASK_ENV.close_env()
-                now_seed += 1
-                args["render_freq"] = render_freq
-                print("error occurs !")
-                continue
-
-        if (not expert_check) or (TASK_ENV.plan_success and TASK_ENV.check_success()):
+            cached = expert_cache.get(now_seed) if expert_cache is not None else None
+            if cached is not None:
+                expert_status = cached["status"]
+                episode_info = cached["episode_info"]
+            else:
+                expert_status = None
+                try:
+                    TASK_ENV.setup_demo(now_ep_num=now_id, seed=now_seed, is_test=True, **args)
+                    episode_info = TASK_ENV.play_once()
+                    TASK_ENV.close_env()
+                    expert_status = "success" if (TASK_ENV.plan_success and TASK_ENV.check_success()) else "fail"
+                except UnStableError as e:
+                    print(" -------------")
+                    print("Error: ", e)
+                    print(" -------------")
+                    TASK_ENV.close_env()
+                    expert_status = "unstable"
+                except Exception as e:
+                    stack_trace = traceback.format_exc()
+                    print(" -------------")
+                    print("Error: ", stack_trace)
+                    print(" -------------")
+                    TASK_ENV.close_env()
+                    print("error occurs !")
+                if expert_cache is not None and expert_status is not None:
+                    expert_cache.put(now_seed, expert_status, episode_info if expert_status == "success" else None)
+
+        if (not expert_check) or expert_status == "success":
             succ_seed += 1
             suc_test_seed_list.append(now_seed)
         else:
@@ -490,6 +473,8 @@ def eval_policy(task_name,
         # TASK_ENV._take_picture()
         now_seed += 1
 
+    if expert_cache is not None:
+        print(expert_cache.summary())
     return now_seed, TASK_ENV.suc
 
 
@@ -0,0 +1,74 @@
+import os
+import glob
+import json
+import hashlib
+
+# code the expert check runs besides the task itself: scene setup, planners, grasp selection, stability, timing
+EXPERT_SOURCES = [
+    "./envs/_base_task.py",
+    "./envs/robot/*.py",
+    "./envs/camera/*.py",
+    "./envs/utils/*.py",
+]
+
+
+class ExpertCheckCache:
+    """
+    Persistent result of the expert check that eval runs before every policy rollout.
+
+    One json file per (task name, task config, embodiment); the hash in its name covers the task config, the
+    task source, the shared env code in EXPERT_SOURCES and the config.yml of each robot in `robot_files`, so
+    editing any of them starts a fresh cache. Each entry maps a seed to
+        {"status": "success" | "fail" | "unstable", "episode_info": <play_once() result on success>}
+    Exceptions other than UnStableError are not cached, they are retried on the next run.
+    """
+
+    def __init__(
+        self,
+        task_name,
+        task_config,
+        embodiment_name,
+        robot_files=(),
+        cache_dir="./eval_result/_expert_check_cache",
+    ):
+        paths = [f"./task_config/{task_config}.yml", f"./envs/{task_name}.py"]
+        for pattern in EXPERT_SOURCES:
+            paths.extend(sorted(glob.glob(pattern)))
+        paths.extend(os.path.join(robot_file, "config.yml") for robot_file in robot_files)
+        config_hash = hashlib.sha1()
+        for path in paths:
+            if os.path.exists(path):
+                config_hash.update(path.encode())
+                with open(path, "rb") as f:
+                    config_hash.update(f.read())
+
+        os.makedirs(os.path.join(cache_dir, task_name), exist_ok=True)
+        self.cache_path = os.path.join(
+            cache_dir,
+            task_name,
+            f"{task_config}-{config_hash.hexdigest()[:12]}-{embodiment_name}.json",
+        )
+        self.entries = {}
+        if os.path.exists(self.cache_path):
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        self.hit_num = 0
+        self.miss_num = 0
+
+    def get(self, seed):
+        entry = self.entries.get(str(seed), None)
+        if entry is None:
+            self.miss_num += 1
+        else:
+            self.hit_num += 1
+        return entry
+
+    def put(self, seed, status, episode_info=None):
+        self.entries[str(seed)] = {"status": status, "episode_info": episode_info}
+        with open(self.cache_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=4)
+        os.replace(self.cache_path + ".tmp", self.cache_path)
+
+    def summary(self):
+        return (f"expert check cache: {self.hit_num} hits, {self.miss_num} misses "
+                f"({len(self.entries)} seeds in {self.cache_path})")
@@ -11,6 +11,9 @@ import yaml
 from datetime import datetime
 import importlib
 import argparse
+import inspect
+import itertools
+import queue
 from pathlib import Path
 from collections import deque
 
@@ -21,58 +24,140 @@ from envs._GLOBAL_CONFIGS import CONFIGS_PATH
 
 import numpy as np
 from typing import Any
-import base64
-
-
-class NumpyEncoder(json.JSONEncoder):
-    """JSON encoder extension for numpy types, includes reconstruction metadata"""
-    def default(self, obj):
-        if isinstance(obj, np.ndarray):
-            # Determine dtype for reconstruction
-            if obj.dtype == np.float32:
-                dtype = 'float32'
-            elif obj.dtype == np.float64:
-                dtype = 'float64'
-            elif obj.dtype == np.int32:
-                dtype = 'int32'
-            elif obj.dtype == np.int64:
-                dtype = 'int64'
-            else:
-                dtype = str(obj.dtype)
-            # Encode array bytes as base64
-            return {
-                '__numpy_array__': True,
-                'data': base64.b64encode(obj.tobytes()).decode('ascii'),
-                'dtype': dtype,
-                'shape': obj.shape
-            }
-        elif isinstance(obj, np.integer):
-            return int(obj)
-        elif isinstance(obj, np.floating):
-            return float(obj)
-        elif isinstance(obj, np.bool_):
-            return bool(obj)
-        return super().default(obj)
+from script.wire_protocol import SHM_HELLO, ConnectionClosed, ShmChannel, send_message, recv_message
+
+
+SERVER_METRICS = "__server_metrics__"
 
 
-def numpy_to_json(data: Any) -> str:
-    """Serialize Python data (including numpy arrays) to JSON string"""
-    return json.dumps(data, cls=NumpyEncoder)
+# --------------------- Request Batching ---------------------
+class _BatchRequest:
+    __slots__ = ("cmd", "client_id", "obs", "enqueue_time", "event", "result", "error")
 
+    def __init__(self, cmd, client_id, obs):
+        self.cmd = cmd
+        self.client_id = client_id
+        self.obs = obs
+        self.enqueue_time = time.perf_counter()
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
 
-def json_to_numpy(json_str: str) -> Any:
-    """Deserialize JSON string back to Python objects, reconstructing numpy arrays"""
-    def object_hook(dct):
-        if '__numpy_array__' in dct:
-            raw = base64.b64decode(dct['data'])
-            return np.frombuffer(raw, dtype=dct['dtype']).reshape(dct['shape'])
-        return dct
-    return json.loads(json_str, object_hook=object_hook)
+
+class BatchScheduler:
+    """
+    Collect concurrent requests of batchable commands from all clients and run them as one model call.
+
+    A batch is closed when it holds `max_batch_size` requests, when every connected client is waiting in it,
+    or `batch_window` seconds after its first request arrived. `batch_cmds` maps a command to the model's
+    batched method, which takes {client_id: obs} and returns {client_id: result}, so per-client state
+    (e.g. observation history) stays keyed by client.
+    """
+
+    def __init__(self, model, model_lock, batch_cmds, max_batch_size=8, batch_window=0.005,
+                 active_clients=None, log_every=100):
+        self.model = model
+        self.model_lock = model_lock
+        self.batch_cmds = {cmd: name for cmd, name in batch_cmds.items() if callable(getattr(model, name, None))}
+        self.max_batch_size = max_batch_size
+        self.batch_window = batch_window
+        self.active_clients = active_clients
+        self.log_every = log_every
+
+        self.queue = queue.Queue()
+        self.running = True
+        self.metrics_lock = threading.Lock()
+        self.request_num = 0
+        self.batch_num = 0
+        self.max_batch = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def can_batch(self, cmd):
+        return cmd in self.batch_cmds
+
+    def submit(self, cmd, client_id, obs):
+        """Block until the batch holding this request has run, return this client's result."""
+        request = _BatchRequest(cmd, client_id, obs)
+        self.queue.put(request)
+        request.event.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _collect(self):
+        try:
+            first = self.queue.get(timeout=0.5)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = first.enqueue_time + self.batch_window
+        while len(batch) < self.max_batch_size:
+            if self.active_clients is not None and len(batch) >= self.active_clients():
+                break  # nobody else can join
+            timeout = deadline - time.perf_counter()
+            try:
+                batch.append(self.queue.get(timeout=timeout) if timeout > 0 else self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while self.running:
+            batch = self._collect()
+            if len(batch) == 0:
+                continue
+            start_time = time.perf_counter()
+            for cmd in set(request.cmd for request in batch):
+                requests = [request for request in batch if request.cmd == cmd]
+                try:
+                    with self.model_lock:
+                        results = getattr(self.model, self.batch_cmds[cmd])(
+                            {request.client_id: request.obs for request in requests})
+                    for request in requests:
+                        request.result = results[request.client_id]
+                except Exception as e:
+                    for request in requests:
+                        request.error = e
+                for request in requests:
+                    request.event.set()
+            self._record(batch, start_time)
+
+    def _record(self, batch, start_time):
+        with self.metrics_lock:
+            self.request_num += len(batch)
+            self.batch_num += 1
+            self.max_batch = max(self.max_batch, len(batch))
+            for request in batch:
+                wait_time = start_time - request.enqueue_time
+                self.wait_time += wait_time
+                self.max_wait_time = max(self.max_wait_time, wait_time)
+        if self.log_every and self.batch_num % self.log_every == 0:
+            metrics = self.get_metrics()
+            print(f"📊 batches: {metrics['batch_num']}, mean batch size: {metrics['mean_batch_size']:.2f}, "
+                  f"queue wait: mean {metrics['mean_wait_ms']:.2f} ms / max {metrics['max_wait_ms']:.2f} ms")
+
+    def get_metrics(self):
+        with self.metrics_lock:
+            return {
+                "request_num": self.request_num,
+                "batch_num": self.batch_num,
+                "mean_batch_size": self.request_num / max(self.batch_num, 1),
+                "max_batch_size": self.max_batch,
+                "mean_wait_ms": self.wait_time / max(self.request_num, 1) * 1000,
+                "max_wait_ms": self.max_wait_time * 1000,
+            }
+
+    def stop(self):
+        self.running = False
+        self.thread.join(timeout=1)
 
 
 # --------------------- Model Server Implementation ---------------------
 class ModelServer:
-    def __init__(self, model, host='localhost', port=None):
+    def __init__(self, model, host='localhost', port=None, max_batch_size=8, batch_window=0.005, batch_cmds=None):
         self.model = model
         self.host = host
         self.port = port
@@ -81,6 +166,40 @@ class ModelServer:
         self.wait_interval = 10
         self.client_threads = []
 
+        # model calls from different clients are serialized, batchable ones are merged by the scheduler
+        self.model_lock = threading.Lock()
+        self.client_ids = itertools.count()
+        self.client_lock = threading.Lock()
+        self.active_client_num = 0
+        self.scheduler = None
+        if max_batch_size > 1:
+            self.scheduler = BatchScheduler(model,
+                                            self.model_lock,
+                                            batch_cmds or {"get_action": "get_action_batch"},
+                                            max_batch_size=max_batch_size,
+                                            batch_window=batch_window,
+                                            active_clients=lambda: self.active_client_num)
+            if len(self.scheduler.batch_cmds) == 0:
+                self.scheduler.stop()
+                self.scheduler = None
+
+    def get_metrics(self):
+        return self.scheduler.get_metrics() if self.scheduler is not None else {}
+
+    def _call_model(self, cmd, obs, client_id):
+        """Call a model method, passing the client id as env_id where the method keeps per-env state"""
+        method = getattr(self.model, cmd, None)
+        if not callable(method):
+            raise AttributeError(f"No model method named '{cmd}'")
+        kwargs = {}
+        try:
+            if "env_id" in inspect.signature(method).parameters:
+                kwargs["env_id"] = client_id
+        except (TypeError, ValueError):
+            pass
+        with self.model_lock:
+            return method(obs, **kwargs) if obs is not None else method(**kwargs)
+
     def start(self):
         """Start the model server and listen for incoming client connections"""
         self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -104,6 +223,8 @@ class ModelServer:
                 pass
         for t in self.client_threads:
             t.join(timeout=1)
+        if self.scheduler is not None:
+            self.scheduler.stop()
         print("🛑 Server has been stopped")
 
     def _accept_connections(self):
@@ -114,7 +235,7 @@ class ModelServer:
                 print(f"✅ Client connected from {addr}")
                 # Handle each client in a separate thread
                 t = threading.Thread(target=self._handle_client,
-                                     args=(client_socket,), daemon=True)
+                                     args=(client_socket, next(self.client_ids)), daemon=True)
                 t.start()
                 self.client_threads.append(t)
             except socket.timeout:
@@ -124,50 +245,42 @@ class ModelServer:
                     print(f"⚠️ Error accepting connection: {e}")
                 break
 
-    def _handle_client(self, client_socket):
+    def _handle_client(self, client_socket, client_id):
         """Process requests from a single client"""
+        with self.client_lock:
+            self.active_client_num += 1
+        shm = ShmChannel()  # shared memory transport, used once the client confirmed it runs on this host
         with client_socket:
             while self.running:
+                framing = "binary"
                 try:
-                    # Read message length header (4 bytes, big-endian)
-                    len_bytes = client_socket.recv(4)
-                    if not len_bytes:
-                        print("🔌 Client disconnected")
-                        break
-                    msg_length = int.from_bytes(len_bytes, 'big')
-
-                    # Read the full message based on length
-                    chunks = []
-                    remaining = msg_length
-                    while remaining > 0:
-                        chunk = client_socket.recv(min(remaining, 4096))
-                        if not chunk:
-                            raise ConnectionError("Incomplete data received")
-                        chunks.append(chunk)
-                        remaining -= len(chunk)
-                    raw_msg = b''.join(chunks).decode('utf-8')
-
-                    # Deserialize JSON to Python, reconstruct any numpy arrays
-                    data = json_to_numpy(raw_msg)
+                    # Requests are answered in their own framing: shm, binary or json (older clients)
+                    data, framing = recv_message(client_socket, shm=shm)
 
                     # Extract command and observation
                     cmd = data.get("cmd")
                     obs = data.get("obs")  # None if not provided
 
-                    # Find corresponding model method
-                    method = getattr(self.model, cmd, None)
-                    if not callable(method):
-                        raise AttributeError(f"No model method named '{cmd}'")
-
-                    # Call method with or without obs
-                    result = method(obs) if obs is not None else method()
+                    if cmd == SHM_HELLO:
+                        send_message(client_socket, {"res": shm.check_hello(obs)}, framing=framing, shm=shm)
+                        continue
+
+                    if cmd == SERVER_METRICS:
+                        result = self.get_metrics()
+                    elif self.scheduler is not None and self.scheduler.can_batch(cmd) and obs is not None:
+                        # merged with concurrent requests of other clients into one model call
+                        result = self.scheduler.submit(cmd, client_id, obs)
+                    else:
+                        # Call method with or without obs
+                        result = self._call_model(cmd, obs, client_id)
                     response = {"res": result}
 
-                    # Serialize response and send back with length header
-                    resp_bytes = numpy_to_json(response).encode('utf-8')
-                    client_socket.sendall(len(resp_bytes).to_bytes(4, 'big'))
-                    client_socket.sendall(resp_bytes)
+                    # Serialize response and send back in the request's framing
+                    send_message(client_socket, response, framing=framing, shm=shm)
 
+                except ConnectionClosed:
+                    print("🔌 Client disconnected")
+                    break
                 except (ConnectionResetError, BrokenPipeError):
                     print("🔌 Client connection lost")
                     break
@@ -175,10 +288,19 @@ class ModelServer:
                     err = f"Error handling request: {e}"
                     print(f"⚠️ {err}")
                     tb = traceback.format_exc()
-                    error_resp = numpy_to_json({"error": err, "traceback": tb}).encode('utf-8')
-                    client_socket.sendall(len(error_resp).to_bytes(4, 'big'))
-                    client_socket.sendall(error_resp)
+                    send_message(client_socket, {"error": err, "traceback": tb}, framing=framing, shm=shm)
                     break
+        shm.close()
+        self._release_client(client_id)
+        with self.client_lock:
+            self.active_client_num -= 1
+
+    def _release_client(self, client_id):
+        """Drop the per-env state the model kept for a disconnected client"""
+        release = getattr(self.model, "release_env", None)
+        if callable(release):
+            with self.model_lock:
+                release(client_id)
 
 
 # --------------------- Utility Decorators ---------------------
@@ -226,7 +348,10 @@ def main(usr_args):
     model = get_model(usr_args)
 
     # Start server in background thread
-    server = ModelServer(model, port=port)
+    server = ModelServer(model,
+                         port=port,
+                         max_batch_size=usr_args.get('batch_max_size', 8),
+                         batch_window=usr_args.get('batch_window_ms', 5) / 1000)
     thread = threading.Thread(target=server.start, daemon=True)
     thread.start()
 
@@ -0,0 +1,211 @@
+import sys
+import subprocess
+import importlib
+import traceback
+import multiprocessing
+from multiprocessing.connection import wait
+
+import numpy as np
+
+sys.path.append("./")
+sys.path.append("./description/utils")
+from envs.utils.create_actor import UnStableError
+
+
+def _open_eval_video(video_path, video_size):
+    return subprocess.Popen(
+        [
+            "ffmpeg",
+            "-y",
+            "-loglevel",
+            "error",
+            "-f",
+            "rawvideo",
+            "-pixel_format",
+            "rgb24",
+            "-video_size",
+            video_size,
+            "-framerate",
+            "10",
+            "-i",
+            "-",
+            "-pix_fmt",
+            "yuv420p",
+            "-vcodec",
+            "libx264",
+            "-crf",
+            "23",
+            video_path,
+        ],
+        stdin=subprocess.PIPE,
+    )
+
+
+def _env_reset(TASK_ENV, episode_id, seed, args, instruction_type, cached=None, video_size=None, description_num=100):
+    """
+    Expert-check the seed (unless `cached` already holds the result), then set the scene up for the policy.
+    Returns {"status", "episode_info", "instruction", "observation"}, the last two only on success.
+    """
+    from generate_episode_instructions import generate_episode_descriptions
+
+    render_freq = args["render_freq"]
+    args["render_freq"] = 0
+    if cached is not None:
+        status, episode_info = cached["status"], cached["episode_info"]
+    else:
+        status, episode_info = None, None
+        try:
+            TASK_ENV.setup_demo(now_ep_num=episode_id, seed=seed, is_test=True, **args)
+            episode_info = TASK_ENV.play_once()
+            TASK_ENV.close_env()
+            status = "success" if (TASK_ENV.plan_success and TASK_ENV.check_success()) else "fail"
+        except UnStableError as e:
+            TASK_ENV.close_env()
+            status = "unstable"
+        except Exception as e:
+            TASK_ENV.close_env()
+            print("error occurs !")
+    args["render_freq"] = render_freq
+
+    res = {"status": status, "episode_info": episode_info if status == "success" else None}
+    if status != "success":
+        return res
+
+    TASK_ENV.setup_demo(now_ep_num=episode_id, seed=seed, is_test=True, **args)
+    results = generate_episode_descriptions(args["task_name"], [episode_info["info"]], description_num)
+    instruction = np.random.choice(results[0][instruction_type])
+    TASK_ENV.set_instruction(instruction=instruction)  # set language instruction
+    TASK_ENV.test_num = episode_id
+
+    if TASK_ENV.eval_video_path is not None:
+        TASK_ENV._set_eval_video_ffmpeg(
+            _open_eval_video(f"{TASK_ENV.eval_video_path}/episode{episode_id}.mp4", video_size))
+
+    res["instruction"] = instruction
+    res["observation"] = TASK_ENV.get_obs()
+    return res
+
+
+def _env_step(TASK_ENV, actions, action_type="qpos"):
+    """
+    Execute an action chunk, stop early once the episode ends.
+    Returns the observation after every executed action and whether the episode succeeded / ended.
+    """
+    observations = TASK_ENV.take_action_chunk(actions, action_type=action_type)
+    return {
+        "observations": list(observations.values()),
+        "success": TASK_ENV.eval_success,
+        "done": TASK_ENV.eval_success or TASK_ENV.take_action_cnt >= TASK_ENV.step_lim,
+    }
+
+
+def _env_finish(TASK_ENV, clear_cache=False):
+    if TASK_ENV.eval_video_path is not None:
+        TASK_ENV._del_eval_video_ffmpeg()
+    TASK_ENV.close_env(clear_cache=clear_cache)
+
+
+_ENV_COMMANDS = {
+    "reset": _env_reset,
+    "step": _env_step,
+    "finish": _env_finish,
+}
+
+
+def _vector_env_worker(task_name, conn):
+    envs_module = importlib.import_module(f"envs.{task_name}")
+    TASK_ENV = getattr(envs_module, task_name)()
+    while True:
+        try:
+            command, kwargs = conn.recv()
+        except EOFError:
+            break
+        if command == "exit":
+            break
+        try:
+            if command in _ENV_COMMANDS:
+                res = _ENV_COMMANDS[command](TASK_ENV, **kwargs)
+            else:
+                res = getattr(TASK_ENV, command)(**kwargs)
+            conn.send(("ok", res))
+        except Exception:
+            conn.send(("error", traceback.format_exc()))
+    conn.close()
+
+
+class VectorTaskEnv:
+    """
+    `env_num` instances of a task, each in its own process with its own SAPIEN scene.
+
+    Commands are sent per env (`call_async` / `call_wait`), so envs can be reset asynchronously while others
+    are stepped in lockstep by `take_actions`. Workers are spawned, not forked, because each one starts its
+    own renderer and planner processes.
+    """
+
+    def __init__(self, task_name, env_num):
+        self.task_name = task_name
+        self.env_num = env_num
+        ctx = multiprocessing.get_context("spawn")
+        self.conns = []
+        self.processes = []
+        for _ in range(env_num):
+            parent_conn, child_conn = ctx.Pipe()
+            process = ctx.Process(target=_vector_env_worker, args=(task_name, child_conn))
+            process.start()
+            child_conn.close()
+            self.conns.append(parent_conn)
+            self.processes.append(process)
+
+        self.last_obs = {}
+        self.episode_success = {}
+        self.episode_done = {}
+
+    def call_async(self, env_id, command, **kwargs):
+        self.conns[env_id].send((command, kwargs))
+
+    def call_wait(self, env_id):
+        status, res = self.conns[env_id].recv()
+        if status == "error":
+            raise RuntimeError(f"env {env_id} failed:\n{res}")
+        return res
+
+    def call(self, env_id, command, **kwargs):
+        self.call_async(env_id, command, **kwargs)
+        return self.call_wait(env_id)
+
+    def ready(self, env_ids, timeout=None):
+        """
+        Ids among `env_ids` whose pending command has finished, waits up to `timeout` (None: until one is ready).
+        """
+        conn_ids = {self.conns[env_id]: env_id for env_id in env_ids}
+        return [conn_ids[conn] for conn in wait(list(conn_ids.keys()), timeout=timeout)]
+
+    def take_actions(self, actions: dict, action_type="qpos") -> dict:
+        """
+        actions: {env_id: action chunk}, executed on all envs at once.
+        Returns {env_id: [observation after each executed action]}.
+        """
+        for env_id, env_actions in actions.items():
+            self.call_async(env_id, "step", actions=env_actions, action_type=action_type)
+        res = {}
+        for env_id in actions.keys():
+            step_res = self.call_wait(env_id)
+            res[env_id] = step_res["observations"]
+            if len(step_res["observations"]) > 0:
+                self.last_obs[env_id] = step_res["observations"][-1]
+            self.episode_success[env_id] = step_res["success"]
+            self.episode_done[env_id] = step_res["done"]
+        return res
+
+    def close(self):
+        for conn, process in zip(self.conns, self.processes):
+            if process.is_alive():
+                try:
+                    conn.send(("exit", {}))
+                except (BrokenPipeError, OSError):
+                    pass
+        for conn, process in zip(self.conns, self.processes):
+            process.join(timeout=30)
+            if process.is_alive():
+                process.terminate()
+            conn.close()
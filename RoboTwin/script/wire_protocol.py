@@ -0,0 +1,286 @@
+"""
+Messages between policy_model_server.py and eval_policy_client.py.
+
+Three framings share one socket protocol:
+  - "binary": MAGIC | header length (4 bytes) | payload length (8 bytes) | header | payload
+    The header is the message as JSON with every numpy array replaced by {"__ndarray__": [dtype, shape, offset]},
+    the payload holds the raw array buffers at 64-byte aligned offsets. Arrays are sent straight from their
+    memory with sendmsg and received with recv_into, the decoded arrays are views into the received payload.
+  - "shm": a binary frame with an empty payload whose header is {"__shm__": segment name, "data": ...}.
+    The arrays live in a shared memory segment owned by the sender (see ShmChannel), only the header goes
+    through the socket. Used when client and server run on the same host.
+  - "json" (fallback): length (4 bytes, big-endian) | JSON with base64-encoded arrays (NumpyEncoder)
+Binary and json frames are told apart by their first 4 bytes. Replies use the framing of the request.
+"""
+import os
+import json
+import socket
+import base64
+import secrets
+from typing import Any
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+MAGIC = b"RTB1"
+_ALIGN = 64
+_IOV_MAX = 512
+
+
+class NumpyEncoder(json.JSONEncoder):
+    """JSON encoder extension for numpy types, includes reconstruction metadata"""
+    def default(self, obj):
+        if isinstance(obj, np.ndarray):
+            # Determine dtype for reconstruction
+            if obj.dtype == np.float32:
+                dtype = 'float32'
+            elif obj.dtype == np.float64:
+                dtype = 'float64'
+            elif obj.dtype == np.int32:
+                dtype = 'int32'
+            elif obj.dtype == np.int64:
+                dtype = 'int64'
+            else:
+                dtype = str(obj.dtype)
+            # Encode array bytes as base64
+            return {
+                '__numpy_array__': True,
+                'data': base64.b64encode(obj.tobytes()).decode('ascii'),
+                'dtype': dtype,
+                'shape': obj.shape
+            }
+        elif isinstance(obj, np.integer):
+            return int(obj)
+        elif isinstance(obj, np.floating):
+            return float(obj)
+        elif isinstance(obj, np.bool_):
+            return bool(obj)
+        return super().default(obj)
+
+
+def numpy_to_json(data: Any) -> str:
+    """Serialize Python data (including numpy arrays) to JSON string"""
+    return json.dumps(data, cls=NumpyEncoder)
+
+
+def json_to_numpy(json_str: str) -> Any:
+    """Deserialize JSON string back to Python objects, reconstructing numpy arrays"""
+    def object_hook(dct):
+        if '__numpy_array__' in dct:
+            raw = base64.b64decode(dct['data'])
+            return np.frombuffer(raw, dtype=dct['dtype']).reshape(dct['shape'])
+        return dct
+    return json.loads(json_str, object_hook=object_hook)
+
+
+class ConnectionClosed(ConnectionError):
+    """The peer closed the connection between two messages."""
+
+
+def _pack(data, arrays, offset):
+    if isinstance(data, np.ndarray):
+        if data.dtype.hasobject:
+            raise TypeError(f"Cannot send numpy array of dtype {data.dtype}")
+        arr = np.ascontiguousarray(data)
+        offset = (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+        arrays.append((offset, arr))
+        return {"__ndarray__": [arr.dtype.str, list(arr.shape), offset]}, offset + arr.nbytes
+    if isinstance(data, dict):
+        res = {}
+        for key, value in data.items():
+            res[key], offset = _pack(value, arrays, offset)
+        return res, offset
+    if isinstance(data, (list, tuple)):
+        res = []
+        for value in data:
+            item, offset = _pack(value, arrays, offset)
+            res.append(item)
+        return res, offset
+    if isinstance(data, np.generic):
+        return data.item(), offset
+    return data, offset
+
+
+def _unpack(data, buf, copy=False):
+    if isinstance(data, dict):
+        if "__ndarray__" in data:
+            dtype, shape, offset = data["__ndarray__"]
+            arr = np.ndarray(shape, dtype=np.dtype(dtype), buffer=buf, offset=offset)
+            return arr.copy() if copy else arr
+        return {key: _unpack(value, buf, copy) for key, value in data.items()}
+    if isinstance(data, list):
+        return [_unpack(value, buf, copy) for value in data]
+    return data
+
+
+def _frame_prefix(header: bytes, payload_len: int) -> bytes:
+    return MAGIC + len(header).to_bytes(4, "big") + payload_len.to_bytes(8, "big")
+
+
+def pack_binary(data: Any) -> list:
+    """
+    Frame `data` as a list of buffers (prefix, header, array memory and padding), nothing is copied.
+    """
+    arrays = []
+    header, payload_len = _pack(data, arrays, 0)
+    header = json.dumps(header).encode("utf-8")
+
+    buffers = [_frame_prefix(header, payload_len), header]
+    pos = 0
+    for offset, arr in arrays:
+        if offset > pos:
+            buffers.append(bytes(offset - pos))
+        if arr.nbytes > 0:
+            buffers.append(memoryview(arr.reshape(-1).view(np.uint8)))
+        pos = offset + arr.nbytes
+    return buffers
+
+
+def _sendmsg_all(sock, buffers):
+    buffers = [memoryview(buf) for buf in buffers if len(buf) > 0]
+    if not hasattr(sock, "sendmsg"):
+        for buf in buffers:
+            sock.sendall(buf)
+        return
+    while buffers:
+        sent = sock.sendmsg(buffers[:_IOV_MAX])
+        while sent > 0:
+            if sent >= len(buffers[0]):
+                sent -= len(buffers.pop(0))
+            else:
+                buffers[0] = buffers[0][sent:]
+                sent = 0
+
+
+def recv_exact_into(sock, view):
+    view = memoryview(view).cast("B")
+    while len(view) > 0:
+        n = sock.recv_into(view)
+        if n == 0:
+            raise ConnectionError("Incomplete data received")
+        view = view[n:]
+
+
+def _attach_shm(name):
+    try:
+        return SharedMemory(name=name, track=False)
+    except TypeError:
+        # python < 3.13 registers attached segments with the resource tracker, which would unlink them at exit
+        shm = SharedMemory(name=name)
+        if not name.lstrip("/").startswith(f"robotwin_{os.getpid()}_"):
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+class ShmChannel:
+    """
+    Shared memory side of one connection.
+
+    Each side writes its messages into a segment it owns and grows (under a new name) when a message
+    does not fit, and reads the peer's messages from the segments it names. Requests and replies strictly
+    alternate, so one segment per direction is enough: a segment is only rewritten after the peer answered.
+    Received arrays are copied out, callers may keep them across messages (e.g. observation history).
+    """
+
+    def __init__(self):
+        self.shm = None
+        self.peer_shm = None
+
+    def pack(self, data: Any) -> list:
+        arrays = []
+        header, size = _pack(data, arrays, 0)
+        if self.shm is None or self.shm.size < size:
+            self._close_own()
+            self.shm = SharedMemory(name=f"robotwin_{os.getpid()}_{secrets.token_hex(4)}",
+                                    create=True,
+                                    size=max(size * 2, 1 << 20))
+        for offset, arr in arrays:
+            np.ndarray(arr.shape, dtype=arr.dtype, buffer=self.shm.buf, offset=offset)[...] = arr
+        header = json.dumps({"__shm__": self.shm.name, "data": header}).encode("utf-8")
+        return [_frame_prefix(header, 0), header]
+
+    def unpack(self, name, header):
+        if self.peer_shm is None or self.peer_shm.name.lstrip("/") != name.lstrip("/"):
+            if self.peer_shm is not None:
+                self.peer_shm.close()
+            self.peer_shm = _attach_shm(name)
+        return _unpack(header, self.peer_shm.buf, copy=True)
+
+    def hello(self):
+        """
+        Create the own segment with a random token; a peer on the same host can read it back.
+        """
+        token = secrets.token_hex(8)
+        self.pack({"token": np.frombuffer(token.encode("ascii"), dtype=np.uint8)})
+        return {"name": self.shm.name, "token": token}
+
+    def check_hello(self, hello) -> bool:
+        try:
+            peer_shm = _attach_shm(hello["name"])
+        except (FileNotFoundError, OSError, ValueError):
+            return False
+        try:
+            token = hello["token"].encode("ascii")
+            # the hello segment holds the token array at offset 0
+            return bytes(peer_shm.buf[:len(token)]) == token
+        finally:
+            peer_shm.close()
+
+    def _close_own(self):
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    def close(self):
+        self._close_own()
+        if self.peer_shm is not None:
+            self.peer_shm.close()
+            self.peer_shm = None
+
+
+SHM_HELLO = "__shm_hello__"
+
+
+def send_message(sock, data: Any, framing="binary", shm: ShmChannel = None):
+    if framing == "shm":
+        _sendmsg_all(sock, shm.pack(data))
+    elif framing == "binary":
+        _sendmsg_all(sock, pack_binary(data))
+    else:
+        msg = numpy_to_json(data).encode('utf-8')
+        sock.sendall(len(msg).to_bytes(4, 'big') + msg)
+
+
+def recv_message(sock, shm: ShmChannel = None):
+    """
+    Receive one message in any framing. Returns (data, framing).
+    """
+    prefix = bytearray(4)
+    n = sock.recv_into(prefix)
+    if n == 0:
+        raise ConnectionClosed("Connection closed by peer")
+    if n < 4:
+        recv_exact_into(sock, memoryview(prefix)[n:])
+
+    if bytes(prefix) != MAGIC:
+        # json framing, the prefix is the message length
+        msg = bytearray(int.from_bytes(prefix, 'big'))
+        recv_exact_into(sock, msg)
+        return json_to_numpy(msg.decode('utf-8')), "json"
+
+    lengths = bytearray(12)
+    recv_exact_into(sock, lengths)
+    header = bytearray(int.from_bytes(lengths[:4], "big"))
+    recv_exact_into(sock, header)
+    # a fresh payload per message: the decoded arrays are views into it and may be kept by the caller
+    payload = np.empty(int.from_bytes(lengths[4:], "big"), dtype=np.uint8)
+    recv_exact_into(sock, payload)
+
+    header = json.loads(header.decode("utf-8"))
+    if isinstance(header, dict) and "__shm__" in header:
+        if shm is None:
+            raise ConnectionError("Received a shared memory message without a shared memory channel")
+        return shm.unpack(header["__shm__"], header["data"]), "shm"
+    return _unpack(header, payload), "binary"